@@ -0,0 +1,55 @@
+import os
+import sys
+import doctest
+import unittest
+sys.path.append(os.path.abspath(f'{__file__}/../..'))
+
+from xbot.framework import abort
+from xbot.framework.abort import AbortPolicy, NOT_RUN
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(abort))
+    return tests
+
+
+class TestAbort(unittest.TestCase):
+    """
+    Unit tests for abort module.
+    """
+    def test_disabled(self):
+        """
+        No policy never aborts.
+        """
+        policy = AbortPolicy()
+        self.assertFalse(policy.enabled)
+        self.assertEqual([policy.update(r) for r in ['FAIL'] * 100 + ['ERROR']],
+                         [None] * 101)
+
+    def test_maxfail_rate(self):
+        """
+        The rate is checked after `maxfail_rate_after` executed testcases,
+        skipped and NOT_RUN testcases are not counted.
+        """
+        policy = AbortPolicy(maxfail_rate=20, maxfail_rate_after=5)
+        for result in ('PASS', 'FAIL', 'SKIP', NOT_RUN, 'PASS', 'PASS'):
+            self.assertIsNone(policy.update(result))
+        self.assertEqual(policy.executed, 4)
+        self.assertEqual(policy.update('PASS'), None)
+        self.assertEqual(policy.update('TIMEOUT'),
+                         '2/6 testcase(s) failed (33.3% > maxfail rate 20%).')
+
+    def test_invalid(self):
+        """
+        Invalid limits.
+        """
+        with self.assertRaises(ValueError):
+            AbortPolicy(maxfail=-1)
+        with self.assertRaises(ValueError):
+            AbortPolicy(maxfail_rate=101)
+        with self.assertRaises(ValueError):
+            AbortPolicy(maxfail_rate_after=0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,108 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+sys.path.append(os.path.abspath(f'{__file__}/../..'))
+
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+from xml.etree import ElementTree
+
+from xbot.framework.exporter import JUnitExporter, JsonExporter, TapExporter
+
+
+def fakecase(caseid: str, result: str, errmsg: str | None = None) -> SimpleNamespace:
+    """
+    A finished testcase stand-in.
+    """
+    starttime = datetime(2024, 1, 1, 0, 0, 0)
+    return SimpleNamespace(
+        caseid=caseid,
+        relpath=f'testcases/dir/{caseid}.py',
+        result=result,
+        starttime=starttime,
+        endtime=starttime + timedelta(seconds=2),
+        duration=timedelta(seconds=2),
+        errmsg=errmsg,
+        waits=[]
+    )
+
+
+class TestExporter(unittest.TestCase):
+    """
+    Unit tests for exporter module.
+    """
+    def setUp(self) -> None:
+        self.logroot = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.logroot)
+
+    def read(self, exporter) -> str:
+        with open(exporter.filepath, encoding='utf8') as f:
+            return f.read()
+
+    def test_junit(self):
+        """
+        Test `JUnitExporter`, the file is valid xml after every testcase.
+        """
+        exporter = JUnitExporter()
+        exporter.start(self.logroot)
+        self.assertEqual(exporter.filepath,
+                         os.path.join(self.logroot, 'junit.xml'))
+        ElementTree.fromstring(self.read(exporter))
+        exporter.export(fakecase('tc_a', 'PASS'))
+        exporter.export(fakecase('tc_b', 'FAIL', 'AssertionError: 1 < 0'))
+        root = ElementTree.fromstring(self.read(exporter))
+        self.assertEqual(len(root.findall('./testsuite/testcase')), 2)
+        exporter.export(fakecase('tc_c', 'SKIP'))
+        exporter.finish()
+        root = ElementTree.fromstring(self.read(exporter))
+        cases = root.findall('./testsuite/testcase')
+        self.assertEqual([c.get('name') for c in cases], ['tc_a', 'tc_b', 'tc_c'])
+        self.assertEqual(cases[0].get('classname'), 'testcases.dir')
+        self.assertEqual(cases[1].find('failure').text, 'AssertionError: 1 < 0')
+        self.assertIsNotNone(cases[2].find('skipped'))
+
+    def test_json(self):
+        """
+        Test `JsonExporter`, the file is valid json after every testcase.
+        """
+        exporter = JsonExporter()
+        exporter.start(self.logroot)
+        self.assertEqual(json.loads(self.read(exporter))['cases'], [])
+        exporter.export(fakecase('tc_a', 'PASS'))
+        data = json.loads(self.read(exporter))
+        self.assertEqual(data['counter'], {'PASS': 1})
+        self.assertFalse(data['finished'])
+        exporter.export(fakecase('tc_b', 'TIMEOUT'))
+        exporter.finish()
+        data = json.loads(self.read(exporter))
+        self.assertEqual([c['caseid'] for c in data['cases']], ['tc_a', 'tc_b'])
+        self.assertEqual(data['cases'][1]['duration'], 2.0)
+        self.assertEqual(data['counter'], {'PASS': 1, 'TIMEOUT': 1})
+        self.assertTrue(data['finished'])
+
+    def test_tap(self):
+        """
+        Test `TapExporter`.
+        """
+        exporter = TapExporter()
+        exporter.start(self.logroot)
+        exporter.export(fakecase('tc_a', 'PASS'))
+        exporter.export(fakecase('tc_b', 'ERROR'))
+        exporter.export(fakecase('tc_c', 'SKIP'))
+        exporter.finish()
+        self.assertEqual(self.read(exporter).splitlines(), [
+            'TAP version 13',
+            'ok 1 - testcases/dir/tc_a.py',
+            'not ok 2 - testcases/dir/tc_b.py # ERROR',
+            'ok 3 - testcases/dir/tc_c.py # SKIP',
+            '1..3',
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
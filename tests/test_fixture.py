@@ -0,0 +1,181 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+sys.path.append(os.path.abspath(f'{__file__}/../..'))
+
+from importlib import import_module
+
+from xbot.framework.fixture import FixtureManager, Fixture, fixture
+from xbot.framework.errors import TestCaseError
+
+
+FIXTURES_LIB = """
+from xbot.framework.fixture import fixture
+
+EVENTS = []
+
+@fixture(scope='session')
+def service(testbed):
+    EVENTS.append('create service')
+    yield 'service@' + testbed
+    EVENTS.append('cleanup service')
+
+@fixture(scope='session')
+def value():
+    return 'lib value'
+"""
+
+FIXTURES_DIR = """
+from xbot.framework.fixture import fixture
+from lib.fixtures import EVENTS
+
+@fixture(scope='directory')
+def data():
+    EVENTS.append('create data')
+    yield object()
+    EVENTS.append('cleanup data')
+
+@fixture(scope='session')
+def value():
+    return 'dir value'
+"""
+
+CASE = """
+class {caseid}(object):
+    FIXTURES = {fixtures}
+"""
+
+
+def clear_project_modules() -> None:
+    """
+    Remove modules imported from the temporary project.
+    """
+    for name in tuple(sys.modules):
+        if name.split('.')[0] in ('lib', 'testcases'):
+            del sys.modules[name]
+
+
+class TestFixture(unittest.TestCase):
+    """
+    Unit tests for fixture module.
+
+    testcases
+    ├── d1
+    │   ├── fixtures.py
+    │   ├── tc_a.py
+    │   └── tc_b.py
+    └── d2
+        └── tc_c.py
+    """
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.workdir = tempfile.mkdtemp()
+        files = {
+            'lib/__init__.py': '',
+            'lib/fixtures.py': FIXTURES_LIB,
+            'testcases/__init__.py': '',
+            'testcases/d1/__init__.py': '',
+            'testcases/d1/fixtures.py': FIXTURES_DIR,
+            'testcases/d1/tc_a.py': CASE.format(caseid='tc_a', fixtures=['service', 'data', 'value']),
+            'testcases/d1/tc_b.py': CASE.format(caseid='tc_b', fixtures=['data']),
+            'testcases/d2/__init__.py': '',
+            'testcases/d2/tc_c.py': CASE.format(caseid='tc_c', fixtures=['service', 'value']),
+        }
+        for path, content in files.items():
+            filepath = os.path.join(cls.workdir, *path.split('/'))
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            with open(filepath, 'w', encoding='utf8') as f:
+                f.write(content)
+        clear_project_modules()
+        sys.path.insert(0, cls.workdir)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        clear_project_modules()
+        sys.path.remove(cls.workdir)
+        shutil.rmtree(cls.workdir)
+
+    def setUp(self) -> None:
+        self.events = import_module('lib.fixtures').EVENTS
+        self.events.clear()
+        self.tc_a = import_module('testcases.d1.tc_a').tc_a
+        self.tc_b = import_module('testcases.d1.tc_b').tc_b
+        self.tc_c = import_module('testcases.d2.tc_c').tc_c
+
+    def test_fixture_decorator(self):
+        """
+        Test `fixture` decorator.
+        """
+        @fixture(scope='module')
+        def fx():
+            return 1
+        self.assertIsInstance(fx, Fixture)
+        self.assertEqual((fx.name, fx.scope, fx()), ('fx', 'module', 1))
+        with self.assertRaises(ValueError):
+            fixture(scope='global')(lambda: 1)
+
+    def test_resolve(self):
+        """
+        The nearest definition wins.
+        """
+        manager = FixtureManager('tb')
+        self.assertEqual(manager.resolve(self.tc_a, 'value').func(), 'dir value')
+        self.assertEqual(manager.resolve(self.tc_c, 'value').func(), 'lib value')
+        self.assertIsNone(manager.resolve(self.tc_c, 'data'))
+
+    def test_lifecycle(self):
+        """
+        Fixtures are created on first use and cleaned up after the last user.
+        """
+        manager = FixtureManager('tb')
+        for casecls in (self.tc_a, self.tc_b, self.tc_c):
+            manager.plan(casecls, casecls.FIXTURES)
+        self.assertEqual(self.events, [])
+        self.assertEqual(manager.get(self.tc_a, 'service'), 'service@tb')
+        data = manager.get(self.tc_a, 'data')
+        manager.release(self.tc_a, self.tc_a.FIXTURES)
+        self.assertIs(manager.get(self.tc_b, 'data'), data)
+        manager.release(self.tc_b, self.tc_b.FIXTURES)
+        self.assertEqual(self.events, ['create service', 'create data', 'cleanup data'])
+        self.assertEqual(manager.get(self.tc_c, 'service'), 'service@tb')
+        manager.release(self.tc_c, self.tc_c.FIXTURES)
+        self.assertEqual(self.events, ['create service', 'create data',
+                                       'cleanup data', 'cleanup service'])
+
+    def test_not_declared(self):
+        """
+        Expect TestCaseError for unknown or unplanned fixtures.
+        """
+        manager = FixtureManager('tb')
+        with self.assertRaisesRegex(TestCaseError, 'not defined'):
+            manager.get(self.tc_c, 'data')
+        with self.assertRaisesRegex(TestCaseError, 'not declared'):
+            manager.get(self.tc_c, 'service')
+
+    def test_cleanup_all(self):
+        """
+        Remaining fixtures are cleaned up when the execution is interrupted.
+        """
+        manager = FixtureManager('tb')
+        manager.plan(self.tc_a, self.tc_a.FIXTURES)
+        manager.plan(self.tc_b, self.tc_b.FIXTURES)
+        manager.get(self.tc_a, 'data')
+        manager.cleanup_all()
+        self.assertEqual(self.events, ['create data', 'cleanup data'])
+
+    def test_keys(self):
+        """
+        Directory scoped fixtures share a key within a directory.
+        """
+        manager = FixtureManager('tb')
+        keys_a = manager.keys(self.tc_a, self.tc_a.FIXTURES, ('directory',))
+        keys_b = manager.keys(self.tc_b, self.tc_b.FIXTURES, ('directory',))
+        self.assertEqual(len(keys_a), 1)
+        self.assertEqual(keys_a, keys_b)
+        self.assertEqual(manager.keys(self.tc_c, self.tc_c.FIXTURES, ('directory',)), [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
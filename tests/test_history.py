@@ -0,0 +1,118 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+sys.path.append(os.path.abspath(f'{__file__}/../..'))
+
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+
+from xbot.framework.history import History, HistoryExporter
+
+
+class TestHistory(unittest.TestCase):
+    """
+    Unit tests for history module.
+    """
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.mkdtemp()
+        self.dbfile = os.path.join(self.tmpdir, 'logs', 'history.db')
+        self.db = History(self.dbfile)
+        runs = [
+            # tc_a: stable, tc_b: flaky, tc_c: always fails, tc_d: slower.
+            {'tc_a': ('PASS', 1), 'tc_b': ('PASS', 1), 'tc_c': ('FAIL', 1), 'tc_d': ('PASS', 2)},
+            {'tc_a': ('PASS', 1), 'tc_b': ('FAIL', 1), 'tc_c': ('FAIL', 1), 'tc_d': ('PASS', 2)},
+            {'tc_a': ('PASS', 1), 'tc_b': ('PASS', 1), 'tc_c': ('FAIL', 1), 'tc_d': ('PASS', 9)},
+        ]
+        for i, run in enumerate(runs):
+            self.db.add_run(
+                'tb1', f'/logs/tb1/{i}',
+                [(f'testcases/{k}.py', r, None, d) for k, (r, d) in run.items()],
+                version=f'1.{i}'
+            )
+        self.db.add_run('tb2', '/logs/tb2/0', [('testcases/tc_a.py', 'FAIL', None, 1)])
+
+    def tearDown(self) -> None:
+        self.db.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_trend(self):
+        """
+        Test `History.trend`.
+        """
+        rows = self.db.trend('tb1')
+        self.assertEqual([r[0] for r in rows], [1, 2, 3])
+        self.assertEqual([r[3] for r in rows], ['1.0', '1.1', '1.2'])
+        self.assertEqual([r[6] for r in rows], [75.0, 50.0, 75.0])
+        self.assertEqual([r[0] for r in self.db.trend(limit=2)], [3, 4])
+
+    def test_case(self):
+        """
+        Test `History.case`.
+        """
+        rows = self.db.case('testcases/tc_b.py', 'tb1')
+        self.assertEqual([r[4] for r in rows], ['PASS', 'FAIL', 'PASS'])
+        self.assertEqual([r[1] for r in self.db.case('testcases/tc_a.py')][-1], 'tb2')
+
+    def test_results(self):
+        """
+        Test `History.results`.
+        """
+        rows = self.db.results('tb1', limit=2)
+        self.assertEqual(rows[0], (2, 'testcases/tc_a.py', 'PASS', 1))
+        self.assertEqual(len(rows), 8)
+        self.assertEqual({r[0] for r in self.db.results()}, {1, 2, 3, 4})
+
+    def test_flaky(self):
+        """
+        Test `History.flaky`.
+        """
+        self.assertEqual(self.db.flaky('tb1'), [('testcases/tc_b.py', 3, 2, 2)])
+        self.assertEqual(self.db.flaky('tb1', limit=1), [])
+
+    def test_regressions(self):
+        """
+        Test `History.regressions`.
+        """
+        self.assertEqual(self.db.regressions('tb1'), [('testcases/tc_d.py', 9.0, 2.0)])
+        self.assertEqual(self.db.regressions('tb1', factor=5), [])
+
+    def test_exporter(self):
+        """
+        Test `HistoryExporter` saves results at the end of the execution.
+        """
+        exporter = HistoryExporter(self.dbfile, 'tb3', '2.0')
+        exporter.start('/logs/tb3/0')
+        exporter.export(SimpleNamespace(
+            relpath='testcases/tc_a.py', result='PASS',
+            logfile=os.path.join(self.tmpdir, 'tc_a.html'),
+            starttime=datetime(2024, 1, 1), duration=timedelta(seconds=3)
+        ))
+        self.assertEqual(self.db.trend('tb3'), [])
+        exporter.finish()
+        self.assertEqual(self.db.case('testcases/tc_a.py', 'tb3'),
+                         [(5, 'tb3', '2024-01-01 00:00:00', '2.0', 'PASS', 3.0)])
+
+    def test_exporter_flaky(self):
+        """
+        Test `HistoryExporter` saves a testcase passed after retrying as FLAKY.
+        """
+        logfile = os.path.join(self.tmpdir, 'tc_b.html')
+        for path in (logfile, os.path.join(self.tmpdir, 'tc_b.attempt1.html')):
+            open(path, 'w').close()
+        exporter = HistoryExporter(self.dbfile, 'tb1')
+        exporter.start('/logs/tb1/3')
+        exporter.export(SimpleNamespace(
+            relpath='testcases/tc_b.py', result='PASS', logfile=logfile,
+            starttime=None, duration=timedelta(seconds=1)
+        ))
+        exporter.finish()
+        self.assertEqual([r[4] for r in self.db.case('testcases/tc_b.py', 'tb1')],
+                         ['PASS', 'FAIL', 'PASS', 'FLAKY'])
+        self.assertEqual(self.db.trend('tb1')[-1][4:], (1, 1, 100.0))
+        self.assertEqual(self.db.flaky('tb1', limit=2), [('testcases/tc_b.py', 2, 2, 1)])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
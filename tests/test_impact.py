@@ -0,0 +1,94 @@
+import os
+import sys
+import shutil
+import doctest
+import tempfile
+import unittest
+import subprocess
+sys.path.append(os.path.abspath(f'{__file__}/../..'))
+
+from types import SimpleNamespace
+
+from xbot.framework import impact
+from xbot.framework.utils import cd
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(impact))
+    return tests
+
+
+class TestImpact(unittest.TestCase):
+    """
+    Unit tests for impact module.
+    """
+    FILES = {
+        'lib/__init__.py': '',
+        'lib/testbed.py': 'from xbot.framework import testbed\n',
+        'lib/db/__init__.py': '',
+        'lib/db/client.py': 'import json\nfrom lib import util\n',
+        'lib/util.py': 'import os\n',
+        'lib/ssh.py': '',
+        'testcases/__init__.py': '',
+        'testcases/db/fixtures.py': '',
+        'testcases/db/helper.py': 'def helper():\n    from lib.ssh import SSH\n',
+        'testcases/db/tc_query.py': 'from lib.db.client import Client\nfrom . import helper\n',
+        'testcases/tc_plain.py': 'from xbot.framework.testcase import TestCase\n',
+    }
+
+    def setUp(self) -> None:
+        self.projdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.projdir)
+        for path, content in self.FILES.items():
+            filepath = os.path.join(self.projdir, path)
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            with open(filepath, 'w', encoding='utf8') as f:
+                f.write(content)
+
+    def test_case_deps(self):
+        """
+        Project modules imported directly or indirectly.
+        """
+        with cd(self.projdir):
+            self.assertEqual(impact.case_deps('testcases/db/tc_query.py'), [
+                'lib/__init__.py', 'lib/db/__init__.py', 'lib/db/client.py',
+                'lib/ssh.py', 'lib/testbed.py', 'lib/util.py',
+                'testcases/__init__.py', 'testcases/db/fixtures.py',
+                'testcases/db/helper.py', 'testcases/db/tc_query.py',
+            ])
+            self.assertEqual(impact.case_deps('testcases/tc_plain.py'),
+                             ['lib/__init__.py', 'lib/testbed.py', 'testcases/tc_plain.py'])
+
+    def test_changed_since(self):
+        """
+        Record dependencies and select testcases affected by changes.
+        """
+        with cd(self.projdir):
+            exporter = impact.DepsExporter()
+            exporter.start('logs')
+            for casepath in ('testcases/db/tc_query.py', 'testcases/tc_plain.py'):
+                exporter.export(SimpleNamespace(abspath=os.path.abspath(casepath)))
+            exporter.finish()
+            deps = impact.DepsMap()
+            cases = ['testcases/db/tc_query.py', './testcases/tc_plain.py', 'testcases/tc_new.py']
+            self.assertEqual(deps.affected(cases, {'lib/util.py'}),
+                             ['testcases/db/tc_query.py', 'testcases/tc_new.py'])
+            self.assertEqual(deps.affected(cases, {'lib/testbed.py'}), cases)
+            self.assertEqual(deps.affected(cases, {'README.md'}), ['testcases/tc_new.py'])
+            with open('changed.txt', 'w', encoding='utf8') as f:
+                f.write('lib/ssh.py\n\n./testcases/tc_plain.py\n')
+            self.assertEqual(impact.changed_files('changed.txt'),
+                             {'lib/ssh.py', 'testcases/tc_plain.py'})
+            git = ['git', '-c', 'user.name=x', '-c', 'user.email=x@x']
+            subprocess.run(git + ['init', '-q'], check=True)
+            subprocess.run(git + ['add', '.'], check=True)
+            subprocess.run(git + ['commit', '-qm', 'init'], check=True)
+            with open('lib/util.py', 'a', encoding='utf8') as f:
+                f.write('import sys\n')
+            self.assertEqual(impact.changed_files('HEAD'), {'lib/util.py'})
+            with self.assertRaisesRegex(ValueError, 'nosuchref'):
+                impact.changed_files('nosuchref')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
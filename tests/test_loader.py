@@ -0,0 +1,108 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+sys.path.append(os.path.abspath(f'{__file__}/../..'))
+
+from unittest.mock import patch
+
+from ruamel import yaml
+
+from xbot.framework import loader
+
+
+class TestLoader(unittest.TestCase):
+    """
+    Unit tests for loader module.
+    """
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.mkdtemp()
+        self.cachedir = os.path.join(self.tmpdir, 'cache')
+        patcher = patch.object(loader, 'CACHE_DIR', self.cachedir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, filename: str, content: str) -> str:
+        filepath = os.path.join(self.tmpdir, filename)
+        with open(filepath, 'w', encoding='utf8', newline='') as f:
+            f.write(content)
+        return filepath
+
+    def test_small(self):
+        """
+        Small files are parsed directly, content keeps text newlines.
+        """
+        filepath = self.write('small.yml', 'a:\r\n  b: 1\r\n')
+        data, content = loader.load_yaml(filepath)
+        self.assertEqual(data, {'a': {'b': 1}})
+        self.assertEqual(content, 'a:\n  b: 1\n')
+        self.assertFalse(os.path.exists(self.cachedir))
+
+    def test_cache(self):
+        """
+        Parsed data of large files is cached by content.
+        """
+        hosts = ''.join(f'  - name: host{i}\n    ip: 10.0.{i // 256}.{i % 256}\n'
+                        for i in range(3000))
+        filepath = self.write('large.yml', 'hosts:\n' + hosts)
+        data, _ = loader.load_yaml(filepath)
+        self.assertEqual(len(data['hosts']), 3000)
+        self.assertEqual(len(os.listdir(self.cachedir)), 1)
+        with patch.object(loader, 'parser', side_effect=AssertionError):
+            self.assertEqual(loader.load_yaml(filepath)[0], data)
+        # Changed content is parsed again.
+        self.write('large.yml', 'hosts:\n' + hosts + '  - name: new\n')
+        self.assertEqual(len(loader.load_yaml(filepath)[0]['hosts']), 3001)
+        self.assertEqual(len(os.listdir(self.cachedir)), 2)
+
+    def test_broken_cache(self):
+        """
+        A broken cache file is ignored.
+        """
+        filepath = self.write('large.yml', 'k: v\n' + '#' * loader.CACHE_MIN_SIZE)
+        loader.load_yaml(filepath)
+        for name in os.listdir(self.cachedir):
+            with open(os.path.join(self.cachedir, name), 'wb') as f:
+                f.write(b'broken')
+        self.assertEqual(loader.load_yaml(filepath)[0], {'k': 'v'})
+        self.assertEqual(loader.load_yaml(filepath, cache=False)[0], {'k': 'v'})
+
+    def test_include(self):
+        """
+        `!include` sections are loaded on first access.
+        """
+        os.mkdir(os.path.join(self.tmpdir, 'inventory'))
+        self.write('inventory/hosts.yml', 'web: !include web.yml\ndb: {ip: 10.0.0.2}\n')
+        self.write('inventory/web.yml', 'ip: 10.0.0.1\n')
+        filepath = self.write('testbed.yml', 'name: tb\nhosts: !include inventory/hosts.yml\n')
+        data = loader.resolve_includes(loader.load_yaml(filepath, includes=True)[0],
+                                       self.tmpdir)
+        self.assertIsInstance(dict.__getitem__(data, 'hosts'), loader.Include)
+        self.assertEqual(data['name'], 'tb')
+        self.assertIsInstance(dict.__getitem__(data, 'hosts'), loader.Include)
+        hosts = data.get('hosts')
+        self.assertEqual(hosts['db'], {'ip': '10.0.0.2'})
+        self.assertIsInstance(dict.__getitem__(hosts, 'web'), loader.Include)
+        self.assertEqual(dict(hosts.items()), {'web': {'ip': '10.0.0.1'},
+                                               'db': {'ip': '10.0.0.2'}})
+        self.assertIs(data['hosts'], hosts)
+
+    def test_include_disabled(self):
+        """
+        `!include` is only supported when asked for, other safe loaders of
+        the process are not affected.
+        """
+        filepath = self.write('testset.yml', 'a: !include x.yml\n')
+        loader.load_yaml(filepath, includes=True)
+        with self.assertRaises(yaml.constructor.ConstructorError):
+            loader.load_yaml(filepath)
+        with self.assertRaises(yaml.constructor.ConstructorError):
+            yaml.YAML(typ='safe').load('a: !include x.yml')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
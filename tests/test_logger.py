@@ -2,12 +2,15 @@ import unittest
 import logging
 import sys
 import os
+import json
+import tempfile
+import shutil
 sys.path.append(os.path.abspath(f'{__file__}/../..'))
 
 from io import StringIO
 
 from xbot.framework.logger import (XLogger, StdoutFilter, CaseLogFilter, 
-                         CaseLogHandler, ROOT_LOGGER, getlogger)
+                         CaseLogHandler, ROOT_LOGGER, getlogger, read_jsonl)
 
 
 class TestLogger(unittest.TestCase):
@@ -86,6 +89,34 @@ class TestLogger(unittest.TestCase):
         self.assertIn(record2.__dict__, handler.records['stage2'])
         self.assertNotIn(record2.__dict__, handler.records['stage1'])
 
+    def test_case_log_handler_jsonl(self):
+        """
+        Test `CaseLogHandler` streaming records to a JSON Lines file.
+        """
+        tmpdir = tempfile.mkdtemp()
+        jsonlfile = os.path.join(tmpdir, 'sub', 'case.jsonl')
+        handler = CaseLogHandler(jsonlfile=jsonlfile, keep=False)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        handler.set_stage('step1')
+        self.assertFalse(os.path.exists(jsonlfile))
+        handler.emit(logging.makeLogRecord({'msg': 'hello', 'levelname': 'INFO',
+                                            'hook': {'more': 'detail'}}))
+        # Written as the case runs, not on close.
+        with open(jsonlfile, encoding='utf8') as f:
+            obj = json.loads(f.readline())
+        self.assertEqual(obj['type'], 'record')
+        self.assertEqual(obj['stage'], 'step1')
+        self.assertEqual(obj['message'], 'hello')
+        self.assertEqual(obj['extra'], {'hook': {'more': 'detail'}})
+        self.assertEqual(handler.records, {'step1': []})
+        handler.write({'type': 'result', 'result': 'PASS'})
+        handler.close()
+        with open(jsonlfile, 'a', encoding='utf8') as f:
+            f.write('{"type": "trunc')
+        objs = list(read_jsonl(jsonlfile))
+        self.assertEqual([o['type'] for o in objs], ['record', 'result'])
+        shutil.rmtree(tmpdir)
+
     def test_getlogger(self):
         """
         Test `getlogger` function.
@@ -89,6 +89,17 @@ class TestMain(unittest.TestCase):
                                     mockout.getvalue()).group(1)
                     self.assertTrue(os.path.exists(report))
 
+    def test_run_invalid_workers(self):
+        mockerr = StringIO()
+        utils.printerr.keywords['file'] = mockerr
+        with utils.cd(self.workdir):
+            for workers in (0, -1):
+                with self.assertRaises(SystemExit) as cm:
+                    main.run('testbeds/testbed_example.yml',
+                             'testsets/testset_example.yml', workers=workers)
+                self.assertEqual(cm.exception.code, 1)
+        self.assertIn('`workers` must be greater than 0', mockerr.getvalue())
+
     def test_main(self):
         with patch('xbot.framework.main.init', new_callable=MagicMock) as mockinit:
             sys.argv = ['xbot', 'init', '-d', 'myproj']
@@ -97,7 +108,15 @@ class TestMain(unittest.TestCase):
         with patch('xbot.framework.main.run', new_callable=MagicMock) as mockrun:
             sys.argv = ['xbot', 'run', '-b', 'mytb.yml', '-s', 'myts.yml']
             main.main()
-            mockrun.assert_called_once_with('mytb.yml', 'myts.yml', 'brief')
+            mockrun.assert_called_once_with('mytb.yml', 'myts.yml', 'brief', 'html', [], '', 1, [], None, False, 0, 0, 10, False, 'testset', 0, None)
+        with patch('xbot.framework.main.report', new_callable=MagicMock) as mockreport:
+            sys.argv = ['xbot', 'report', '-p', 'logs/mylogdir']
+            main.main()
+            mockreport.assert_called_once_with('logs/mylogdir')
+        with patch('xbot.framework.main.history', new_callable=MagicMock) as mockhistory:
+            sys.argv = ['xbot', 'history', '-q', 'flaky', '-n', '5']
+            main.main()
+            mockhistory.assert_called_once_with('flaky', None, None, 5)
         with patch('sys.stdout', new_callable=StringIO) as mockout:
             sys.argv = ['xbot', '-v']
             with self.assertRaises(SystemExit) as cm:
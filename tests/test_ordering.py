@@ -0,0 +1,74 @@
+import os
+import sys
+import doctest
+import unittest
+sys.path.append(os.path.abspath(f'{__file__}/../..'))
+
+from types import SimpleNamespace
+
+from xbot.framework import ordering
+from xbot.framework.ordering import FailureOrder
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(ordering))
+    return tests
+
+
+class TestOrdering(unittest.TestCase):
+    """
+    Unit tests for ordering module.
+    """
+    RUNS = [
+        {'tc_stable': 'PASS', 'tc_short': 'PASS', 'tc_oldfail': 'FAIL',
+         'tc_recentfail': 'PASS', 'tc_flaky': 'PASS', 'tc_changed': 'PASS'},
+        {'tc_stable': 'PASS', 'tc_short': 'PASS', 'tc_oldfail': 'PASS',
+         'tc_recentfail': 'PASS', 'tc_flaky': 'FAIL', 'tc_changed': 'PASS'},
+        {'tc_stable': 'PASS', 'tc_short': 'PASS', 'tc_oldfail': 'PASS',
+         'tc_recentfail': 'FAIL', 'tc_flaky': 'PASS', 'tc_changed': 'PASS',
+         'tc_param[0]': 'PASS', 'tc_param[1]': 'FAIL'},
+    ]
+    DURATIONS = {'tc_stable': 5, 'tc_short': 1, 'tc_changed': 2, 'tc_param[0]': 3,
+                 'tc_param[1]': 3}
+
+    def setUp(self) -> None:
+        results = [
+            (i + 1, f'testcases/{caseid}.py', result, self.DURATIONS.get(caseid, 1))
+            for i, run in enumerate(self.RUNS) for caseid, result in run.items()
+        ]
+        deps = SimpleNamespace(get=lambda key: {
+            'testcases/tc_changed.py': ['lib/x.py', 'testcases/tc_changed.py'],
+        }.get(key))
+        self.order = FailureOrder(results, deps, {'lib/x.py'})
+
+    def test_scores(self):
+        """
+        Recent failures, flakiness, changes and no history raise scores.
+        """
+        score = lambda caseid: round(self.order.score(f'./testcases/{caseid}.py'), 3)
+        self.assertEqual(score('tc_stable'), 0)
+        self.assertEqual(score('tc_recentfail'), round(1 / 1.75 + 0.25, 3))
+        self.assertEqual(score('tc_oldfail'), round(0.25 / 1.75 + 0.25, 3))
+        self.assertEqual(score('tc_flaky'), round(0.5 / 1.75 + 0.5, 3))
+        self.assertEqual(score('tc_changed'), 1)
+        self.assertEqual(score('tc_param'), 1)
+        self.assertEqual(score('tc_new'), ordering.NEW_SCORE)
+        self.assertEqual(self.order.duration('testcases/tc_param.py'), 3)
+
+    def test_order(self):
+        """
+        Most likely failing first, stable passing testcases shortest first.
+        """
+        casepaths = tuple(f'testcases/{caseid}.py' for caseid in (
+            'tc_stable', 'tc_short', 'tc_oldfail', 'tc_recentfail',
+            'tc_flaky', 'tc_new', 'tc_changed', 'tc_param',
+        ))
+        self.assertEqual([p[10:-3] for p in self.order(casepaths)], [
+            'tc_changed', 'tc_param', 'tc_recentfail', 'tc_flaky',
+            'tc_new', 'tc_oldfail', 'tc_short', 'tc_stable',
+        ])
+        self.assertEqual(FailureOrder([])(casepaths[:3]), casepaths[:3])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
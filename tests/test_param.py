@@ -0,0 +1,77 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import doctest
+sys.path.append(os.path.abspath(f'{__file__}/../..'))
+
+from xbot.framework import param
+from xbot.framework.param import Param, from_csv, from_jsonl, iter_params
+from xbot.framework.errors import TestCaseError
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(param))
+    return tests
+
+
+class TestParam(unittest.TestCase):
+    """
+    Unit tests for param module.
+    """
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, filename: str, content: str) -> str:
+        filepath = os.path.join(self.tmpdir, filename)
+        with open(filepath, 'w', encoding='utf8') as f:
+            f.write(content)
+        return filepath
+
+    def test_from_csv(self):
+        """
+        Test `from_csv`.
+        """
+        filepath = self.write('params.csv', 'user,role\nalice,admin\nbob,guest\n')
+        self.assertEqual(list(iter_params(from_csv(filepath))), [
+            Param(0, {'user': 'alice', 'role': 'admin'}),
+            Param(1, {'user': 'bob', 'role': 'guest'})
+        ])
+
+    def test_from_jsonl(self):
+        """
+        Test `from_jsonl`, blank lines are ignored.
+        """
+        filepath = self.write('params.jsonl', '{"a": 1}\n\n[2, 3]\n')
+        self.assertEqual(list(iter_params(from_jsonl(filepath))),
+                         [Param(0, {'a': 1}), Param(1, [2, 3])])
+
+    def test_lazy(self):
+        """
+        Parameters are consumed one by one.
+        """
+        consumed = []
+        def source():
+            for i in range(3):
+                consumed.append(i)
+                yield i
+        params = iter_params(source)
+        self.assertEqual(next(params), Param(0, 0))
+        self.assertEqual(consumed, [0])
+
+    def test_invalid(self):
+        """
+        Expect TestCaseError for invalid sources.
+        """
+        with self.assertRaisesRegex(TestCaseError, 'Invalid PARAMS'):
+            list(iter_params(42))
+        with self.assertRaisesRegex(TestCaseError, 'FileNotFoundError'):
+            list(iter_params(from_csv(os.path.join(self.tmpdir, 'none.csv'))))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,152 @@
+import os
+import sys
+import time
+import socket
+import threading
+import unittest
+import socketserver
+sys.path.append(os.path.abspath(f'{__file__}/../..'))
+
+from xbot.framework.pool import ResourcePool, PoolManager
+
+
+class EchoHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        self.server.connections += 1
+        while True:
+            data = self.request.recv(1024)
+            if not data:
+                break
+            self.request.sendall(data)
+
+
+class EchoServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    connections = 0
+
+
+def ping(sock: socket.socket) -> bool:
+    """
+    Health check of a connection.
+    """
+    sock.sendall(b'ping')
+    return sock.recv(4) == b'ping'
+
+
+class TestPool(unittest.TestCase):
+    """
+    Unit tests for pool module, with a loopback echo server.
+    """
+    def setUp(self) -> None:
+        self.server = EchoServer(('127.0.0.1', 0), EchoHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.address = self.server.server_address
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def connect(self) -> socket.socket:
+        return socket.create_connection(self.address, timeout=5)
+
+    def test_reuse(self):
+        """
+        Returned connections are reused.
+        """
+        pool = ResourcePool(self.connect, maxsize=2, check=ping)
+        for _ in range(5):
+            with pool.checkout() as sock:
+                self.assertTrue(ping(sock))
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual((pool.size, pool.idle), (1, 1))
+        pool.close()
+        self.assertEqual(pool.size, 0)
+        with self.assertRaisesRegex(RuntimeError, 'closed'):
+            pool.acquire()
+
+    def test_maxsize(self):
+        """
+        Checkouts wait for a returned connection when the pool is full.
+        """
+        pool = ResourcePool(self.connect, maxsize=1)
+        sock = pool.acquire()
+        with self.assertRaises(TimeoutError):
+            pool.acquire(timeout=0.2)
+        threading.Timer(0.2, pool.release, args=(sock,)).start()
+        self.assertIs(pool.acquire(timeout=5), sock)
+        pool.release(sock)
+        pool.close()
+
+    def test_parallel(self):
+        """
+        Workers share at most `maxsize` connections.
+        """
+        pool = ResourcePool(self.connect, maxsize=3)
+        def worker():
+            for _ in range(10):
+                with pool.checkout(timeout=10) as sock:
+                    ping(sock)
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertLessEqual(self.server.connections, 3)
+        pool.close()
+
+    def test_health_check(self):
+        """
+        Unhealthy idle connections are replaced.
+        """
+        pool = ResourcePool(self.connect, check=ping)
+        sock = pool.acquire()
+        pool.release(sock)
+        sock.shutdown(socket.SHUT_RDWR)
+        newsock = pool.acquire()
+        self.assertIsNot(newsock, sock)
+        self.assertTrue(ping(newsock))
+        self.assertEqual(self.server.connections, 2)
+        self.assertEqual(pool.size, 1)
+        pool.release(newsock, broken=True)
+        self.assertEqual(pool.size, 0)
+
+    def test_idle_timeout(self):
+        """
+        Connections idle too long are closed.
+        """
+        pool = ResourcePool(self.connect, idle_timeout=0.1)
+        sock = pool.acquire()
+        pool.release(sock)
+        time.sleep(0.2)
+        self.assertEqual(pool.evict(), 1)
+        self.assertEqual(sock.fileno(), -1)
+        self.assertEqual(pool.size, 0)
+
+    def test_manager(self):
+        """
+        A pool per key.
+        """
+        manager = PoolManager()
+        manager.register('tcp', lambda port: socket.create_connection(
+            ('127.0.0.1', port), timeout=5), maxsize=1)
+        pool = manager.pool('tcp', self.address[1])
+        self.assertIs(manager.pool('tcp', self.address[1]), pool)
+        with pool.checkout() as sock:
+            self.assertTrue(ping(sock))
+        with self.assertRaises(KeyError):
+            manager.pool('ssh')
+        manager.register('idle', lambda: socket.create_connection(self.address, timeout=5),
+                         idle_timeout=0.1)
+        with manager.pool('idle').checkout() as idlesock:
+            pass
+        self.assertEqual(manager.evict(), 0)
+        time.sleep(0.2)
+        self.assertEqual(manager.evict(), 1)
+        self.assertEqual(idlesock.fileno(), -1)
+        manager.close()
+        self.assertIsNot(manager.pool('tcp', self.address[1]), pool)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
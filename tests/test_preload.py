@@ -0,0 +1,83 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import importlib.util
+sys.path.append(os.path.abspath(f'{__file__}/../..'))
+
+from unittest.mock import patch
+
+from xbot.framework import preload
+from xbot.framework.utils import cd
+
+
+class TestPreload(unittest.TestCase):
+    """
+    Unit tests for preload module.
+    """
+    FILES = {
+        'lib/__init__.py': '',
+        'lib/util.py': 'import os\n',
+        'testcases/__init__.py': '',
+        'testcases/tc_a.py': 'from lib import util\n',
+        'testcases/tc_b.py': 'import lib\n',
+        'testcases/tc_bad.py': 'def broken(:\n',
+    }
+
+    def setUp(self) -> None:
+        self.projdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.projdir)
+        for path, content in self.FILES.items():
+            filepath = os.path.join(self.projdir, path)
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            with open(filepath, 'w', encoding='utf8') as f:
+                f.write(content)
+        prefix, env = sys.pycache_prefix, os.environ.get('PYTHONPYCACHEPREFIX')
+        def restore():
+            sys.pycache_prefix = prefix
+            if env is None:
+                os.environ.pop('PYTHONPYCACHEPREFIX', None)
+            else:
+                os.environ['PYTHONPYCACHEPREFIX'] = env
+        self.addCleanup(restore)
+
+    def test_pycache_prefix(self):
+        """
+        Explicit prefix, default of read-only project directories.
+        """
+        sys.pycache_prefix = None
+        self.assertIsNone(preload.set_pycache_prefix(None, self.projdir))
+        cachedir = os.path.join(self.projdir, 'cache')
+        self.assertEqual(preload.set_pycache_prefix(cachedir), cachedir)
+        self.assertEqual(sys.pycache_prefix, cachedir)
+        self.assertEqual(os.environ['PYTHONPYCACHEPREFIX'], cachedir)
+        sys.pycache_prefix = None
+        with patch('os.access', return_value=False):
+            self.assertEqual(preload.set_pycache_prefix(None, self.projdir),
+                             preload.PYCACHE_DIR)
+
+    def test_compile_files(self):
+        """
+        Testcases and the project modules they import are compiled in
+        worker processes to the prefix directory.
+        """
+        cachedir = os.path.join(self.projdir, 'cache')
+        preload.set_pycache_prefix(cachedir)
+        with cd(self.projdir):
+            files = preload.project_files(['testcases/tc_a.py', 'testcases/tc_bad.py'])
+            self.assertEqual(files, ['lib/__init__.py', 'lib/util.py',
+                                     'testcases/tc_a.py', 'testcases/tc_bad.py'])
+            self.assertEqual(preload.compile_files(files, 2), 1)
+            for f in files[:3]:
+                self.assertTrue(os.path.exists(
+                    importlib.util.cache_from_source(os.path.abspath(f))))
+                self.assertTrue(
+                    importlib.util.cache_from_source(os.path.abspath(f)).startswith(cachedir))
+            self.assertFalse(os.path.exists(os.path.join('lib', '__pycache__')))
+        with self.assertRaises(ValueError):
+            preload.compile_files(files, 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -1,13 +1,28 @@
 import os
+import json
+import shutil
+import tempfile
+import doctest
 import unittest
 
-from xbot.framework.report import gen_report
+from io import StringIO
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from xbot.framework import report as report_module
+from xbot.framework.report import gen_report, render_log, read_summary, LiveReport
 
 
 LOGDIR = os.path.join(os.path.dirname(__file__), 'resources', 'logs')
 OKREPORT = os.path.join(LOGDIR, 'report.ok.html')
 
 
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(report_module))
+    return tests
+
+
 class TestReport(unittest.TestCase):
     """
     Unit tests for report module.
@@ -21,7 +36,141 @@ class TestReport(unittest.TestCase):
             with open(OKREPORT, encoding='utf8') as f2:
                 self.assertEqual(f1.read(), f2.read(), 
                                  f'{report} != {OKREPORT}')
+        datafile = os.path.join(LOGDIR, 'report_data', 'cases_0000.js')
+        with open(datafile, encoding='utf8') as f:
+            data = f.read()
+        self.assertTrue(data.startswith('addCases(') and data.endswith(');\n'))
+        rows = json.loads(data[len('addCases('):-len(');\n')])
+        self.assertEqual(len(rows), 11)
+        self.assertEqual(rows[-1][4], 'TIMEOUT')
+        self.assertEqual(rows[-1][6], 3)
+        os.remove(report)
+        shutil.rmtree(os.path.join(LOGDIR, 'report_data'))
+
+    def test_gen_report_chunks(self):
+        """
+        Case rows are split into data files of `CHUNK_SIZE` rows.
+        """
+        with patch.object(report_module, 'CHUNK_SIZE', 4):
+            report, _ = gen_report(LOGDIR)
+        datadir = os.path.join(LOGDIR, 'report_data')
+        self.assertEqual(sorted(os.listdir(datadir)),
+                         ['cases_0000.js', 'cases_0001.js', 'cases_0002.js'])
+        with open(report, encoding='utf8') as f:
+            self.assertIn('var CHUNKS = ["report_data/cases_0000.js", '
+                          '"report_data/cases_0001.js", '
+                          '"report_data/cases_0002.js"];', f.read())
         os.remove(report)
+        shutil.rmtree(datadir)
+
+    def test_render_log(self):
+        """
+        Test `render_log` and reporting of JSON Lines only logs.
+        """
+        tmpdir = tempfile.mkdtemp()
+        jsonlfile = os.path.join(tmpdir, 'testcases', 'tc_a.jsonl')
+        os.makedirs(os.path.dirname(jsonlfile))
+        objs = [
+            {'type': 'case', 'caseid': 'tc_a', 'path': 'testcases/tc_a.py',
+             'starttime': '2024-01-01 00:00:00', 'testbed': None,
+             'sourcecode': 'class tc_a: pass'},
+            {'type': 'record', 'stage': 'setup', 'created': 0,
+             'asctime': '2024-01-01 00:00:00,000', 'levelname': 'INFO',
+             'filename': 'tc_a.py', 'lineno': 1, 'message': 'hello <x>',
+             'extra': {}},
+            {'type': 'result', 'result': 'FAIL',
+             'starttime': '2024-01-01 00:00:00',
+             'endtime': '2024-01-01 00:00:01', 'duration': '0:00:01'},
+        ]
+        with open(jsonlfile, 'w', encoding='utf8') as f:
+            f.writelines(json.dumps(o) + '\n' for o in objs)
+        self.assertEqual(read_summary(jsonlfile)['result'], 'FAIL')
+        report, allpassed = gen_report(tmpdir)
+        self.assertFalse(allpassed)
+        datafile = os.path.join(tmpdir, 'report_data', 'cases_0000.js')
+        with open(datafile, encoding='utf8') as f:
+            self.assertIn('testcases/tc_a.jsonl', f.read())
+        logfile = render_log(jsonlfile)
+        self.assertEqual(logfile, jsonlfile.replace('.jsonl', '.html'))
+        with open(logfile, encoding='utf8') as f:
+            content = f.read()
+        self.assertIn('<td id="result" colspan="2">FAIL</td>', content)
+        self.assertIn('hello &ltx&gt', content)
+        shutil.rmtree(tmpdir)
+
+    def test_gen_report_bounded(self):
+        """
+        Logfiles are scanned in parallel from bounded parts of the files.
+        """
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        shutil.copytree(LOGDIR, tmpdir, dirs_exist_ok=True)
+        os.remove(os.path.join(tmpdir, 'report.ok.html'))
+        jsonlfile = os.path.join(tmpdir, 'tc_big.jsonl')
+        with open(jsonlfile, 'w', encoding='utf8') as f:
+            f.write(json.dumps({'type': 'case', 'caseid': 'tc_big'}) + '\n')
+            for i in range(1000):
+                f.write(json.dumps({'type': 'record', 'message': 'x' * 100}) + '\n')
+            f.write(json.dumps({'type': 'result', 'result': 'PASS',
+                                'starttime': '2024-01-01 00:00:00',
+                                'endtime': '2024-01-01 00:00:01',
+                                'duration': '0:00:01'}) + '\n')
+            f.write('{"type": "rec')
+        with patch('sys.stderr', new_callable=StringIO) as mockerr, \
+                patch.object(report_module, 'HEAD_SIZE', 2048), \
+                patch.object(report_module, 'TAIL_SIZE', 1024):
+            self.assertEqual(read_summary(jsonlfile)['result'], 'PASS')
+            gen_report(tmpdir, workers=4, progress=True)
+        self.assertTrue(mockerr.getvalue().endswith('Scanning logfiles: 12/12\n'))
+        datafile = os.path.join(tmpdir, 'report_data', 'cases_0000.js')
+        with open(datafile, encoding='utf8') as f:
+            rows = json.loads(f.read()[len('addCases('):-len(');\n')])
+        self.assertEqual(len(rows), 12)
+        self.assertIn(['./tc_big.py', '2024-01-01 00:00:00', '2024-01-01 00:00:01',
+                       '0:00:01', 'PASS', './tc_big.jsonl', 1], rows)
+
+    def test_live_report(self):
+        """
+        The live report is updated by appending rows as testcases finish.
+        """
+        logroot = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, logroot)
+        def finish(caseid, result, seconds):
+            logfile = os.path.join(logroot, 'testcases', f'{caseid}.html')
+            os.makedirs(os.path.dirname(logfile), exist_ok=True)
+            open(logfile, 'w').close()
+            starttime = datetime(2024, 1, 1, 0, 0, seconds)
+            exporter.export(SimpleNamespace(
+                relpath=f'testcases/{caseid}.py', result=result, logfile=logfile,
+                jsonlfile=logfile.replace('.html', '.jsonl'), starttime=starttime,
+                endtime=starttime + timedelta(seconds=1), duration=timedelta(seconds=1)
+            ))
+        def summary():
+            with open(os.path.join(logroot, 'report_data', 'live.js'), encoding='utf8') as f:
+                return json.loads(f.read()[len('updateLive('):-len(');\n')])
+        exporter = LiveReport()
+        with patch.object(report_module, 'CHUNK_SIZE', 2):
+            exporter.start(logroot)
+            with open(exporter.filepath, encoding='utf8') as f:
+                self.assertIn('var LIVE = "report_data/live.js";', f.read())
+            self.assertEqual(summary()['total'], 0)
+            finish('tc_a', 'PASS', 0)
+            open(os.path.join(logroot, 'testcases', 'tc_b.attempt1.html'), 'w').close()
+            finish('tc_b', 'PASS', 2)
+            finish('tc_c', 'FAIL', 4)
+            data = summary()
+            self.assertEqual(data['counter'], {'PASS': 1, 'FLAKY': 1, 'FAIL': 1})
+            self.assertEqual(data['chunks'], ['report_data/live_0000.js',
+                                              'report_data/live_0001.js'])
+            self.assertEqual(data['duration'], '0:00:05')
+            self.assertFalse(data['finished'])
+            with open(os.path.join(logroot, data['chunks'][1]), encoding='utf8') as f:
+                self.assertEqual(f.read(), 'addCases(%s);\n' % json.dumps([[
+                    'testcases/tc_c.py', '2024-01-01 00:00:04', '2024-01-01 00:00:05',
+                    '0:00:01', 'FAIL', 'testcases/tc_c.html', 1
+                ]]))
+            exporter.finish()
+        self.assertTrue(summary()['finished'])
 
 
 if __name__ == '__main__':
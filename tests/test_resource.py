@@ -0,0 +1,82 @@
+import os
+import sys
+import unittest
+import doctest
+sys.path.append(os.path.abspath(f'{__file__}/../..'))
+
+from unittest.mock import patch, mock_open
+
+from xbot.framework import resource
+from xbot.framework.resource import ResourceLocks
+from xbot.framework.testbed import TestBed
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(resource))
+    return tests
+
+
+class TestResource(unittest.TestCase):
+    """
+    Unit tests for resource module.
+    """
+    @classmethod
+    def setUpClass(cls):
+        content = """
+        hosts:
+          - name: h1
+          - name: h2
+        db: 10.0.0.1
+        """
+        with patch("builtins.open", mock_open(read_data=content.encode())):
+            cls.testbed = TestBed('./testbed.yml')
+
+    def test_exclusive(self):
+        """
+        A single resource is held by one testcase at a time.
+        """
+        locks = ResourceLocks(self.testbed)
+        allocation = locks.acquire(['db'])
+        self.assertEqual(allocation, {'db': '10.0.0.1'})
+        self.assertIsNone(locks.acquire(['db']))
+        locks.release(allocation)
+        self.assertIsNotNone(locks.acquire(['db']))
+
+    def test_pool(self):
+        """
+        A list is a pool, each testcase gets one free item.
+        """
+        locks = ResourceLocks(self.testbed)
+        a1 = locks.acquire(['hosts'])
+        a2 = locks.acquire(['hosts'])
+        self.assertEqual([a1['hosts']['name'], a2['hosts']['name']], ['h1', 'h2'])
+        self.assertIsNone(locks.acquire(['hosts']))
+        locks.release(a1)
+        self.assertEqual(locks.acquire(['hosts']), {'hosts': {'name': 'h1'}})
+
+    def test_all_or_nothing(self):
+        """
+        Nothing is held if any resource is in use, the same value declared
+        by different expressions conflicts.
+        """
+        locks = ResourceLocks(self.testbed)
+        held = locks.acquire(['hosts[1]'])
+        self.assertEqual(locks.acquire(['db', 'hosts[?name==`"h2"`]|[0]']), None)
+        self.assertIsNotNone(locks.acquire(['db']))
+        locks.release(held)
+        self.assertEqual(locks.acquire(['hosts', 'hosts[0]']),
+                         {'hosts': {'name': 'h2'}, 'hosts[0]': {'name': 'h1'}})
+
+    def test_own(self):
+        """
+        A testcase never conflicts with itself.
+        """
+        locks = ResourceLocks(self.testbed)
+        self.assertEqual(locks.acquire(['hosts[0]', 'hosts[?name==`"h1"`]|[0]', 'nothing']),
+                         {'hosts[0]': {'name': 'h1'}, 
+                          'hosts[?name==`"h1"`]|[0]': {'name': 'h1'}, 
+                          'nothing': None})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
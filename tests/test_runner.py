@@ -5,14 +5,20 @@ import unittest
 import tempfile
 import shutil
 import logging
+import time
+import textwrap
 
 from io import StringIO
+from typing import Any
 from unittest.mock import patch
 
 from xbot.framework import utils
 from xbot.framework.testbed import TestBed
 from xbot.framework.testset import TestSet
 from xbot.framework.runner import Runner
+from xbot.framework.report import gen_report, read_summary
+from xbot.framework.abort import AbortPolicy
+from xbot.framework.ordering import FailureOrder
 from xbot.framework.common import INIT_DIR
 from xbot.framework.logger import ROOT_LOGGER
 
@@ -62,14 +68,30 @@ class TestRunner(unittest.TestCase):
         if os.path.exists(logdir):
             shutil.rmtree(logdir)
 
-    def run_testset(self, filename: str) -> tuple[str, str]:
+    def run_testset(
+        self,
+        filename: str,
+        workers: int = 1,
+        force_install: bool = False,
+        abort: AbortPolicy | None = None,
+        order: FailureOrder | None = None,
+        select: list[str] | None = None
+    ) -> tuple[str, str]:
         """
         Run a testset from the copied example project.
 
         :param filename: Testset filename.
+        :param workers: Number of workers.
+        :param force_install: Run install testcases anyway.
+        :param abort: Abort policy.
+        :param order: Order of test testcases.
+        :param select: Test testcases kept(see `TestSet.select`).
         :return: Log root and captured stdout.
         """
         with utils.cd(self.workdir):
+            testset = TestSet(os.path.join(self.workdir, 'testsets', filename))
+            if select is not None:
+                testset.select(select)
             runner = Runner(
                 TestBed(
                     os.path.join(
@@ -78,7 +100,11 @@ class TestRunner(unittest.TestCase):
                         'testbed_example.yml',
                     ),
                 ),
-                TestSet(os.path.join(self.workdir, 'testsets', filename)),
+                testset,
+                workers=workers,
+                force_install=force_install,
+                abort=abort,
+                order=order,
             )
             with patch('sys.stdout', new_callable=StringIO) as stdout:
                 with patch('sys.stderr', new_callable=StringIO):
@@ -95,6 +121,73 @@ class TestRunner(unittest.TestCase):
             m = re.search(rf'<td id="result" colspan="2">(.+)</td>', f.read())
             return m.group(1)
 
+    def write_file(self, path: str, content: str) -> str:
+        """
+        Write a file into the copied project, parent directories are created.
+
+        :param path: Filepath relative to the project directory.
+        :param content: File content.
+        :return: Absolute filepath.
+        """
+        filepath = os.path.join(self.workdir, path)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, 'w', encoding='utf8') as f:
+            f.write(content)
+        return filepath
+
+    def write_case(self, path: str, body: str = '', imports: str = '', **attrs: Any) -> str:
+        """
+        Write a testcase into the copied project, its directory is made a
+        package and project modules imported before are dropped.
+
+        :param path: Testcase path relative to the project directory, the
+                     class is named after the file.
+        :param body: Class body after the attributes, `setup`, `step1` and
+                     `teardown` not defined in it do nothing.
+        :param imports: Module level source before the class.
+        :param attrs: Class attributes, `TAGS` defaults to `['tag1']`.
+        :return: `path`.
+        """
+        caseid = os.path.basename(path).removesuffix('.py')
+        attrs.setdefault('TAGS', ['tag1'])
+        body = textwrap.dedent(body).strip('\n')
+        for stage in ('setup', 'step1', 'teardown'):
+            if f'def {stage}(' not in body:
+                body += f'\n\ndef {stage}(self):\n    pass'
+        lines = [f'{name} = {value!r}' for name, value in attrs.items()]
+        source = f'{textwrap.dedent(imports).strip()}\nfrom lib.testcase import TestCase\n\n\n' \
+                 f'class {caseid}(TestCase):\n' + \
+                 textwrap.indent('\n'.join(lines) + '\n\n' + body.strip('\n'), '    ') + '\n'
+        init = os.path.join(os.path.dirname(path), '__init__.py')
+        if not os.path.exists(os.path.join(self.workdir, init)):
+            self.write_file(init, '')
+        self.write_file(path, source)
+        self._clear_project_modules()
+        return path
+
+    def write_testset(
+        self,
+        filename: str,
+        test: list[str] | tuple[str, ...] = (),
+        install: list[str] | tuple[str, ...] = (),
+        **options: Any
+    ) -> str:
+        """
+        Write a testset including `tag1` into the copied project.
+
+        :param filename: Testset filename.
+        :param test: Test testcase paths.
+        :param install: Install testcase paths.
+        :param options: Other testset options, e.g. `retries`.
+        :return: `filename`.
+        """
+        lines = ['tags:', '  include:', '    - tag1', '  exclude:']
+        lines += [f'{name}: {value}' for name, value in options.items()]
+        lines += ['testcases:', '  install:'] + [f'    - {p}' for p in install]
+        lines += ['  test:'] + [f'    - {p}' for p in test]
+        self.write_file(os.path.join('testsets', filename), '\n'.join(lines) + '\n')
+        return filename
+
     def test_run(self):
         """
         Test `Runner.run` method.
@@ -134,27 +227,54 @@ class TestRunner(unittest.TestCase):
             'ERROR'
         )
 
+    def test_preload(self):
+        """
+        All import errors are reported before execution starts.
+        """
+        _, output = self.run_testset('testset_example.yml')
+        self.assertIn('2 testcase(s) can not be imported:', output)
+        first = output.index('(1/')
+        for caseid in ('tc_eg_nonpass_error_clsname', 'tc_eg_nonpass_error_syntax'):
+            self.assertLess(output.index(f'{caseid}.py: '), first)
+
+    def test_evict_pools(self):
+        """
+        Expired idle pooled resources are closed as testcases finish.
+        """
+        with patch.object(TestBed, 'evict_pools', autospec=True) as mockevict:
+            logroot, _ = self.run_testset('testset_example.yml')
+        finished = sum(f.endswith('.jsonl') for _, _, files in os.walk(logroot)
+                       for f in files)
+        self.assertGreater(finished, 0)
+        self.assertEqual(mockevict.call_count, finished)
+
+    def test_nothing_selected(self):
+        """
+        An execution without testcases(e.g. no test testcase affected by
+        the changes and no install testcase) still gets a report.
+        """
+        filename = self.write_testset(
+            'testset_nothing_selected.yml',
+            test=['testcases/examples/pass/tc_eg_pass_get_values_from_testbed.py'],
+        )
+        logroot, _ = self.run_testset(filename, select=[])
+        report, allpassed = gen_report(logroot)
+        self.assertTrue(allpassed)
+        with open(report, encoding='utf8') as f:
+            self.assertIn('0:00:00', f.read())
+
     def test_failed_install_interrupts_execution(self):
         """
         Stop remaining install and test cases after an install failure.
         """
-        filename = 'testset_install_failed.yml'
-        filepath = os.path.join(self.workdir, 'testsets', filename)
-        with open(filepath, 'w', encoding='utf8') as testset_file:
-            testset_file.write(
-                """
-tags:
-  include:
-    - tag1
-  exclude:
-testcases:
-  install:
-    - testcases/examples/inst/tc_eg_install_the_software_to_be_tested_failed.py
-    - testcases/examples/inst/tc_eg_install_the_software_to_be_tested_successful.py
-  test:
-    - testcases/examples/pass/tc_eg_pass_get_values_from_testbed.py
-""",
-            )
+        filename = self.write_testset(
+            'testset_install_failed.yml',
+            install=[
+                'testcases/examples/inst/tc_eg_install_the_software_to_be_tested_failed.py',
+                'testcases/examples/inst/tc_eg_install_the_software_to_be_tested_successful.py',
+            ],
+            test=['testcases/examples/pass/tc_eg_pass_get_values_from_testbed.py'],
+        )
 
         logroot, output = self.run_testset(filename)
         failed = os.path.join(
@@ -184,5 +304,290 @@ testcases:
         self.assertFalse(os.path.exists(tested))
         self.assertIn('Execution was interrupted', output)
 
+    def test_install_cache(self):
+        """
+        Skip install testcases whose fingerprints match the last successful install.
+        """
+        casepath = 'testcases/examples/cached/tc_eg_install_cached.py'
+        def write_case(version):
+            self.write_case(casepath, f"""
+                FINGERPRINT = lambda tb: [{version!r}, tb.get('example.ssh.host')]
+            """, TIMEOUT=10, FAILFAST=True, TAGS=[])
+        filename = self.write_testset(
+            'testset_install_cached.yml',
+            install=[casepath],
+            test=['testcases/examples/pass/tc_eg_pass_get_values_from_testbed.py'],
+        )
+        installed = os.path.join('testcases', 'examples', 'cached',
+                                 'tc_eg_install_cached.html')
+        tested = os.path.join('testcases', 'examples', 'pass',
+                              'tc_eg_pass_get_values_from_testbed.html')
+        write_case('1.0')
+        logroot, output = self.run_testset(filename)
+        self.assertTrue(os.path.exists(os.path.join(logroot, installed)))
+        self.assertNotIn('Install testcases are skipped', output)
+        # Same fingerprints, install testcases are skipped.
+        logroot, output = self.run_testset(filename)
+        self.assertFalse(os.path.exists(os.path.join(logroot, installed)))
+        self.assertTrue(os.path.exists(os.path.join(logroot, tested)))
+        self.assertIn('Install testcases are skipped', output)
+        logroot, _ = self.run_testset(filename, force_install=True)
+        self.assertTrue(os.path.exists(os.path.join(logroot, installed)))
+        # Fingerprint changed.
+        write_case('1.1')
+        logroot, _ = self.run_testset(filename)
+        self.assertTrue(os.path.exists(os.path.join(logroot, installed)))
+
+    def test_abort(self):
+        """
+        Abort the execution at the first failure: the running testcase is
+        cancelled(teardown still runs), the others are NOT_RUN.
+        """
+        marker = os.path.join(self.workdir, 'testcases', 'examples', 'abort', 'teardown')
+        steps = {
+            'tc_eg_abort_slow': 'self.sleep(30)',
+            'tc_eg_abort_fail': 'self.sleep(0.5); assert False',
+            'tc_eg_abort_later_1': 'pass',
+            'tc_eg_abort_later_2': 'pass',
+        }
+        casepaths = [
+            self.write_case(f'testcases/examples/abort/{caseid}.py', f"""
+                def step1(self):
+                    {step}
+
+                def teardown(self):
+                    open({marker!r} + '_{caseid}', 'w').close()
+            """, TIMEOUT=60)
+            for caseid, step in steps.items()
+        ]
+        filename = self.write_testset('testset_abort.yml', test=casepaths)
+        start = time.monotonic()
+        logroot, output = self.run_testset(filename, workers=2,
+                                           abort=AbortPolicy(maxfail=1))
+        self.assertLess(time.monotonic() - start, 20)
+        results = {
+            caseid: read_summary(os.path.join(
+                logroot, 'testcases', 'examples', 'abort', f'{caseid}.jsonl'
+            ))['result']
+            for caseid in steps
+        }
+        self.assertEqual(results, {
+            'tc_eg_abort_slow': 'ERROR',
+            'tc_eg_abort_fail': 'FAIL',
+            'tc_eg_abort_later_1': 'NOT_RUN',
+            'tc_eg_abort_later_2': 'NOT_RUN',
+        })
+        self.assertTrue(os.path.exists(marker + '_tc_eg_abort_slow'))
+        self.assertFalse(os.path.exists(marker + '_tc_eg_abort_later_1'))
+        self.assertIn('Execution was interrupted: 1 testcase(s) failed', output)
+        self.assertIn('2 testcase(s) were not run.', output)
+        with patch('sys.stdout', new_callable=StringIO):
+            report, allpassed = gen_report(logroot)
+        self.assertFalse(allpassed)
+        with open(report, encoding='utf8') as f:
+            self.assertIn('NOT_RUN[2]', f.read())
+
+    def test_failure_order(self):
+        """
+        Test testcases failed recently run first, install testcases keep
+        the testset order.
+        """
+        filename = self.write_testset(
+            'testset_order.yml',
+            install=['testcases/examples/inst/tc_eg_install_the_software_to_be_tested_successful.py'],
+            test=['testcases/examples/pass/tc_eg_pass_get_values_from_testbed.py',
+                  'testcases/examples/pass/tc_eg_pass_create_dirs_and_files.py'],
+        )
+        results = [
+            (1, 'testcases/examples/pass/tc_eg_pass_get_values_from_testbed.py', 'PASS', 1),
+            (1, 'testcases/examples/pass/tc_eg_pass_create_dirs_and_files.py', 'FAIL', 1),
+            (1, 'testcases/examples/inst/tc_eg_install_the_software_to_be_tested_successful.py',
+             'FAIL', 1),
+        ]
+        _, output = self.run_testset(filename, order=FailureOrder(results))
+        self.assertLess(output.index('tc_eg_install_the_software_to_be_tested_successful'),
+                        output.index('tc_eg_pass_create_dirs_and_files'))
+        self.assertLess(output.index('tc_eg_pass_create_dirs_and_files'),
+                        output.index('tc_eg_pass_get_values_from_testbed'))
+
+    def write_flaky_case(self) -> str:
+        """
+        Write a testcase which fails at the first execution only.
+
+        :return: testcase path(relative).
+        """
+        marker = os.path.join(self.workdir, 'testcases', 'examples', 'retry', 'executed')
+        if os.path.exists(marker):
+            os.remove(marker)
+        return self.write_case('testcases/examples/retry/tc_eg_retry_flaky.py', f"""
+            def step1(self):
+                if not os.path.exists({marker!r}):
+                    open({marker!r}, 'w').close()
+                    raise AssertionError('first execution fails')
+        """, imports='import os', TIMEOUT=10, FAILFAST=True)
+
+    def write_retry_testset(self, mode: str) -> str:
+        """
+        Write a testset with a flaky testcase and `retries: 1`.
+
+        :return: testset filename.
+        """
+        return self.write_testset(
+            f'testset_retry_{mode}.yml',
+            test=[self.write_flaky_case(),
+                  'testcases/examples/pass/tc_eg_pass_get_values_from_testbed.py'],
+            retries=1,
+            retry_mode=mode,
+        )
+
+    def test_retry_immediate(self):
+        """
+        Re-execute a failed testcase immediately and keep all attempts.
+        """
+        logroot, output = self.run_testset(self.write_retry_testset('immediate'))
+        casedir = os.path.join(logroot, 'testcases', 'examples', 'retry')
+        self.assertEqual(
+            self.get_case_result_from_logfile(
+                os.path.join(casedir, 'tc_eg_retry_flaky.attempt1.html')),
+            'FAIL',
+        )
+        self.assertEqual(
+            self.get_case_result_from_logfile(
+                os.path.join(casedir, 'tc_eg_retry_flaky.html')),
+            'PASS',
+        )
+        self.assertTrue(os.path.exists(
+            os.path.join(casedir, 'tc_eg_retry_flaky.attempt1.jsonl')))
+        self.assertLess(output.index('tc_eg_retry_flaky [retry 1]'),
+                        output.index('tc_eg_pass_get_values_from_testbed'))
+        report, allpassed = gen_report(logroot)
+        self.assertTrue(allpassed)
+        with open(report, encoding='utf8') as f:
+            self.assertIn('FLAKY[1]', f.read())
+
+    def test_retry_deferred(self):
+        """
+        Re-execute a failed testcase at the end of the execution.
+        """
+        _, output = self.run_testset(self.write_retry_testset('deferred'))
+        self.assertGreater(output.index('tc_eg_retry_flaky [retry 1]'),
+                           output.index('tc_eg_pass_get_values_from_testbed'))
+
+    def test_shared_fixture(self):
+        """
+        A directory scoped fixture is created once for all its testcases,
+        which are scheduled together, and cleaned up after the last one.
+        """
+        eventlog = os.path.join(self.workdir, 'testcases', 'examples', 'fixt', 'events.txt')
+        self.write_file('testcases/examples/fixt/fixtures.py', f"""
+from xbot.framework.fixture import fixture
+
+
+@fixture(scope='directory')
+def workspace(testbed):
+    with open({eventlog!r}, 'a') as f:
+        f.write('create\\n')
+    yield testbed.get('example.key1')
+    with open({eventlog!r}, 'a') as f:
+        f.write('cleanup\\n')
+""")
+        for caseid in ('tc_eg_fixt_1', 'tc_eg_fixt_2'):
+            self.write_case(f'testcases/examples/fixt/{caseid}.py', """
+                def step1(self):
+                    assertx(self.fixture('workspace'), '==', 'value1')
+            """, imports='from xbot.framework.utils import assertx', FIXTURES=['workspace'])
+        filename = self.write_testset(
+            'testset_fixture.yml',
+            test=['testcases/examples/fixt/tc_eg_fixt_1.py',
+                  'testcases/examples/pass/tc_eg_pass_get_values_from_testbed.py',
+                  'testcases/examples/fixt/tc_eg_fixt_2.py'],
+        )
+        logroot, output = self.run_testset(filename)
+        for caseid in ('tc_eg_fixt_1', 'tc_eg_fixt_2'):
+            self.assertEqual(
+                self.get_case_result_from_logfile(
+                    os.path.join(logroot, 'testcases', 'examples', 'fixt',
+                                 f'{caseid}.html')),
+                'PASS',
+            )
+        with open(eventlog, encoding='utf8') as f:
+            self.assertEqual(f.read().split(), ['create', 'cleanup'])
+        self.assertLess(output.index('tc_eg_fixt_2'),
+                        output.index('tc_eg_pass_get_values_from_testbed'))
+
+    def test_params(self):
+        """
+        A parametrized testcase runs once per parameter with its own logfile,
+        sharing a module scoped fixture.
+        """
+        eventlog = os.path.join(self.workdir, 'testcases', 'examples', 'param', 'events.txt')
+        self.write_file('testcases/examples/param/fixtures.py', f"""
+from xbot.framework.fixture import fixture
+
+
+@fixture(scope='module')
+def counter():
+    with open({eventlog!r}, 'a') as f:
+        f.write('create\\n')
+    yield 1
+    with open({eventlog!r}, 'a') as f:
+        f.write('cleanup\\n')
+""")
+        casepath = self.write_case('testcases/examples/param/tc_eg_param.py', """
+            def step1(self):
+                assertx(self.param.value + self.fixture('counter'), '!=', 3)
+        """, imports='from xbot.framework.utils import assertx',
+            FIXTURES=['counter'], PARAMS=[1, 2, 3])
+        filename = self.write_testset('testset_param.yml', test=[casepath])
+        logroot, output = self.run_testset(filename)
+        results = [
+            self.get_case_result_from_logfile(
+                os.path.join(logroot, 'testcases', 'examples', 'param',
+                             f'tc_eg_param[{i}].html'))
+            for i in range(3)
+        ]
+        self.assertEqual(results, ['PASS', 'FAIL', 'PASS'])
+        self.assertIn('tc_eg_param[2]', output)
+        # Progress counts instances.
+        self.assertEqual(sorted(set(re.findall(r'\((\d+/\d+)\)', output))),
+                         ['1/3', '2/3', '3/3'])
+        with open(eventlog, encoding='utf8') as f:
+            self.assertEqual(f.read().split(), ['create', 'cleanup'])
+
+    def test_parallel_resources(self):
+        """
+        Testcases run in parallel unless they use the same resource.
+        """
+        eventlog = os.path.join(self.workdir, 'testcases', 'examples', 'par', 'events.txt')
+        resources = {
+            'tc_eg_par_1': 'example.key1',
+            'tc_eg_par_2': 'example.key1',
+            'tc_eg_par_3': 'example.key3',
+            'tc_eg_par_4': 'example.key3',
+        }
+        for caseid, expr in resources.items():
+            self.write_case(f'testcases/examples/par/{caseid}.py', f"""
+                def step1(self):
+                    start = time.monotonic()
+                    self.sleep(1)
+                    with open({eventlog!r}, 'a') as f:
+                        f.write('{caseid} %s %s %s\\n' % (
+                            self.resource({expr!r}), start, time.monotonic()))
+            """, imports='import time', RESOURCES=[expr])
+        filename = self.write_testset('testset_parallel.yml', test=['testcases/examples/par/'])
+        logroot, output = self.run_testset(filename, workers=4)
+        self.assertEqual(output.count('PASS'), 4)
+        events = {}
+        with open(eventlog, encoding='utf8') as f:
+            for line in f:
+                caseid, value, start, end = line.split()
+                events[caseid] = (value, float(start), float(end))
+        def overlap(a, b):
+            return events[a][1] < events[b][2] and events[b][1] < events[a][2]
+        self.assertFalse(overlap('tc_eg_par_1', 'tc_eg_par_2'))
+        self.assertTrue(overlap('tc_eg_par_1', 'tc_eg_par_3'))
+        self.assertTrue(overlap('tc_eg_par_3', 'tc_eg_par_4'))
+        self.assertNotEqual(events['tc_eg_par_3'][0], events['tc_eg_par_4'][0])
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
@@ -1,8 +1,12 @@
 import os
+import shutil
+import tempfile
 import unittest
 
 from unittest.mock import patch, mock_open
 
+from xbot.framework import testbed
+
 from xbot.framework.testbed import TestBed
 
 class TestTestBed(unittest.TestCase):
@@ -25,7 +29,7 @@ class TestTestBed(unittest.TestCase):
               y: 'i'
         """
         cls.filepath = './testbed.yml'
-        with patch("builtins.open", mock_open(read_data=cls.content)):
+        with patch("builtins.open", mock_open(read_data=cls.content.encode())):
             cls.testbed = TestBed(cls.filepath)
 
     def test_name(self):
@@ -118,6 +122,85 @@ class TestTestBed(unittest.TestCase):
         value = self.testbed.get("a.b3[?x==`3`].x")
         self.assertEqual(value, [])
 
+    def test_overlays(self):
+        """
+        Overlays are merged over the testbed in order.
+        """
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        files = {
+            'base.yml': 'a:\n  b: 1\n  c: [1, 2]\nhosts: !include hosts.yml\n',
+            'hosts.yml': 'h1: {ip: 10.0.0.1}\n',
+            'staging.yml': 'a:\n  c: [3]\nhosts:\n  h1: {port: 22}\n',
+            'local.yml': 'a:\n  b: 2\n',
+        }
+        for name, content in files.items():
+            with open(os.path.join(tmpdir, name), 'w', encoding='utf8') as f:
+                f.write(content)
+        paths = [os.path.join(tmpdir, n) for n in ('base.yml', 'staging.yml', 'local.yml')]
+        testbed = TestBed(paths[0], paths[1:])
+        self.assertEqual(testbed.get('a'), {'b': 2, 'c': [3]})
+        self.assertEqual(testbed.get('hosts.h1'), {'ip': '10.0.0.1', 'port': 22})
+        self.assertEqual(testbed.overlays, paths[1:])
+        self.assertIn(f'# Overlay: {paths[2]}\na:\n  b: 2\n', testbed.content)
+
+    def test_included_functions(self):
+        """
+        JMESPath functions and dict copies see included sections resolved.
+        """
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        files = {
+            'base.yml': 'a: {b: 1}\nhosts: !include hosts.yml\n',
+            'hosts.yml': 'h1: {ip: 10.0.0.1}\nh2: {ip: 10.0.0.2}\n',
+        }
+        for name, content in files.items():
+            with open(os.path.join(tmpdir, name), 'w', encoding='utf8') as f:
+                f.write(content)
+        testbed = TestBed(os.path.join(tmpdir, 'base.yml'))
+        self.assertEqual(testbed.get('sort(keys(@))'), ['a', 'hosts'])
+        self.assertEqual(testbed.get('length(@)'), 2)
+        self.assertEqual(testbed.get('sort(keys(hosts))'), ['h1', 'h2'])
+        self.assertEqual(testbed.get('merge(@, `{"c": 2}`).hosts.h2.ip'), '10.0.0.2')
+        data = testbed._TestBed__data
+        expected = {'a': {'b': 1}, 'hosts': {'h1': {'ip': '10.0.0.1'}, 'h2': {'ip': '10.0.0.2'}}}
+        self.assertEqual(dict(data), expected)
+        self.assertEqual({**data}, expected)
+        copy = {}
+        copy.update(data)
+        self.assertEqual(copy, expected)
+
+    def test_indexes(self):
+        """
+        Lookups and filters on indexed keys.
+        """
+        class IndexedTestBed(TestBed):
+            INDEXES = {'hosts': ['name', 'role'], 'a.b3': ['x']}
+        hosts = ''.join(f'  - {{name: host{i}, role: {"db" if i % 2 else "web"}}}\n'
+                        for i in range(1000))
+        content = 'a:\n  b1: c\n  b3:\n    - {x: 1}\n    - {x: 2, y: i}\n' \
+                  'hosts:\n' + hosts + '  - null\n'
+        with patch("builtins.open", mock_open(read_data=content.encode())):
+            tb = IndexedTestBed(self.filepath)
+        self.assertEqual(tb.lookup('hosts', 'name', 'host7'), [{'name': 'host7', 'role': 'db'}])
+        self.assertEqual(len(tb.lookup('hosts', 'role', 'web')), 500)
+        self.assertEqual(tb.lookup('hosts', 'name', 'nohost'), [])
+        self.assertEqual(tb.lookup('a.b3', 'x', 2), [{'x': 2, 'y': 'i'}])
+        self.assertEqual(tb.lookup('a.b3', 'x', True), [])
+        with self.assertRaisesRegex(KeyError, 'No index'):
+            tb.lookup('hosts', 'ip', '10.0.0.1')
+        exprs = ["hosts[?name=='host7']", "hosts[?role=='db'] | [0]", 'a.b3[?x==`2`]',
+                 'a.b3[?x==`3`]|[0]', "hosts[?name==`null`]"]
+        expected = [testbed.jmespath.search(e, tb._TestBed__data) for e in exprs]
+        with patch.object(testbed.jmespath, 'search') as mocksearch:
+            self.assertEqual([tb.get(e) for e in exprs], expected)
+            mocksearch.assert_not_called()
+        # Other expressions are searched by JMESPath.
+        self.assertEqual(tb.get("hosts[?name=='host7'].role"), ['db'])
+        self.assertEqual(tb.get("hosts[?ip=='10.0.0.1']"), [])
+        with self.assertRaisesRegex(ValueError, 'not a list'):
+            tb.add_index('a.b1', 'x')
+
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
@@ -8,14 +8,16 @@ import logging
 from importlib import util
 from io import StringIO
 from datetime import datetime, timedelta
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, PropertyMock, patch
+from threading import Thread
 
 from xbot.framework import utils
 from xbot.framework.testcase import TestCase
 from xbot.framework.testbed import TestBed
 from xbot.framework.testset import TestSet
 from xbot.framework.common import INIT_DIR
-from xbot.framework.logger import ROOT_LOGGER
+from xbot.framework.logger import ROOT_LOGGER, read_jsonl
+from xbot.framework.param import Param
 
 
 class TestTestCase(unittest.TestCase):
@@ -103,6 +105,39 @@ class TestTestCase(unittest.TestCase):
         self.assertEqual(caseinst.endtime - caseinst.starttime, caseinst.duration)
         self.assertEqual(caseinst.result, 'PASS')
         self.assertTrue(os.path.exists(caseinst.logfile))
+        self.assertTrue(os.path.exists(caseinst.jsonlfile))
+
+    def test_param_paths(self):
+        """
+        The parameter index is inserted before the `.py` suffix only.
+        """
+        caseid = 'tc_eg_pass_get_values_from_testbed'
+        casecls = type(self.instcase('pass', caseid))
+        caseinst = casecls(self.testbed, self.testset, self.logroot, Param(2, 'x'))
+        abspath = os.path.join(os.sep, 'a.py', 'testcases', 'b.py', f'{caseid}.py')
+        with patch.object(casecls, 'abspath', new_callable=PropertyMock,
+                          return_value=abspath):
+            self.assertEqual(caseinst.caseid, f'{caseid}[2]')
+            self.assertEqual(caseinst.relpath, f'testcases/b.py/{caseid}[2].py')
+            self.assertEqual(caseinst.logfile, os.path.join(
+                self.logroot, 'testcases', 'b.py', f'{caseid}[2].html'))
+            self.assertEqual(caseinst.jsonlfile, os.path.join(
+                self.logroot, 'testcases', 'b.py', f'{caseid}[2].jsonl'))
+
+    def test_jsonl_only(self):
+        caseid = 'tc_eg_pass_create_dirs_and_files'
+        caseinst = self.instcase('pass', caseid)
+        caseinst.run(html=False)
+        self.assertEqual(caseinst.result, 'PASS')
+        self.assertFalse(os.path.exists(caseinst.logfile))
+        objs = list(read_jsonl(caseinst.jsonlfile))
+        self.assertEqual(objs[0]['type'], 'case')
+        self.assertEqual(objs[0]['caseid'], caseid)
+        self.assertEqual(objs[-1]['type'], 'result')
+        self.assertEqual(objs[-1]['result'], 'PASS')
+        stages = [o['stage'] for o in objs if o['type'] == 'record']
+        self.assertEqual(stages[0], 'setup')
+        self.assertEqual(stages[-1], 'teardown')
 
     def test_tc_eg_nonpass_fail_setup_with_failfast_false(self):
         caseid = 'tc_eg_nonpass_fail_setup_with_failfast_false'
@@ -202,5 +237,285 @@ class TestTestCase(unittest.TestCase):
         self.assertTrue(os.path.exists(caseinst.logfile))
 
 
+    def write_case(self, caseid: str, body: str) -> TestCase:
+        """
+        Write a testcase under `nonpass` of the copied project and 
+        instantiate it.
+
+        :param caseid: Testcase id.
+        :param body: Class body.
+        """
+        path = os.path.join(self.workdir, 'testcases', 'examples',
+                            'nonpass', f'{caseid}.py')
+        with open(path, 'w', encoding='utf8') as f:
+            f.write('import time\n'
+                    'from xbot.framework.utils import CancelToken\n'
+                    'from lib.testcase import TestCase\n\n\n'
+                    f'class {caseid}(TestCase):\n'
+                    "    TAGS = ['tag1']\n" + body)
+        return self.instcase('nonpass', caseid)
+
+    def test_step_timeout(self):
+        """
+        A timed out step is cancelled promptly, remaining steps are skipped
+        and teardown still runs.
+        """
+        caseinst = self.write_case('tc_step_timeout', """
+    TIMEOUT = 30
+    STEP_TIMEOUTS = {'step1': 1}
+
+    def setup(self):
+        pass
+
+    def step1(self):
+        self.sleep(20)
+
+    def step2(self):
+        pass
+
+    def teardown(self):
+        pass
+""")
+        caseinst.step2 = MagicMock()
+        caseinst.teardown = MagicMock()
+        caseinst.run()
+        self.assertEqual(caseinst.result, 'TIMEOUT')
+        self.assertIn('Step `step1` did not complete within 1 second(s).',
+                      caseinst.errmsg)
+        caseinst.step2.assert_not_called()
+        caseinst.teardown.assert_called_once()
+        self.assertLess(caseinst.duration.seconds, 5)
+
+    def test_step_timeout_forced(self):
+        """
+        A step ignoring the cancellation token is forced to end.
+        """
+        caseinst = self.write_case('tc_step_timeout_forced', """
+    STEP_TIMEOUTS = {'step1': 1}
+
+    def setup(self):
+        pass
+
+    def step1(self):
+        while True:
+            time.sleep(0.01)
+
+    def teardown(self):
+        self.info('cancelled: %s', CancelToken.current().cancelled)
+""")
+        caseinst.run(html=False)
+        self.assertEqual(caseinst.result, 'TIMEOUT')
+        self.assertLess(caseinst.duration.seconds, 5)
+        messages = [r['message'] for r in read_jsonl(caseinst.jsonlfile)
+                    if r['type'] == 'record' and r['stage'] == 'teardown']
+        self.assertEqual(messages, ['cancelled: False'])
+
+    def test_cancel_token_in_library(self):
+        """
+        Library waits see the token of the running stage.
+        """
+        caseinst = self.write_case('tc_cancel_token', """
+    TIMEOUT = 1
+
+    def setup(self):
+        pass
+
+    def step1(self):
+        token = CancelToken.current()
+        while True:
+            token.wait(0.1)
+
+    def teardown(self):
+        pass
+""")
+        caseinst.run()
+        self.assertEqual(caseinst.result, 'TIMEOUT')
+        self.assertIn('Execution did not complete within 1 second(s).',
+                      caseinst.errmsg)
+
+    def test_async_steps(self):
+        """
+        `async def` steps run on the shared loop, records are attributed 
+        to their testcase and stage.
+        """
+        body = """
+    def setup(self):
+        self.info('sync setup')
+
+    async def step1(self):
+        await self.asleep(0.5)
+        self.info('async step1 of %s', self.caseid)
+
+    async def teardown(self):
+        self.info('async teardown')
+"""
+        cases = [self.write_case(f'tc_async_{i}', body) for i in range(2)]
+        threads = [Thread(target=c.run, kwargs={'html': False}) for c in cases]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for caseinst in cases:
+            self.assertEqual(caseinst.result, 'PASS')
+            records = [(r['stage'], r['message']) 
+                       for r in read_jsonl(caseinst.jsonlfile)
+                       if r['type'] == 'record']
+            self.assertEqual(records, [
+                ('setup', 'sync setup'),
+                ('step1', 'Sleep 0.5 second(s)...'),
+                ('step1', f'async step1 of {caseinst.caseid}'),
+                ('teardown', 'async teardown')
+            ])
+
+    def test_async_step_timeout(self):
+        """
+        A timed out `async def` step is cancelled as a task.
+        """
+        caseinst = self.write_case('tc_async_timeout', """
+    STEP_TIMEOUTS = {'step1': 1}
+
+    def setup(self):
+        pass
+
+    async def step1(self):
+        import asyncio
+        await asyncio.sleep(20)
+
+    async def teardown(self):
+        self.info('cancelled: %s', CancelToken.current().cancelled)
+""")
+        caseinst.run(html=False)
+        self.assertEqual(caseinst.result, 'TIMEOUT')
+        self.assertIn('Step `step1` did not complete', caseinst.errmsg)
+        self.assertLess(caseinst.duration.seconds, 5)
+        messages = [r['message'] for r in read_jsonl(caseinst.jsonlfile)
+                    if r['type'] == 'record' and r['stage'] == 'teardown']
+        self.assertEqual(messages, ['cancelled: False'])
+
+    def test_wait_until(self):
+        """
+        `wait_until` returns early, logs one line per wait and is limited
+        to the remaining time of the step, the step times out then.
+        """
+        caseinst = self.write_case('tc_wait_until', """
+    STEP_TIMEOUTS = {'step2': 1}
+
+    def setup(self):
+        self.ready = time.monotonic() + 0.5
+
+    def step1(self):
+        assert self.wait_until(lambda: time.monotonic() > self.ready, 10,
+                               interval=0.05, desc='ready')
+
+    def step2(self):
+        self.wait_until(lambda: False, 30, max_interval=0.2)
+
+    def teardown(self):
+        pass
+""")
+        caseinst.run(html=False)
+        self.assertEqual(caseinst.result, 'TIMEOUT')
+        self.assertEqual(caseinst.errmsg,
+                         'TestCaseTimeout: Step `step2` did not complete within 1 second(s).')
+        ready, never = caseinst.waits
+        self.assertEqual((ready['stage'], ready['desc'], ready['satisfied']),
+                         ('step1', 'ready', True))
+        self.assertLess(ready['duration'], 2)
+        self.assertLess(ready['polls'], 8)
+        self.assertEqual((never['desc'], never['satisfied']), ('<lambda>', False))
+        self.assertLessEqual(never['timeout'], 1)
+        records = [r for r in read_jsonl(caseinst.jsonlfile)
+                   if r['type'] == 'record' and r['stage'] == 'step1']
+        self.assertEqual(len(records), 1)
+        self.assertRegex(records[0]['message'], 
+                         r'Wait until ready: satisfied after .+, \d poll\(s\)\.')
+        self.assertEqual(len([r for r in read_jsonl(caseinst.jsonlfile) 
+                              if r['type'] == 'wait']), 2)
+
+    def test_await_until(self):
+        """
+        `await_until` does not block the event loop in `async def` steps,
+        `wait_until` is refused there.
+        """
+        caseinst = self.write_case('tc_await_until', """
+    STEP_TIMEOUTS = {'step2': 1}
+
+    def setup(self):
+        self.ready = False
+
+    async def step1(self):
+        import asyncio
+        async def set_ready():
+            await asyncio.sleep(0.3)
+            self.ready = True
+        await asyncio.gather(self.await_until(lambda: self.ready, 5, desc='ready'),
+                             set_ready())
+        try:
+            self.wait_until(lambda: True, 1)
+        except RuntimeError as e:
+            self.info('refused: %s', e)
+
+    async def step2(self):
+        await self.await_until(lambda: False, 30, max_interval=0.2)
+
+    def teardown(self):
+        pass
+""")
+        caseinst.run(html=False)
+        self.assertEqual(caseinst.result, 'TIMEOUT')
+        self.assertEqual(caseinst.errmsg,
+                         'TestCaseTimeout: Step `step2` did not complete within 1 second(s).')
+        ready, never = caseinst.waits
+        self.assertEqual((ready['stage'], ready['satisfied']), ('step1', True))
+        self.assertLess(ready['duration'], 2)
+        self.assertEqual((never['stage'], never['satisfied']), ('step2', False))
+        messages = [r['message'] for r in read_jsonl(caseinst.jsonlfile)
+                    if r['type'] == 'record' and r['stage'] == 'step1']
+        self.assertRegex(messages[-1], r'^refused: `wait_until` blocks the event loop')
+
+    def test_wait_until_timeout(self):
+        """
+        A wait not satisfied within its own `timeout` fails the step.
+        """
+        caseinst = self.write_case('tc_wait_until_timeout', """
+    def setup(self):
+        pass
+
+    def step1(self):
+        self.wait_until(lambda: False, 0.3, desc='never')
+
+    def teardown(self):
+        pass
+""")
+        caseinst.run(html=False)
+        self.assertEqual(caseinst.result, 'FAIL')
+        self.assertIn('TimeoutError', caseinst.errmsg)
+
+    def test_checkout(self):
+        """
+        Pooled resources are returned when the testcase ends and reused by
+        the next one.
+        """
+        created = []
+        self.testbed.register_resource('res', lambda key: created.append(key) or key)
+        body = """
+    def setup(self):
+        pass
+
+    def step1(self):
+        assert self.checkout('res', 'k1') == 'k1'
+
+    def teardown(self):
+        pass
+"""
+        for caseid in ('tc_checkout_1', 'tc_checkout_2'):
+            caseinst = self.write_case(caseid, body)
+            caseinst.run(html=False)
+            self.assertEqual(caseinst.result, 'PASS')
+        self.assertEqual(created, ['k1'])
+        self.assertEqual(self.testbed.pool('res', 'k1').idle, 1)
+        self.testbed.close_pools()
+        self.assertEqual(self.testbed.pool('res', 'k1').size, 0)
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
@@ -60,7 +60,7 @@ class TestTestSet(unittest.TestCase):
         """
         Mock a TestSet object.
         """
-        with patch("builtins.open", mock_open(read_data=content)):
+        with patch("builtins.open", mock_open(read_data=content.encode())):
             return TestSet('testset.yml')
 
     def test_document_not_dict(self):
@@ -193,6 +193,59 @@ class TestTestSet(unittest.TestCase):
         with self.assertRaises(TestSetError):
             self.mock_testset(content)
 
+    def test_retries(self):
+        """
+        Test retries and retry_mode properties.
+        """
+        content = """
+        tags:
+          include:
+          exclude:
+        retries: 2
+        retry_mode: deferred
+        testcases:
+          install:
+          test:
+        """
+        testset = self.mock_testset(content)
+        self.assertEqual(testset.retries, 2)
+        self.assertEqual(testset.retry_mode, 'deferred')
+
+    def test_retries_default(self):
+        """
+        Expect no retries and immediate mode by default.
+        """
+        content = """
+        tags:
+          include:
+          exclude:
+        testcases:
+          install:
+          test:
+        """
+        testset = self.mock_testset(content)
+        self.assertEqual(testset.retries, 0)
+        self.assertEqual(testset.retry_mode, 'immediate')
+
+    def test_retries_invalid(self):
+        """
+        Expect TestSetError when retries or retry_mode is invalid.
+        """
+        for extra in ('retries: -1', 'retries: yes', 'retries: x',
+                      'retry_mode: later'):
+            content = f"""
+            tags:
+              include:
+              exclude:
+            {extra}
+            testcases:
+              install:
+              test:
+            """
+            with self.subTest(extra=extra):
+                with self.assertRaisesRegex(TestSetError, 'retr'):
+                    self.mock_testset(content)
+
     def test_testcases(self):
         """
         Test testcase groups and directory expansion.
@@ -221,6 +274,31 @@ class TestTestSet(unittest.TestCase):
             ),
         )
 
+    def test_select(self):
+        """
+        `select` narrows test testcases, install testcases are kept.
+        """
+        content = """
+        tags:
+          include:
+          exclude:
+        testcases:
+          install:
+            - testcases/dir1/tc_01.py
+          test:
+            - testcases/dir2
+        """
+        testset = self.mock_testset(content)
+        testset.select(['testcases/dir2/subdir2_1/tc_06.py', 'testcases/dir2/tc_03.py',
+                        'testcases/dir1/tc_02.py'])
+        expected = TestCases(
+            install=('testcases/dir1/tc_01.py',),
+            test=('testcases/dir2/tc_03.py', 'testcases/dir2/subdir2_1/tc_06.py'),
+        )
+        self.assertEqual(testset.testcases, expected)
+        testset.select(['testcases/dir2/tc_04.py'])
+        self.assertEqual(testset.testcases.test, ())
+
     def test_testcases_empty(self):
         """
         Expect empty tuples when testcase groups are empty.
@@ -2,6 +2,7 @@ import unittest
 import doctest
 import socket
 import threading
+import itertools
 import time
 import sys
 import os
@@ -86,6 +87,130 @@ class TestUtils(unittest.TestCase):
             self.assertEqual(os.getcwd(), parent)
         self.assertEqual(os.getcwd(), cwd)
 
+    def test_cancel_token(self):
+        """
+        Test `CancelToken`.
+        """
+        token = utils.CancelToken()
+        called = []
+        token.add_callback(lambda: called.append(1))
+        threading.Timer(0.2, token.cancel, args=('stop',)).start()
+        start = time.time()
+        with self.assertRaisesRegex(utils.TestCaseTimeout, 'stop'):
+            token.wait(10)
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(called, [1])
+        token.add_callback(lambda: called.append(2))
+        self.assertEqual(called, [1, 2])
+        def current():
+            token.activate()
+            called.append(utils.CancelToken.current() is token)
+        thread = threading.Thread(target=current)
+        thread.start()
+        thread.join()
+        self.assertEqual(called[-1], True)
+        self.assertIsNot(utils.CancelToken.current(), token)
+
+    def test_assertx_bulk(self):
+        """
+        Bulk assertions log once and report all mismatches at once.
+        """
+        with self.assertLogs(utils.logger, 'INFO') as cm:
+            utils.assertx_all(range(1000), '<', 1000)
+            utils.assertx_each(['a1', 'b2'], 'search', [r'\d', 'b'])
+        self.assertEqual([r.getMessage() for r in cm.records], [
+            'AssertionOK: 1000 item(s) < 1000',
+            'AssertionOK: 2 item(s) search expected',
+        ])
+        with self.assertRaises(AssertionError) as cm:
+            utils.assertx_all(range(100), '<', 50)
+        lines = str(cm.exception).splitlines()
+        self.assertEqual(lines[0], '50 of 100 item(s) not < 50:')
+        self.assertEqual(lines[1:3], ['  [50] 50 < 50', '  [51] 51 < 50'])
+        self.assertEqual(lines[-1], f'  ... and {50 - utils.MAX_MISMATCHES} more')
+        with self.assertRaisesRegex(AssertionError, 'Length mismatch'):
+            utils.assertx_each([1, 2], '==', [1])
+        # Pairs are consumed lazily, an endless `items` is detected too.
+        with self.assertRaisesRegex(AssertionError, '`expected` has only 3 item'):
+            utils.assertx_each(itertools.count(), '==', range(3))
+        with self.assertNoLogs(utils.logger, 'INFO'):
+            utils.assertx_each(range(3), '==', range(3), verbose=False)
+        with self.assertRaisesRegex(ValueError, 'Invalid operator: ~'):
+            utils.assertx_all([1], '~', 1)
+
+    def test_diff(self):
+        """
+        Bulk comparison of large result sets.
+        """
+        expected = [(i, f'name{i}', i * 0.1) for i in range(100000)]
+        actual = [(i, n, v + 1e-9) for i, n, v in reversed(expected)]
+        with self.assertLogs(utils.logger, 'INFO') as cm:
+            utils.assert_no_diff(utils.diff_rows(actual, expected, key=0, tolerance=1e-6))
+        self.assertEqual([r.getMessage() for r in cm.records],
+                         ['AssertionOK: 100000 item(s) equal'])
+        actual[0] = (99999, 'x', 0.0)
+        del actual[1]
+        diff = utils.diff_rows(actual, expected)
+        self.assertEqual(len(diff.missing), 100000)
+        diff = utils.diff_rows(actual, expected, key=0, tolerance=1e-6)
+        self.assertEqual(diff.missing, [(99998, expected[99998])])
+        self.assertEqual(diff.changed, [(99999, actual[0], expected[99999])])
+        with self.assertRaises(AssertionError) as cm:
+            utils.assert_no_diff(diff, 'Query result differs')
+        self.assertEqual(str(cm.exception).splitlines()[:2], [
+            'Query result differs',
+            '1 missing, 0 extra, 1 changed of 100000 expected:'
+        ])
+        diff = utils.diff_sequences([1, 2] * 50, [2, 2] * 50 + [3])
+        self.assertEqual((len(diff.missing), len(diff.changed)), (1, 50))
+        self.assertTrue(diff.summary(3).endswith('  ... and 48 more'))
+        with self.assertRaisesRegex(ValueError, 'Duplicate row key'):
+            utils.diff_rows([(1,), (1,)], [], key=0)
+        with self.assertRaisesRegex(ValueError, 'requires `key`'):
+            utils.diff_rows([], [], tolerance=0.1)
+
+    def test_diff_sequences_numpy(self):
+        """
+        Numbers compared by NumPy(if installed) and by `equals` differ
+        alike, the tolerance only applies to floats.
+        """
+        cases = [
+            (([1, 2, 3], [1, 2, 4], 1), [2]),
+            (([1.0, 2.0, 3.0], [1.0, 2.5, 4.5], 1), [2]),
+            (([2**53 + 1, 1], [2**53, 1.0], None), [0]),
+            (([2**53 + 1, 1], [2**53, 1.0], 0.5), [0]),
+            (([1, 2.0], [1.5, 2.0], 1), []),
+        ]
+        modules = [None] if utils.np is None else [None, utils.np]
+        for module in modules:
+            with patch.object(utils, 'np', module):
+                for (actual, expected, tolerance), changed in cases:
+                    with self.subTest(numpy=module is not None, actual=actual,
+                                      expected=expected, tolerance=tolerance):
+                        diff = utils.diff_sequences(actual, expected, tolerance)
+                        self.assertEqual([i for i, _, _ in diff.changed], changed)
+
+    def test_deepkey(self):
+        """
+        Deepkeys are parsed without evaluating code and cached.
+        """
+        utils.compile_deepkey.cache_clear()
+        for _ in range(3):
+            self.assertEqual(utils.parse_deepkey('a::b[x="1.5]", y=None]::c', '::'),
+                             ['a', 'b', {'x': '1.5]', 'y': None}, 'c'])
+        self.assertEqual(utils.compile_deepkey.cache_info().misses, 1)
+        keys = utils.parse_deepkey('a[x=1]')
+        keys[1]['x'] = 2
+        self.assertEqual(utils.parse_deepkey('a[x=1]'), ['a', {'x': 1}])
+        for deepkey in ('a[x=__import__("os").getcwd()]', 'a[x=1)(y=2]', 'a[0]b', 'a[0',
+                        'a[k={{}: 1}]', 'a[k=' + '-' * 100000 + '1]'):
+            with self.assertRaises(SyntaxError):
+                utils.parse_deepkey(deepkey)
+        data = {'hosts': [{'name': 'h1', 'ips': ['10.0.0.1']}, {'name': 'h2', 'ips': []}]}
+        self.assertEqual(utils.get_deep(data, 'hosts[name="h1"].ips[0]'), '10.0.0.1')
+        self.assertIsNone(utils.get_deep(data, 'hosts[name="h2"].ips[0]'))
+        self.assertIsNone(utils.get_deep(data, 'hosts.name'))
+        self.assertEqual(utils.get_deep(data['hosts'], '[1].name'), 'h2')
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
@@ -0,0 +1,101 @@
+# Copyright (c) 2022-2023, zhaowcheng <zhaowcheng@163.com>
+
+"""
+Run level abort policies.
+
+`FAILFAST` stops the steps of one testcase, an `AbortPolicy` stops the
+whole execution when it is obviously broken:
+
+- `maxfail`: after this many failed testcases;
+- `maxfail_rate`: when more than this percent of the executed(not
+  skipped) testcases failed, checked after `maxfail_rate_after` of them;
+- `stop_on_error`: at the first ERROR(e.g. a testcase can not be imported).
+
+Testcases running at that time are cancelled(their teardown still runs),
+testcases not started yet are reported as NOT_RUN.
+"""
+
+# Results counted as failures.
+FAILURE_RESULTS: tuple[str, ...] = ('FAIL', 'ERROR', 'TIMEOUT')
+
+# Result of the testcases not executed because the execution was aborted.
+NOT_RUN: str = 'NOT_RUN'
+
+
+class AbortPolicy(object):
+    """
+    Decide when to abort the execution by results of finished testcases,
+    not thread-safe(the runner updates it under its lock).
+    """
+    def __init__(
+        self,
+        maxfail: int = 0,
+        maxfail_rate: float = 0,
+        maxfail_rate_after: int = 10,
+        stop_on_error: bool = False
+    ) -> None:
+        """
+        :param maxfail: abort after this many failures, 0 means no limit.
+        :param maxfail_rate: abort when the failure rate(percent) exceeds
+                             this, 0 means no limit.
+        :param maxfail_rate_after: minimum executed testcases before the
+                                   failure rate is checked.
+        :param stop_on_error: abort at the first ERROR.
+        """
+        if maxfail < 0:
+            raise ValueError('`maxfail` must not be negative')
+        if not 0 <= maxfail_rate <= 100:
+            raise ValueError('`maxfail_rate` must be between 0 and 100')
+        if maxfail_rate_after < 1:
+            raise ValueError('`maxfail_rate_after` must be greater than 0')
+        self.maxfail: int = maxfail
+        self.maxfail_rate: float = maxfail_rate
+        self.maxfail_rate_after: int = maxfail_rate_after
+        self.stop_on_error: bool = stop_on_error
+        self.executed: int = 0
+        self.failures: int = 0
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Whether any policy is set.
+        """
+        return bool(self.maxfail or self.maxfail_rate or self.stop_on_error)
+
+    def update(self, result: str | None) -> str | None:
+        """
+        Count the result of a finished testcase.
+
+        >>> policy = AbortPolicy(maxfail=2)
+        >>> [policy.update(r) for r in ('FAIL', 'PASS', 'SKIP')]
+        [None, None, None]
+        >>> policy.update('TIMEOUT')
+        '2 testcase(s) failed (maxfail 2).'
+        >>> policy = AbortPolicy(maxfail_rate=50, maxfail_rate_after=4)
+        >>> [policy.update(r) for r in ('FAIL', 'FAIL', 'FAIL')]
+        [None, None, None]
+        >>> policy.update('PASS')
+        '3/4 testcase(s) failed (75.0% > maxfail rate 50%).'
+        >>> AbortPolicy(stop_on_error=True).update('ERROR')
+        'A testcase got ERROR (stop on error).'
+
+        :param result: final result of the testcase(after retries).
+        :return: reason to abort, None to continue.
+        """
+        if result in (None, 'SKIP', NOT_RUN):
+            return None
+        self.executed += 1
+        if result in FAILURE_RESULTS:
+            self.failures += 1
+            if self.stop_on_error and result == 'ERROR':
+                return 'A testcase got ERROR (stop on error).'
+            if self.maxfail and self.failures >= self.maxfail:
+                return f'{self.failures} testcase(s) failed (maxfail {self.maxfail}).'
+        # Checked for passed testcases too, the rate is not checked before
+        # `maxfail_rate_after` testcases executed.
+        if self.maxfail_rate and self.executed >= self.maxfail_rate_after:
+            rate = 100 * self.failures / self.executed
+            if rate > self.maxfail_rate:
+                return (f'{self.failures}/{self.executed} testcase(s) failed '
+                        f'({rate:.1f}% > maxfail rate {self.maxfail_rate:g}%).')
+        return None
@@ -0,0 +1,45 @@
+# Copyright (c) 2022-2023, zhaowcheng <zhaowcheng@163.com>
+
+"""
+Shared asyncio event loop for `async def` testcase steps.
+
+The loop runs forever in a daemon thread, steps of all testcases are
+submitted to it, so I/O-bound testcases running at the same time share
+one loop instead of blocking a thread each.
+"""
+
+import asyncio
+
+from typing import Any, Coroutine, TypeVar
+from concurrent.futures import Future
+from threading import Thread, Lock
+
+
+T = TypeVar('T')
+
+_loop: asyncio.AbstractEventLoop | None = None
+_lock: Lock = Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """
+    Get the shared event loop, start it on first use.
+    """
+    global _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            Thread(target=loop.run_forever, name='xbot-aio', daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+def submit(coro: Coroutine[Any, Any, T]) -> Future[T]:
+    """
+    Run a coroutine on the shared event loop as a task, the task runs 
+    in a copy of the caller's context(`contextvars`).
+
+    :param coro: coroutine to run.
+    :return: future of the result, cancelling it cancels the task.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
@@ -0,0 +1,221 @@
+# Copyright (c) 2022-2023, zhaowcheng <zhaowcheng@163.com>
+
+"""
+Result exporters.
+
+Exporters are fed by `Runner` each time a testcase finishes and write
+their file incrementally, so a killed run still leaves a valid (partial)
+file behind.
+"""
+
+import os
+import json
+
+from typing import IO, Any, ClassVar
+from datetime import datetime
+from xml.sax.saxutils import escape, quoteattr
+
+from xbot.framework.testcase import TestCase
+
+
+class Exporter(object):
+    """
+    Exporter base.
+    """
+    # Default filename in the logdir of the execution.
+    FILENAME: ClassVar[str] = ''
+
+    def __init__(self, filepath: str | None = None) -> None:
+        """
+        :param filepath: output filepath, default is `FILENAME` in logdir.
+        """
+        self.filepath: str | None = filepath
+        self.stream: IO[str] | None = None
+        self.counter: dict[str, int] = {}
+        self.casecnt: int = 0
+
+    def start(self, logroot: str) -> None:
+        """
+        Called before the first testcase runs.
+
+        :param logroot: testcase logdir of this execution.
+        """
+        self.filepath = self.filepath or os.path.join(logroot, self.FILENAME)
+        self.stream = open(self.filepath, 'w', encoding='utf8')
+        self.write_head()
+
+    def export(self, caseinst: TestCase) -> None:
+        """
+        Called each time a testcase finishes.
+
+        :param caseinst: finished TestCase instance.
+        """
+        self.casecnt += 1
+        if caseinst.result:
+            self.counter[caseinst.result] = self.counter.get(caseinst.result, 0) + 1
+        self.write_case(caseinst)
+        if self.stream is not None:
+            self.stream.flush()
+
+    def finish(self) -> None:
+        """
+        Called after the execution ends (also when interrupted).
+        """
+        if self.stream is None:
+            return
+        self.write_tail()
+        self.stream.truncate()
+        self.stream.close()
+        self.stream = None
+
+    def write_head(self) -> None:
+        """
+        Write file header.
+        """
+        pass
+
+    def write_case(self, caseinst: TestCase) -> None:
+        """
+        Write a testcase.
+        """
+        raise NotImplementedError
+
+    def write_tail(self) -> None:
+        """
+        Write file footer.
+        """
+        pass
+
+    def rewind_tail(self, tail: str) -> None:
+        """
+        Write `tail` and move back before it, the next write overwrites
+        it so the file is always well-formed.
+        """
+        assert self.stream is not None
+        pos = self.stream.tell()
+        self.stream.write(tail)
+        self.stream.truncate()
+        self.stream.seek(pos)
+
+
+def caseinfo(caseinst: TestCase) -> dict[str, Any]:
+    """
+    Result information of a finished testcase.
+    """
+    fmt = '%Y-%m-%d %H:%M:%S'
+    return {
+        'caseid': caseinst.caseid,
+        'path': caseinst.relpath,
+        'result': caseinst.result,
+        'starttime': caseinst.starttime.strftime(fmt) if caseinst.starttime else None,
+        'endtime': caseinst.endtime.strftime(fmt) if caseinst.endtime else None,
+        'duration': caseinst.duration.total_seconds() if caseinst.duration else None,
+        'errmsg': caseinst.errmsg,
+        'waits': caseinst.waits
+    }
+
+
+class JUnitExporter(Exporter):
+    """
+    JUnit XML exporter.
+    """
+    FILENAME = 'junit.xml'
+    TAIL = '</testsuite>\n</testsuites>\n'
+
+    def write_head(self) -> None:
+        assert self.stream is not None
+        self.stream.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n<testsuites>\n'
+            '<testsuite name="xbot" timestamp=%s>\n'
+            % quoteattr(datetime.now().isoformat(timespec='seconds'))
+        )
+        self.rewind_tail(self.TAIL)
+
+    def write_case(self, caseinst: TestCase) -> None:
+        assert self.stream is not None
+        info = caseinfo(caseinst)
+        classname = '.'.join(info['path'].split('/')[:-1])
+        xml = '<testcase classname=%s name=%s time="%s"' % (
+            quoteattr(classname), quoteattr(info['caseid']), info['duration'] or 0
+        )
+        errmsg = escape(info['errmsg'] or '')
+        result = info['result']
+        if result == 'FAIL':
+            xml += '>\n<failure message="FAIL">%s</failure>\n</testcase>\n' % errmsg
+        elif result in ('ERROR', 'TIMEOUT'):
+            xml += '>\n<error message="%s">%s</error>\n</testcase>\n' % (result, errmsg)
+        elif result == 'SKIP':
+            xml += '>\n<skipped/>\n</testcase>\n'
+        else:
+            xml += '/>\n'
+        self.stream.write(xml)
+        self.rewind_tail(self.TAIL)
+
+    def write_tail(self) -> None:
+        assert self.stream is not None
+        self.stream.write(self.TAIL)
+
+
+class JsonExporter(Exporter):
+    """
+    JSON summary exporter.
+    """
+    FILENAME = 'summary.json'
+
+    def write_head(self) -> None:
+        assert self.stream is not None
+        self.stream.write('{"cases": [')
+        self.rewind_tail(self.tail())
+
+    def write_case(self, caseinst: TestCase) -> None:
+        assert self.stream is not None
+        sep = ',' if self.casecnt > 1 else ''
+        self.stream.write(sep + '\n' + json.dumps(caseinfo(caseinst), ensure_ascii=False))
+        self.rewind_tail(self.tail())
+
+    def write_tail(self) -> None:
+        assert self.stream is not None
+        self.stream.write(self.tail(finished=True))
+
+    def tail(self, finished: bool = False) -> str:
+        """
+        Closing part with the counters.
+        """
+        return '\n], "counter": %s, "finished": %s}\n' % (
+            json.dumps(self.counter), json.dumps(finished)
+        )
+
+
+class TapExporter(Exporter):
+    """
+    TAP(Test Anything Protocol) exporter, the plan is written at the end.
+    """
+    FILENAME = 'results.tap'
+
+    def write_head(self) -> None:
+        assert self.stream is not None
+        self.stream.write('TAP version 13\n')
+
+    def write_case(self, caseinst: TestCase) -> None:
+        assert self.stream is not None
+        seq = self.casecnt
+        line = '%s %d - %s' % (
+            'ok' if caseinst.result in ('PASS', 'SKIP') else 'not ok',
+            seq, caseinst.relpath
+        )
+        if caseinst.result == 'SKIP':
+            line += ' # SKIP'
+        elif caseinst.result != 'PASS':
+            line += ' # %s' % caseinst.result
+        self.stream.write(line + '\n')
+
+    def write_tail(self) -> None:
+        assert self.stream is not None
+        self.stream.write('1..%d\n' % self.casecnt)
+
+
+EXPORTERS: dict[str, type[Exporter]] = {
+    'junit': JUnitExporter,
+    'json': JsonExporter,
+    'tap': TapExporter,
+}
@@ -0,0 +1,253 @@
+# Copyright (c) 2022-2023, zhaowcheng <zhaowcheng@163.com>
+
+"""
+Shared fixtures.
+
+A fixture is a function decorated with `fixture` in a `fixtures.py` file
+under `testcases` (applies to that directory and its subdirectories) or in
+`lib/fixtures.py` (applies to all). The function receives the TestBed
+instance and either returns the value or yields it, code after `yield`
+is the cleanup:
+
+    @fixture(scope='session')
+    def service(testbed):
+        svc = start_service(testbed.get('service'))
+        yield svc
+        svc.stop()
+
+Testcases declare the fixtures they use in `FIXTURES` and get the value
+by `self.fixture('service')`. A fixture is created on first use and
+cleaned up after the last testcase declaring it finishes, once per:
+
+- session: the whole execution;
+- directory: directory of the testcase file;
+- module: testcase file.
+"""
+
+import os
+import sys
+import inspect
+
+from typing import Any, Callable, Generator, Hashable
+from importlib import import_module
+from threading import Lock, RLock
+
+from xbot.framework.logger import getlogger
+from xbot.framework.errors import TestCaseError
+
+
+logger = getlogger(__name__)
+
+SCOPES: tuple[str, ...] = ('session', 'directory', 'module')
+
+
+class Fixture(object):
+    """
+    Fixture definition.
+    """
+    def __init__(self, func: Callable[..., Any], scope: str = 'session') -> None:
+        """
+        :param func: function returning or yielding the fixture value.
+        :param scope: session/directory/module.
+        """
+        if scope not in SCOPES:
+            raise ValueError(f'`scope` must be one of {SCOPES}')
+        self.func: Callable[..., Any] = func
+        self.scope: str = scope
+        self.name: str = func.__name__
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self.func(*args, **kwargs)
+
+
+def fixture(scope: str = 'session') -> Callable[[Callable[..., Any]], Fixture]:
+    """
+    Decorator to define a fixture.
+
+    :param scope: session/directory/module.
+    """
+    def decorator(func: Callable[..., Any]) -> Fixture:
+        return Fixture(func, scope)
+    return decorator
+
+
+class _Instance(object):
+    """
+    Fixture instance of a scope.
+    """
+    def __init__(self, definition: Fixture) -> None:
+        self.definition: Fixture = definition
+        self.refs: int = 0
+        self.created: bool = False
+        self.value: Any = None
+        self.generator: Generator[Any, None, None] | None = None
+        self.lock: RLock = RLock()
+
+
+def casepaths(casecls: type) -> tuple[str, str]:
+    """
+    Project directory and relative path(split by `/`) of a testcase class.
+    """
+    abspath = sys.modules[casecls.__module__].__file__
+    if abspath is None:
+        raise RuntimeError(f'No source file found for {casecls.__module__}')
+    paths = abspath.split(os.path.sep)
+    i = paths.index('testcases')
+    return os.path.sep.join(paths[:i]), '/'.join(paths[i:])
+
+
+class FixtureManager(object):
+    """
+    Create, share and clean up fixtures, thread-safe.
+    """
+    def __init__(self, testbed: Any) -> None:
+        """
+        :param testbed: TestBed instance passed to fixture functions.
+        """
+        self.testbed: Any = testbed
+        self.__lock: Lock = Lock()
+        self.__instances: dict[tuple[int, str], _Instance] = {}
+        self.__resolved: dict[tuple[type, str], Fixture | None] = {}
+
+    def resolve(self, casecls: type, name: str) -> Fixture | None:
+        """
+        Find the nearest definition of fixture `name` for a testcase class.
+
+        :param casecls: testcase class.
+        :param name: fixture name.
+        :return: fixture definition, None if not found.
+        """
+        if (casecls, name) in self.__resolved:
+            return self.__resolved[(casecls, name)]
+        self.__resolved[(casecls, name)] = self.__resolve(casecls, name)
+        return self.__resolved[(casecls, name)]
+
+    def __resolve(self, casecls: type, name: str) -> Fixture | None:
+        """
+        Uncached `resolve`.
+        """
+        root, relpath = casepaths(casecls)
+        parts = relpath.split('/')[:-1]
+        modnames = ['.'.join(parts[:i] + ['fixtures'])
+                    for i in range(len(parts), 0, -1)] + ['lib.fixtures']
+        for modname in modnames:
+            filepath = os.path.join(root, *modname.split('.')) + '.py'
+            if not os.path.exists(filepath):
+                continue
+            definition = getattr(import_module(modname), name, None)
+            if isinstance(definition, Fixture):
+                return definition
+        return None
+
+    def key(self, casecls: type, definition: Fixture) -> tuple[int, str]:
+        """
+        Instance key of a fixture for a testcase class.
+        """
+        _, relpath = casepaths(casecls)
+        if definition.scope == 'directory':
+            scopekey = relpath.rsplit('/', 1)[0]
+        elif definition.scope == 'module':
+            scopekey = relpath
+        else:
+            scopekey = ''
+        return id(definition), scopekey
+
+    def keys(self, casecls: type, names: list[str], scopes: tuple[str, ...] = SCOPES) -> list[Hashable]:
+        """
+        Instance keys of fixtures `names` in `scopes` for a testcase class,
+        unknown fixtures are ignored.
+        """
+        keys: list[Hashable] = []
+        for name in names:
+            definition = self.resolve(casecls, name)
+            if definition is not None and definition.scope in scopes:
+                keys.append(self.key(casecls, definition))
+        return keys
+
+    def plan(self, casecls: type, names: list[str]) -> None:
+        """
+        Register a testcase which will use fixtures `names`.
+        """
+        for name in names:
+            definition = self.resolve(casecls, name)
+            if definition is None:
+                continue
+            with self.__lock:
+                inst = self.__instances.setdefault(
+                    self.key(casecls, definition), _Instance(definition)
+                )
+                inst.refs += 1
+
+    def get(self, casecls: type, name: str) -> Any:
+        """
+        Get value of fixture `name`, create it on first use.
+
+        :raises TestCaseError: if the fixture is not defined or planned.
+        """
+        definition = self.resolve(casecls, name)
+        if definition is None:
+            raise TestCaseError(f'Fixture `{name}` is not defined.')
+        with self.__lock:
+            inst = self.__instances.get(self.key(casecls, definition))
+        if inst is None:
+            raise TestCaseError(f'Fixture `{name}` is not declared in `FIXTURES`.')
+        with inst.lock:
+            if not inst.created:
+                logger.info('Create fixture `%s`(%s)', name, definition.scope)
+                params = inspect.signature(definition.func).parameters
+                value = definition(self.testbed) if params else definition()
+                if inspect.isgenerator(value):
+                    inst.generator = value
+                    value = next(value)
+                inst.value = value
+                inst.created = True
+            return inst.value
+
+    def release(self, casecls: type, names: list[str]) -> None:
+        """
+        A testcase using fixtures `names` finished, clean up fixtures
+        which have no more users.
+        """
+        for name in names:
+            definition = self.resolve(casecls, name)
+            if definition is None:
+                continue
+            key = self.key(casecls, definition)
+            with self.__lock:
+                inst = self.__instances.get(key)
+                if inst is None:
+                    continue
+                inst.refs -= 1
+                if inst.refs > 0:
+                    continue
+                del self.__instances[key]
+            self.__cleanup(inst)
+
+    def cleanup_all(self) -> None:
+        """
+        Clean up all remaining fixtures(e.g. the execution is interrupted).
+        """
+        with self.__lock:
+            insts = list(self.__instances.values())
+            self.__instances.clear()
+        for inst in reversed(insts):
+            self.__cleanup(inst)
+
+    def __cleanup(self, inst: _Instance) -> None:
+        """
+        Run cleanup code of a fixture instance.
+        """
+        with inst.lock:
+            if not inst.created:
+                return
+            inst.created = False
+            if inst.generator is None:
+                return
+            logger.info('Clean up fixture `%s`(%s)',
+                        inst.definition.name, inst.definition.scope)
+            try:
+                next(inst.generator)
+            except StopIteration:
+                pass
+            except Exception:
+                logger.exception('Clean up fixture `%s` failed', inst.definition.name)
@@ -0,0 +1,268 @@
+# Copyright (c) 2022-2023, zhaowcheng <zhaowcheng@163.com>
+
+"""
+Historical results database.
+"""
+
+import os
+import sqlite3
+
+from typing import Any
+from datetime import datetime
+
+from xbot.framework.version import __version__
+from xbot.framework.testcase import TestCase
+from xbot.framework.exporter import Exporter
+from xbot.framework.report import LiveReport
+
+
+# Default database filepath(relative to project directory).
+HISTORY_DB: str = os.path.join('logs', 'history.db')
+
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    testbed TEXT NOT NULL,
+    logroot TEXT NOT NULL,
+    starttime TEXT NOT NULL,
+    version TEXT NOT NULL,
+    xbot TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    path TEXT NOT NULL,
+    result TEXT NOT NULL,
+    starttime TEXT,
+    duration REAL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_testbed ON runs(testbed, id);
+CREATE INDEX IF NOT EXISTS idx_results_run ON results(run_id);
+CREATE INDEX IF NOT EXISTS idx_results_path ON results(path, run_id);
+"""
+
+
+class History(object):
+    """
+    Historical results database (SQLite).
+    """
+    def __init__(self, dbfile: str) -> None:
+        """
+        :param dbfile: database filepath, created if not exists.
+        """
+        if os.path.dirname(dbfile):
+            os.makedirs(os.path.dirname(dbfile), exist_ok=True)
+        self.conn: sqlite3.Connection = sqlite3.connect(dbfile)
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """
+        Close the database.
+        """
+        self.conn.close()
+
+    def add_run(
+        self,
+        testbed: str,
+        logroot: str,
+        results: list[tuple[str, str, str | None, float | None]],
+        version: str = ''
+    ) -> int:
+        """
+        Add results of a execution.
+
+        :param testbed: testbed name.
+        :param logroot: testcase logdir of the execution.
+        :param results: [(path, result, starttime, duration_seconds), ...]
+        :param version: version of the software under test.
+        :return: run id.
+        """
+        with self.conn:
+            cur = self.conn.execute(
+                'INSERT INTO runs (testbed, logroot, starttime, version, xbot) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (testbed, logroot, datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                 version, __version__)
+            )
+            run_id = cur.lastrowid
+            assert run_id is not None
+            self.conn.executemany(
+                'INSERT INTO results (run_id, path, result, starttime, duration) '
+                'VALUES (?, ?, ?, ?, ?)',
+                [(run_id, *r) for r in results]
+            )
+        return run_id
+
+    def trend(self, testbed: str | None = None, limit: int = 20) -> list[tuple[Any, ...]]:
+        """
+        Pass rate of the latest executions(FLAKY counted as passed).
+
+        :param testbed: testbed name, None for all.
+        :param limit: number of executions.
+        :return: [(run_id, testbed, starttime, version, passcnt, total, passrate), ...]
+        """
+        return self.conn.execute(
+            """
+            SELECT r.id, r.testbed, r.starttime, r.version,
+                   SUM(s.result IN ('PASS', 'FLAKY')), COUNT(*),
+                   ROUND(100.0 * SUM(s.result IN ('PASS', 'FLAKY')) / COUNT(*), 2)
+            FROM (SELECT * FROM runs WHERE ?1 IS NULL OR testbed = ?1
+                  ORDER BY id DESC LIMIT ?2) r
+            JOIN results s ON s.run_id = r.id
+            WHERE s.result != 'SKIP'
+            GROUP BY r.id
+            ORDER BY r.id
+            """,
+            (testbed, limit)
+        ).fetchall()
+
+    def case(self, path: str, testbed: str | None = None, limit: int = 20) -> list[tuple[Any, ...]]:
+        """
+        Results of one testcase in the latest executions.
+
+        :param path: testcase path(startswith `testcases`).
+        :param testbed: testbed name, None for all.
+        :param limit: number of executions.
+        :return: [(run_id, testbed, starttime, version, result, duration), ...]
+        """
+        return self.conn.execute(
+            """
+            SELECT * FROM (
+                SELECT r.id, r.testbed, s.starttime, r.version, s.result, s.duration
+                FROM results s JOIN runs r ON r.id = s.run_id
+                WHERE s.path = ?1 AND (?2 IS NULL OR r.testbed = ?2)
+                ORDER BY s.run_id DESC LIMIT ?3
+            ) ORDER BY id
+            """,
+            (path, testbed, limit)
+        ).fetchall()
+
+    def results(self, testbed: str | None = None, limit: int = 20) -> list[tuple[Any, ...]]:
+        """
+        Results of all testcases in the latest executions(SKIP excluded).
+
+        :param testbed: testbed name, None for all.
+        :param limit: number of executions.
+        :return: [(run_id, path, result, duration), ...] ordered by run_id.
+        """
+        return self.conn.execute(
+            """
+            WITH recent AS (
+                SELECT id FROM runs WHERE ?1 IS NULL OR testbed = ?1
+                ORDER BY id DESC LIMIT ?2
+            )
+            SELECT run_id, path, result, duration
+            FROM results
+            WHERE run_id IN recent AND result != 'SKIP'
+            ORDER BY run_id, path
+            """,
+            (testbed, limit)
+        ).fetchall()
+
+    def flaky(self, testbed: str | None = None, limit: int = 20) -> list[tuple[Any, ...]]:
+        """
+        Testcases which both passed and not passed in the latest executions
+        (a FLAKY result counts as both), ordered by how often the result flipped.
+
+        :param testbed: testbed name, None for all.
+        :param limit: number of executions.
+        :return: [(path, runs, passcnt, flips), ...]
+        """
+        return self.conn.execute(
+            """
+            WITH recent AS (
+                SELECT id FROM runs WHERE ?1 IS NULL OR testbed = ?1
+                ORDER BY id DESC LIMIT ?2
+            ), seq AS (
+                SELECT path, result,
+                       result != LAG(result) OVER (
+                           PARTITION BY path ORDER BY run_id
+                       ) AS flip
+                FROM results
+                WHERE run_id IN recent AND result != 'SKIP'
+            )
+            SELECT path, COUNT(*), SUM(result IN ('PASS', 'FLAKY')), SUM(flip) AS flips
+            FROM seq
+            GROUP BY path
+            HAVING SUM(result IN ('PASS', 'FLAKY')) > 0 AND SUM(result != 'PASS') > 0
+            ORDER BY flips DESC, path
+            """,
+            (testbed, limit)
+        ).fetchall()
+
+    def regressions(
+        self,
+        testbed: str | None = None,
+        limit: int = 20,
+        factor: float = 1.5,
+        mindelta: float = 1.0
+    ) -> list[tuple[Any, ...]]:
+        """
+        Testcases whose duration in the latest execution exceeds `factor`
+        times their average passed duration in the previous executions.
+
+        :param testbed: testbed name, None for all.
+        :param limit: number of executions.
+        :param factor: duration factor.
+        :param mindelta: ignore increases less than this(seconds).
+        :return: [(path, duration, avg_duration), ...]
+        """
+        return self.conn.execute(
+            """
+            WITH recent AS (
+                SELECT id FROM runs WHERE ?1 IS NULL OR testbed = ?1
+                ORDER BY id DESC LIMIT ?2
+            ), latest AS (
+                SELECT MAX(id) AS id FROM recent
+            )
+            SELECT s.path, s.duration, ROUND(AVG(p.duration), 2) AS avgdur
+            FROM results s
+            JOIN latest ON s.run_id = latest.id
+            JOIN results p ON p.path = s.path AND p.run_id < latest.id
+                          AND p.run_id IN recent AND p.result = 'PASS'
+            GROUP BY s.path
+            HAVING s.duration > ?3 * AVG(p.duration)
+               AND s.duration - AVG(p.duration) >= ?4
+            ORDER BY s.duration - AVG(p.duration) DESC
+            """,
+            (testbed, limit, factor, mindelta)
+        ).fetchall()
+
+
+class HistoryExporter(Exporter):
+    """
+    Save results to the history database at the end of the execution,
+    a testcase passed after retrying is saved as FLAKY.
+    """
+    def __init__(self, dbfile: str, testbed: str, version: str = '') -> None:
+        """
+        :param dbfile: database filepath.
+        :param testbed: testbed name.
+        :param version: version of the software under test.
+        """
+        super().__init__(dbfile)
+        self.testbed: str = testbed
+        self.version: str = version
+        self.logroot: str = ''
+        self.results: list[tuple[str, str, str | None, float | None]] = []
+
+    def start(self, logroot: str) -> None:
+        self.logroot = logroot
+
+    def export(self, caseinst: TestCase) -> None:
+        self.casecnt += 1
+        self.results.append((
+            caseinst.relpath,
+            LiveReport.result(caseinst),
+            caseinst.starttime.strftime('%Y-%m-%d %H:%M:%S') if caseinst.starttime else None,
+            caseinst.duration.total_seconds() if caseinst.duration else None
+        ))
+
+    def finish(self) -> None:
+        if not self.results or self.filepath is None:
+            return
+        history = History(self.filepath)
+        try:
+            history.add_run(self.testbed, self.logroot, self.results, self.version)
+        finally:
+            history.close()
+        self.results = []
@@ -0,0 +1,235 @@
+# Copyright (c) 2022-2023, zhaowcheng <zhaowcheng@163.com>
+
+"""
+Test impact analysis.
+
+Dependencies of each testcase file are recorded to `DEPS_FILE` as
+testcases run: project modules(under `lib` and `testcases`) it imports
+directly or indirectly, their packages, the `fixtures.py` files applying
+to it and the files loaded by the framework for every testcase.
+
+`xbot run --changed-since <git-ref or file list>` then runs only the
+testcases whose dependencies changed(and those without recorded
+dependencies, e.g. new testcases).
+"""
+
+import os
+import ast
+import json
+import subprocess
+
+from typing import Iterable
+from functools import lru_cache
+from threading import Lock
+
+from xbot.framework.exporter import Exporter
+from xbot.framework.testcase import TestCase
+from xbot.framework.logger import getlogger
+
+
+logger = getlogger(__name__)
+
+# Default dependency map filepath(relative to project directory).
+DEPS_FILE: str = os.path.join('logs', 'deps.json')
+
+# Directories of project modules.
+PROJECT_DIRS: tuple[str, ...] = ('lib', 'testcases')
+
+# Files every testcase depends on.
+COMMON_DEPS: tuple[str, ...] = ('lib/__init__.py', 'lib/testbed.py', 'lib/fixtures.py')
+
+
+def module_files(modname: str) -> list[str]:
+    """
+    Project files executed by importing `modname`(packages first).
+
+    >>> module_files('os.path')
+    []
+
+    :param modname: absolute module name.
+    :return: filepaths relative to project directory.
+    """
+    parts = modname.split('.')
+    if parts[0] not in PROJECT_DIRS:
+        return []
+    files = []
+    for i in range(1, len(parts) + 1):
+        path = '/'.join(parts[:i])
+        for candidate in (f'{path}/__init__.py', f'{path}.py'):
+            if os.path.isfile(candidate):
+                files.append(candidate)
+                break
+    return files
+
+
+@lru_cache(maxsize=None)
+def _imports(filepath: str, mtime: float) -> tuple[str, ...]:
+    """
+    Absolute names of modules imported by a file(cached by mtime).
+    """
+    with open(filepath, 'rb') as f:
+        tree = ast.parse(f.read(), filepath)
+    # Package of the file(of an `__init__.py` too), base of relative imports.
+    package = os.path.dirname(filepath).replace('/', '.')
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ''
+            if node.level:
+                parts = package.split('.')
+                parts = parts[:len(parts) - node.level + 1]
+                base = '.'.join(parts + ([base] if base else []))
+            # `from pkg import name` imports submodule `name` if exists.
+            names.append(base)
+            names.extend(f'{base}.{alias.name}' for alias in node.names)
+    return tuple(names)
+
+
+def imports(filepath: str) -> tuple[str, ...]:
+    """
+    Absolute names of modules imported by a file.
+
+    :param filepath: filepath relative to project directory.
+    """
+    try:
+        return _imports(filepath, os.path.getmtime(filepath))
+    except (OSError, SyntaxError, ValueError):
+        return ()
+
+
+def case_deps(casepath: str) -> list[str]:
+    """
+    Dependencies of a testcase file.
+
+    :param casepath: testcase filepath relative to project directory.
+    :return: sorted filepaths relative to project directory.
+    """
+    deps = {casepath}
+    pending = [casepath]
+    while pending:
+        for modname in imports(pending.pop()):
+            for path in module_files(modname):
+                if path not in deps:
+                    deps.add(path)
+                    pending.append(path)
+    parts = casepath.split('/')[:-1]
+    for i in range(1, len(parts) + 1):
+        fixtures = '/'.join(parts[:i] + ['fixtures.py'])
+        if os.path.isfile(fixtures):
+            deps.add(fixtures)
+    deps.update(f for f in COMMON_DEPS if os.path.isfile(f))
+    return sorted(deps)
+
+
+def changed_files(since: str) -> set[str]:
+    """
+    Files changed since a git ref, or listed in a file(one per line).
+
+    :param since: git ref(compared with the working tree) or filepath.
+    :return: filepaths relative to project directory.
+    :raises ValueError: if git failed.
+    """
+    if os.path.isfile(since):
+        with open(since, encoding='utf8') as f:
+            lines = f.read().splitlines()
+    else:
+        try:
+            proc = subprocess.run(
+                ['git', 'diff', '--name-only', '--relative', since, '--'],
+                capture_output=True, text=True, check=True
+            )
+        except (OSError, subprocess.CalledProcessError) as e:
+            stderr = getattr(e, 'stderr', '') or str(e)
+            raise ValueError(f'Get changed files since `{since}` failed: {stderr.strip()}')
+        lines = proc.stdout.splitlines()
+    return {os.path.normpath(l.strip()).replace(os.sep, '/') for l in lines if l.strip()}
+
+
+class DepsMap(object):
+    """
+    Dependencies of testcase files, thread-safe.
+    """
+    def __init__(self, filepath: str = DEPS_FILE) -> None:
+        """
+        :param filepath: dependency map filepath, loaded if exists.
+        """
+        self.filepath: str = filepath
+        self.__lock: Lock = Lock()
+        self.__cases: dict[str, list[str]] = {}
+        if os.path.isfile(filepath):
+            try:
+                with open(filepath, encoding='utf8') as f:
+                    self.__cases = json.load(f)['cases']
+            except (ValueError, KeyError) as e:
+                logger.warning('Ignore broken dependency map %s: %s', filepath, e)
+
+    def get(self, casepath: str) -> list[str] | None:
+        """
+        Recorded dependencies of a testcase file.
+        """
+        return self.__cases.get(casepath)
+
+    def record(self, casepath: str) -> None:
+        """
+        Record dependencies of a testcase file.
+        """
+        deps = case_deps(casepath)
+        with self.__lock:
+            self.__cases[casepath] = deps
+
+    def save(self) -> None:
+        """
+        Save to `filepath`.
+        """
+        with self.__lock:
+            data = json.dumps({'cases': self.__cases}, indent=1, sort_keys=True)
+        os.makedirs(os.path.dirname(self.filepath) or '.', exist_ok=True)
+        tmpfile = self.filepath + '.tmp'
+        with open(tmpfile, 'w', encoding='utf8') as f:
+            f.write(data)
+        os.replace(tmpfile, self.filepath)
+
+    def affected(self, casepaths: Iterable[str], changed: set[str]) -> list[str]:
+        """
+        Testcase files affected by `changed` files, including those without
+        recorded dependencies.
+
+        :param casepaths: testcase filepaths relative to project directory.
+        :param changed: changed filepaths relative to project directory.
+        """
+        selected = []
+        for casepath in casepaths:
+            key = os.path.normpath(casepath).replace(os.sep, '/')
+            deps = self.get(key)
+            if deps is None or key in changed or not changed.isdisjoint(deps):
+                selected.append(casepath)
+        return selected
+
+
+class DepsExporter(Exporter):
+    """
+    Record dependencies of testcases as they finish.
+    """
+    def __init__(self, filepath: str = DEPS_FILE) -> None:
+        """
+        :param filepath: dependency map filepath.
+        """
+        super().__init__(filepath)
+        self.deps: DepsMap = DepsMap(filepath)
+        self.recorded: set[str] = set()
+
+    def start(self, logroot: str) -> None:
+        pass
+
+    def export(self, caseinst: TestCase) -> None:
+        self.casecnt += 1
+        casepath = os.path.relpath(caseinst.abspath).replace(os.sep, '/')
+        if casepath not in self.recorded and os.path.isfile(casepath):
+            self.recorded.add(casepath)
+            self.deps.record(casepath)
+
+    def finish(self) -> None:
+        if self.recorded:
+            self.deps.save()
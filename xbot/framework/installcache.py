@@ -0,0 +1,115 @@
+# Copyright (c) 2022-2023, zhaowcheng <zhaowcheng@163.com>
+
+"""
+Install phase caching.
+
+Install testcases declare what they install by `FINGERPRINT`: a constant
+(e.g. a version string) or a function of the TestBed returning any JSON
+serializable value(e.g. `lambda tb: file_digest(tb.get('sut.package'))`
+or a testbed subtree `lambda tb: tb.get('sut')`).
+
+Fingerprints of a fully successful install phase are recorded per testbed
+in `INSTALLS_FILE`, the next execution skips the install phase if all
+install testcases have a fingerprint and none changed(`xbot run
+--force-install` runs it anyway).
+"""
+
+import os
+import json
+import hashlib
+
+from typing import Any
+from threading import Lock
+
+from xbot.framework.testbed import TestBed
+from xbot.framework.logger import getlogger
+
+
+logger = getlogger(__name__)
+
+# Default install record filepath(relative to project directory).
+INSTALLS_FILE: str = os.path.join('logs', 'installs.json')
+
+
+def file_digest(filepath: str, algorithm: str = 'sha256') -> str:
+    """
+    Hex digest of a file(e.g. the installed artifact).
+    """
+    h = hashlib.new(algorithm)
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def fingerprint(casecls: type, testbed: TestBed) -> str | None:
+    """
+    Fingerprint of an install testcase.
+
+    :param casecls: testcase class.
+    :param testbed: TestBed instance.
+    :return: digest of `FINGERPRINT`, None if not declared or failed.
+    """
+    value = getattr(casecls, 'FINGERPRINT', None)
+    try:
+        if callable(value):
+            value = value(testbed)
+        if value is None:
+            return None
+        data = json.dumps(value, sort_keys=True, default=str)
+    except Exception as e:
+        logger.warning('Get fingerprint of %s failed: %s', casecls.__name__, e)
+        return None
+    return hashlib.sha256(data.encode('utf8')).hexdigest()
+
+
+class InstallRecords(object):
+    """
+    Fingerprints of the last successful install phase per testbed.
+    """
+    def __init__(self, filepath: str = INSTALLS_FILE) -> None:
+        """
+        :param filepath: record filepath.
+        """
+        self.filepath: str = filepath
+        self.__lock: Lock = Lock()
+
+    def get(self, testbed: str) -> dict[str, str] | None:
+        """
+        Fingerprints of the last successful install phase on `testbed`.
+
+        :param testbed: testbed name.
+        :return: {casepath: fingerprint}, None if not recorded.
+        """
+        return self.__load().get(testbed)
+
+    def set(self, testbed: str, fingerprints: dict[str, str] | None) -> None:
+        """
+        Record(or remove if None) fingerprints of `testbed`.
+        """
+        with self.__lock:
+            records = self.__load()
+            if fingerprints is None:
+                if records.pop(testbed, None) is None:
+                    return
+            else:
+                records[testbed] = fingerprints
+            os.makedirs(os.path.dirname(self.filepath) or '.', exist_ok=True)
+            tmpfile = self.filepath + '.tmp'
+            with open(tmpfile, 'w', encoding='utf8') as f:
+                json.dump(records, f, indent=1, sort_keys=True)
+            os.replace(tmpfile, self.filepath)
+
+    def __load(self) -> dict[str, dict[str, str]]:
+        """
+        Load records, empty if not exists or broken.
+        """
+        try:
+            with open(self.filepath, encoding='utf8') as f:
+                records = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            logger.warning('Ignore broken install records %s: %s', self.filepath, e)
+            return {}
+        return records if isinstance(records, dict) else {}
@@ -0,0 +1,200 @@
+# Copyright (c) 2022-2023, zhaowcheng <zhaowcheng@163.com>
+
+"""
+YAML file loading.
+
+Files are read once, parsed by the libyaml based loader of ruamel.yaml
+when `ruamel.yaml.clib` is installed(the pure Python one otherwise), and
+parsed data of large files is cached by content hash so that repeated
+runs skip parsing.
+
+In testbeds(`load_yaml(..., includes=True)`) a mapping value can be
+another YAML file loaded lazily by the `!include` tag(path relative to
+the including file), it is parsed only when first accessed:
+
+    hosts: !include inventory/hosts.yml
+"""
+
+import os
+import pickle
+import hashlib
+import tempfile
+
+from typing import Any, Iterator
+from threading import local, RLock
+
+from ruamel import yaml
+from ruamel.yaml.constructor import SafeConstructor
+
+from xbot.framework.logger import getlogger
+
+
+logger = getlogger(__name__)
+
+# Files smaller than this(bytes) are not cached, parsing is fast enough.
+CACHE_MIN_SIZE: int = 64 * 1024
+# Cache directory, `$XBOT_CACHE_DIR` or `~/.cache/xbot/yaml`.
+CACHE_DIR: str = os.environ.get('XBOT_CACHE_DIR') or \
+    os.path.join(os.path.expanduser('~'), '.cache', 'xbot', 'yaml')
+
+# YAML instances are not thread-safe, one per thread.
+_local = local()
+
+
+class Include(object):
+    """
+    Placeholder of a lazily loaded `!include` file.
+    """
+    def __init__(self, path: str, basedir: str = '') -> None:
+        """
+        :param path: included filepath(relative to `basedir`).
+        :param basedir: directory of the including file.
+        """
+        self.path: str = path
+        self.basedir: str = basedir
+
+    def __repr__(self) -> str:
+        return f'Include({self.path!r})'
+
+    def load(self) -> Any:
+        """
+        Load the included file.
+        """
+        filepath = os.path.join(self.basedir, self.path)
+        logger.debug('Load included %s', filepath)
+        data, _ = load_yaml(filepath, includes=True)
+        return resolve_includes(data, os.path.dirname(filepath))
+
+
+def construct_include(constructor: Any, node: Any) -> Include:
+    """
+    Constructor of the `!include` tag.
+    """
+    return Include(constructor.construct_scalar(node))
+
+
+class _IncludeConstructor(SafeConstructor):
+    """
+    Safe constructor with the `!include` tag, registered on this class
+    only(`add_constructor` of `SafeConstructor` would affect all safe
+    loaders of the process).
+    """
+
+
+_IncludeConstructor.add_constructor('!include', construct_include)
+
+
+class LazyDict(dict):  # type: ignore[type-arg]
+    """
+    Mapping whose `!include` values are loaded on first access.
+    """
+    __lock = RLock()
+
+    def __getitem__(self, key: Any) -> Any:
+        value = super().__getitem__(key)
+        if isinstance(value, Include):
+            with self.__lock:
+                value = super().__getitem__(key)
+                if isinstance(value, Include):
+                    value = value.load()
+                    super().__setitem__(key, value)
+        return value
+
+    def __iter__(self) -> Iterator[Any]:
+        # Overridden so that `dict(d)`, `{**d}` and `dict.update(d)` copy
+        # by keys and `__getitem__` instead of the raw values.
+        return super().__iter__()
+
+    def keys(self) -> Any:
+        return super().keys()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+    def values(self) -> Iterator[Any]:  # type: ignore[override]
+        return (self[k] for k in self)
+
+    def items(self) -> Iterator[tuple[Any, Any]]:  # type: ignore[override]
+        return ((k, self[k]) for k in self)
+
+
+def resolve_includes(data: Any, basedir: str) -> Any:
+    """
+    Make mappings holding `!include` values lazy.
+
+    :param data: parsed data.
+    :param basedir: directory of the file, base of relative include paths.
+    :return: converted data.
+    """
+    if isinstance(data, dict):
+        lazy = False
+        for key, value in dict.items(data):
+            if isinstance(value, Include):
+                value.basedir = basedir
+                lazy = True
+            else:
+                dict.__setitem__(data, key, resolve_includes(value, basedir))
+        return LazyDict(data) if lazy else data
+    if isinstance(data, list):
+        for i, value in enumerate(data):
+            data[i] = resolve_includes(value, basedir)
+    return data
+
+
+def parser(includes: bool = False) -> yaml.YAML:
+    """
+    YAML safe loader of the current thread(C based if available).
+
+    :param includes: support the `!include` tag.
+    """
+    attr = 'include_yaml' if includes else 'yaml'
+    if not hasattr(_local, attr):
+        loader = yaml.YAML(typ='safe')
+        if includes:
+            loader.Constructor = _IncludeConstructor
+        setattr(_local, attr, loader)
+    return getattr(_local, attr)
+
+
+def cachefile(digest: str, includes: bool = False) -> str:
+    """
+    Cache filepath of a file content digest.
+    """
+    suffix = '.include' if includes else ''
+    return os.path.join(CACHE_DIR, f'{digest}{suffix}.pickle')
+
+
+def load_yaml(filepath: str, cache: bool = True, includes: bool = False) -> tuple[Any, str]:
+    """
+    Load a YAML file.
+
+    :param filepath: YAML filepath.
+    :param cache: use the parsed data cache.
+    :param includes: support the `!include` tag(see `resolve_includes`).
+    :return: (parsed data, file content)
+    """
+    with open(filepath, 'rb') as f:
+        raw = f.read()
+    content = raw.decode('utf8').replace('\r\n', '\n')
+    if not cache or len(raw) < CACHE_MIN_SIZE:
+        return parser(includes).load(content), content
+    path = cachefile(hashlib.sha256(raw).hexdigest(), includes)
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f), content
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning('Load cache of %s failed: %s', filepath, e)
+    data = parser(includes).load(content)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # Write to a temporary file and rename, concurrent loaders never
+        # see a partial cache.
+        fd, tmppath = tempfile.mkstemp(dir=CACHE_DIR)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmppath, path)
+    except OSError as e:
+        logger.warning('Save cache of %s failed: %s', filepath, e)
+    return data, content
@@ -4,10 +4,14 @@
 logging.
 """
 
+import os
+import sys
+import json
 import logging
 
 from types import TracebackType
-from typing import Any, Mapping, MutableMapping, TypeAlias, cast
+from contextvars import ContextVar
+from typing import IO, Any, Iterator, Mapping, MutableMapping, TypeAlias, cast
 
 
 ExcInfo: TypeAlias = (
@@ -57,22 +61,50 @@ class StdoutFilter(logging.Filter):
                                logging.WARN)
 
 
+# Caseid of the testcase running in the current context, records logged 
+# by asyncio tasks of a testcase(run in the shared loop thread) are 
+# attributed by it.
+CURRENT_CASE: ContextVar[str | None] = ContextVar('current_case', default=None)
+
+
 class CaseLogFilter(logging.Filter):
     """
     Testcase log filter.
     """
     def filter(self, record: logging.LogRecord) -> bool:
-        return self.name == record.threadName
+        return self.name == (CURRENT_CASE.get() or record.threadName)
+
+
+# Attributes of a bare LogRecord, anything else on a record is an extra.
+RECORD_ATTRS: frozenset[str] = frozenset(
+    logging.makeLogRecord({}).__dict__
+) | {'message', 'asctime'}
 
 
 class CaseLogHandler(logging.Handler):
     """
     Testcase log handler.
+
+    Records are kept in memory (for the html log) and, if `jsonlfile` is
+    given, also streamed to it as JSON Lines while the testcase runs.
     """
-    def __init__(self, level: int | str = logging.NOTSET) -> None:
+    def __init__(
+        self,
+        level: int | str = logging.NOTSET,
+        jsonlfile: str | None = None,
+        keep: bool = True
+    ) -> None:
+        """
+        :param level: log level.
+        :param jsonlfile: JSON Lines logfile path, None to disable.
+        :param keep: keep records in memory.
+        """
         super(CaseLogHandler, self).__init__(level)
         self.records: dict[str | None, list[dict[str, Any]]] = {}
         self.stage: str | None = None
+        self.jsonlfile: str | None = jsonlfile
+        self.keep: bool = keep
+        self.stream: IO[str] | None = None
 
     def set_stage(self, stage: str) -> None:
         self.stage = stage
@@ -83,7 +115,66 @@ class CaseLogHandler(logging.Handler):
         if self.stage not in self.records:
             self.records[self.stage] = []
         self.format(record)
-        self.records[self.stage].append(record.__dict__)
+        if self.keep:
+            self.records[self.stage].append(record.__dict__)
+        if self.jsonlfile:
+            self.write({
+                'type': 'record',
+                'stage': self.stage,
+                'created': record.created,
+                'asctime': getattr(record, 'asctime', None)
+                           or logging.Formatter().formatTime(record),
+                'levelname': record.levelname,
+                'filename': record.filename,
+                'lineno': record.lineno,
+                'message': record.message,
+                'extra': {k: v for k, v in record.__dict__.items()
+                          if k not in RECORD_ATTRS}
+            })
+
+    def write(self, obj: dict[str, Any]) -> None:
+        """
+        Write `obj` as a line to `jsonlfile` and flush it.
+        """
+        if not self.jsonlfile:
+            return
+        self.acquire()
+        try:
+            if self.stream is None:
+                os.makedirs(os.path.dirname(self.jsonlfile), exist_ok=True)
+                self.stream = open(self.jsonlfile, 'w', encoding='utf8')
+            self.stream.write(
+                json.dumps(obj, ensure_ascii=False, default=str) + '\n'
+            )
+            self.stream.flush()
+        finally:
+            self.release()
+
+    def close(self) -> None:
+        self.acquire()
+        try:
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+        finally:
+            self.release()
+        super(CaseLogHandler, self).close()
+
+
+def read_jsonl(jsonlfile: str) -> Iterator[dict[str, Any]]:
+    """
+    Read objects from a JSON Lines logfile, a truncated last line
+    (e.g. the run was killed) is ignored.
+
+    :param jsonlfile: JSON Lines logfile path.
+    :yield: decoded objects.
+    """
+    with open(jsonlfile, encoding='utf8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                break
 
 
 class ExtraAdapter(logging.LoggerAdapter):
@@ -16,8 +16,14 @@ from xbot.framework.version import __version__
 from xbot.framework.testbed import TestBed
 from xbot.framework.testset import TestSet
 from xbot.framework.runner import Runner
-from xbot.framework.report import gen_report
-from xbot.framework.utils import printerr, xprint
+from xbot.framework.abort import AbortPolicy
+from xbot.framework.exporter import EXPORTERS
+from xbot.framework.history import History, HistoryExporter, HISTORY_DB
+from xbot.framework.impact import DepsExporter, DepsMap, DEPS_FILE, changed_files
+from xbot.framework.ordering import FailureOrder, ORDERS
+from xbot.framework.preload import set_pycache_prefix, project_files, compile_files
+from xbot.framework.report import gen_report, render_log, LiveReport
+from xbot.framework.utils import printerr, xprint, ordered_walk
 from xbot.framework.common import INIT_DIR
 
 
@@ -26,15 +32,74 @@ def create_parser() -> argparse.ArgumentParser:
     Create cli parser.
     """
     parser = argparse.ArgumentParser(prog='xbot')
-    parser.add_argument('command', choices=['init', 'run'])
+    parser.add_argument('command', choices=['init', 'run', 'render', 'report', 'history'])
     parser.add_argument('-d', '--directory', required=('init' in sys.argv), 
                         help='directory to init (required by `init` command)')
     parser.add_argument('-b', '--testbed', required=('run' in sys.argv), 
-                        help='testbed filepath (required by `run` command)')
+                        help='testbed filepath (required by `run` command, '
+                             'filter for `history` command)')
+    parser.add_argument('-o', '--overlay', action='append', default=[],
+                        help='testbed overlay filepath merged over the testbed, can be repeated '
+                             '(option for `run` command)')
     parser.add_argument('-s', '--testset', required=('run' in sys.argv), 
                         help='testset filepath (required by `run` command)')
     parser.add_argument('-f', '--outfmt', choices=['verbose', 'brief'], default='brief',
                         help='output format (option for `run` command, options: verbose/brief, default: brief)')
+    parser.add_argument('-l', '--logfmt', choices=['html', 'jsonl'], default='html',
+                        help='testcase log format, JSON Lines logs are always written '
+                             '(option for `run` command, options: html/jsonl, default: html)')
+    parser.add_argument('-e', '--export', action='append', choices=list(EXPORTERS), default=[],
+                        help='export results to logdir as each testcase finishes, can be repeated '
+                             f'(option for `run` command, options: {"/".join(EXPORTERS)})')
+    parser.add_argument('-p', '--path', required=('render' in sys.argv or 'report' in sys.argv),
+                        help='JSON Lines logfile or log directory to render as html '
+                             '(required by `render` command), or log directory to '
+                             'generate report for (required by `report` command)')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='number of test testcases running at the same time '
+                             '(option for `run` command, default: 1)')
+    parser.add_argument('--changed-since', metavar='REF_OR_FILE',
+                        help='run only the test testcases affected by files changed since a git ref, '
+                             'or listed in a file (option for `run` command)')
+    parser.add_argument('--force-install', action='store_true',
+                        help='run install testcases even if their fingerprints match '
+                             'the last successful install (option for `run` command)')
+    parser.add_argument('--order', choices=ORDERS, default='testset',
+                        help='order of test testcases, `failure` runs the testcases most likely '
+                             'to fail first by history results and changed files '
+                             f'(option for `run` command, options: {"/".join(ORDERS)}, default: testset)')
+    parser.add_argument('--maxfail', type=int, default=0, metavar='N',
+                        help='abort the execution after N failed testcases '
+                             '(option for `run` command, default: 0, no limit)')
+    parser.add_argument('--maxfail-rate', type=float, default=0, metavar='PERCENT',
+                        help='abort the execution when more than PERCENT of the executed testcases '
+                             'failed (option for `run` command, default: 0, no limit)')
+    parser.add_argument('--maxfail-rate-after', type=int, default=10, metavar='M',
+                        help='check `--maxfail-rate` after M testcases executed '
+                             '(option for `run` command, default: 10)')
+    parser.add_argument('--stop-on-error', action='store_true',
+                        help='abort the execution at the first ERROR testcase '
+                             '(option for `run` command)')
+    parser.add_argument('--compile-workers', type=int, default=0, metavar='N',
+                        help='byte-compile testcases and the project modules they import in N '
+                             'worker processes before execution starts '
+                             '(option for `run` command, default: 0, not compiled ahead)')
+    parser.add_argument('--pycache-prefix', metavar='DIR',
+                        help='directory of compiled bytecode instead of `__pycache__` next to the '
+                             'sources, default is `~/.cache/xbot/pycache` if the project directory '
+                             'is read-only (option for `run` command)')
+    parser.add_argument('--sut-version', default='',
+                        help='version of the software under test, saved to history '
+                             '(option for `run` command)')
+    parser.add_argument('-q', '--query', choices=['trend', 'flaky', 'regressions', 'case'],
+                        default='trend',
+                        help='history query (option for `history` command, '
+                             'options: trend/flaky/regressions/case, default: trend)')
+    parser.add_argument('-c', '--case',
+                        help='testcase path (required by `history -q case`)')
+    parser.add_argument('-n', '--limit', type=int, default=20,
+                        help='number of latest executions to query '
+                             '(option for `history` command, default: 20)')
     parser.add_argument('-v', '--version', action='version', version=f'xbot {__version__}')
     return parser
 
@@ -60,25 +125,176 @@ def is_projdir(directory: str) -> bool:
     return os.path.exists(os.path.join(directory, 'testcases'))
     
 
-def run(testbed: str, testset: str, outfmt: str = 'brief') -> None:
+def run(
+    testbed: str,
+    testset: str,
+    outfmt: str = 'brief',
+    logfmt: str = 'html',
+    exports: list[str] | None = None,
+    version: str = '',
+    workers: int = 1,
+    overlays: list[str] | None = None,
+    changed_since: str | None = None,
+    force_install: bool = False,
+    maxfail: int = 0,
+    maxfail_rate: float = 0,
+    maxfail_rate_after: int = 10,
+    stop_on_error: bool = False,
+    order: str = 'testset',
+    compile_workers: int = 0,
+    pycache_prefix: str | None = None
+) -> None:
     """
     Run testcases.
 
     :param testbed: testbed filepath.
     :param testset: testset filepath.
     :param outfmt: output format.
+    :param logfmt: testcase log format.
+    :param exports: result exporter names.
+    :param version: version of the software under test.
+    :param workers: number of test testcases running at the same time.
+    :param overlays: testbed overlay filepaths.
+    :param changed_since: git ref or file listing changed files, run only
+                          the test testcases affected by them.
+    :param force_install: run install testcases even if their fingerprints
+                          match the last successful install.
+    :param maxfail: abort after this many failed testcases, 0 means no limit.
+    :param maxfail_rate: abort when the failure rate(percent) exceeds this,
+                         0 means no limit.
+    :param maxfail_rate_after: minimum executed testcases before the 
+                               failure rate is checked.
+    :param stop_on_error: abort at the first ERROR testcase.
+    :param order: order of test testcases(testset/failure).
+    :param compile_workers: byte-compile testcases in this many worker 
+                            processes before execution, 0 means not.
+    :param pycache_prefix: directory of compiled bytecode.
     """
     if not is_projdir(os.getcwd()):
         printerr("No `testcases` directory in current directory, "
                  "maybe current is not a project directory.")
+    try:
+        abort = AbortPolicy(maxfail, maxfail_rate, maxfail_rate_after, stop_on_error)
+    except ValueError as e:
+        printerr(str(e))
+    if workers < 1:
+        printerr('`workers` must be greater than 0')
+    if compile_workers < 0:
+        printerr('`compile_workers` must not be negative')
+    # Before any project module is imported.
+    set_pycache_prefix(pycache_prefix)
     sys.path.insert(0, os.getcwd())
-    tb = cast(TestBed, import_module('lib.testbed').TestBed(testbed))
+    tb = cast(TestBed, import_module('lib.testbed').TestBed(testbed, overlays))
     ts = TestSet(testset)
-    runner = Runner(tb, ts)
-    logdir = runner.run(outfmt)
+    changed: set[str] = set()
+    if changed_since:
+        try:
+            changed = changed_files(changed_since)
+        except ValueError as e:
+            printerr(str(e))
+        tests = ts.testcases.test
+        ts.select(DepsMap(DEPS_FILE).affected(tests, changed))
+        xprint(f'Selected {len(ts.testcases.test)}/{len(tests)} test testcases '
+               f'affected by {len(changed)} changed file(s).')
+    failure_order = None
+    if order == 'failure':
+        if not changed_since:
+            try:
+                # Uncommitted changes, e.g. a fix being validated.
+                changed = changed_files('HEAD')
+            except ValueError:
+                pass
+        results = []
+        if os.path.exists(HISTORY_DB):
+            db = History(HISTORY_DB)
+            try:
+                results = db.results(tb.name)
+            finally:
+                db.close()
+        failure_order = FailureOrder(results, DepsMap(DEPS_FILE), changed)
+    if compile_workers:
+        casepaths = ts.testcases.install + ts.testcases.test
+        compile_files(project_files(casepaths), compile_workers)
+    exporters = [EXPORTERS[name]() for name in dict.fromkeys(exports or [])]
+    exporters.append(LiveReport())
+    exporters.append(HistoryExporter(HISTORY_DB, tb.name, version))
+    exporters.append(DepsExporter(DEPS_FILE))
+    runner = Runner(tb, ts, exporters, workers, force_install, abort, failure_order)
+    logdir = runner.run(outfmt, logfmt)
     xprint('\nreport: ', end='')
-    report, is_allpassed = gen_report(logdir)
-    xprint(report, '\n', do_exit=True, exit_code=(not is_allpassed))
+    reportfile, is_allpassed = gen_report(logdir)
+    xprint(reportfile, '\n', do_exit=True, exit_code=(not is_allpassed))
+
+
+def render(path: str) -> None:
+    """
+    Render html logfiles from JSON Lines logfiles.
+
+    :param path: JSON Lines logfile or log directory.
+    """
+    if os.path.isfile(path):
+        xprint(render_log(path))
+        return
+    if not os.path.isdir(path):
+        printerr('%s does not exist' % path)
+    for top, dirs, files in ordered_walk(path):
+        for f in files:
+            if f.endswith('.jsonl'):
+                xprint(render_log(os.path.join(top, f)))
+
+
+def report(logdir: str) -> None:
+    """
+    Regenerate the report of a log directory.
+
+    :param logdir: log directory.
+    """
+    if not os.path.isdir(logdir):
+        printerr('%s does not exist' % logdir)
+    filepath, is_allpassed = gen_report(logdir, progress=True)
+    xprint(filepath, do_exit=True, exit_code=(not is_allpassed))
+
+
+def history(
+    query: str,
+    testbed: str | None = None,
+    case: str | None = None,
+    limit: int = 20
+) -> None:
+    """
+    Query the history database.
+
+    :param query: trend/flaky/regressions/case.
+    :param testbed: testbed name or filepath, None for all.
+    :param case: testcase path (for `case` query).
+    :param limit: number of latest executions to query.
+    """
+    if not os.path.exists(HISTORY_DB):
+        printerr('%s does not exist' % HISTORY_DB)
+    if testbed:
+        testbed = os.path.basename(testbed).rsplit('.', 1)[0]
+    db = History(HISTORY_DB)
+    try:
+        if query == 'trend':
+            header = ('run', 'testbed', 'starttime', 'version', 'pass', 'total', 'rate(%)')
+            rows = db.trend(testbed, limit)
+        elif query == 'flaky':
+            header = ('testcase', 'runs', 'pass', 'flips')
+            rows = db.flaky(testbed, limit)
+        elif query == 'regressions':
+            header = ('testcase', 'duration', 'avg_duration')
+            rows = db.regressions(testbed, limit)
+        else:
+            if not case:
+                printerr('`-c/--case` is required by `case` query')
+            header = ('run', 'testbed', 'starttime', 'version', 'result', 'duration')
+            rows = db.case(str(case), testbed, limit)
+    finally:
+        db.close()
+    table = [header] + [tuple('' if v is None else str(v) for v in r) for r in rows]
+    widths = [max(len(r[i]) for r in table) for i in range(len(header))]
+    for r in table:
+        xprint('  '.join(v.ljust(w) for v, w in zip(r, widths)).rstrip())
 
 
 def main() -> None:
@@ -90,7 +306,17 @@ def main() -> None:
     if args.command == 'init':
         init(args.directory)
     elif args.command == 'run':
-        run(args.testbed, args.testset, args.outfmt)
+        run(args.testbed, args.testset, args.outfmt, args.logfmt, args.export,
+            args.sut_version, args.workers, args.overlay, args.changed_since,
+            args.force_install, args.maxfail, args.maxfail_rate,
+            args.maxfail_rate_after, args.stop_on_error, args.order,
+            args.compile_workers, args.pycache_prefix)
+    elif args.command == 'render':
+        render(args.path)
+    elif args.command == 'report':
+        report(args.path)
+    elif args.command == 'history':
+        history(args.query, args.testbed, args.case, args.limit)
 
 
 
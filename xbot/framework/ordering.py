@@ -0,0 +1,116 @@
+# Copyright (c) 2022-2023, zhaowcheng <zhaowcheng@163.com>
+
+"""
+Testcase ordering by failure likelihood.
+
+`xbot run --order failure` runs the test testcases most likely to fail
+first, scored by their results in the history database(see `history`
+module) and the dependency map(see `impact` module):
+
+- recent failures, each execution back weighs `DECAY` times less;
+- flakiness, how often the result flipped;
+- changed dependencies;
+- no history(e.g. new testcases).
+
+Testcases with the same score(e.g. stable passing ones) run shortest
+first. Install testcases always keep the testset order.
+"""
+
+import os
+import re
+
+from typing import Any
+
+from xbot.framework.impact import DepsMap
+
+
+# Ordering modes, `testset` keeps the written order.
+ORDERS: tuple[str, ...] = ('testset', 'failure')
+
+# Weight of a result relative to the next newer execution.
+DECAY: float = 0.5
+# Score weights.
+FLAKY_WEIGHT: float = 0.5
+CHANGED_WEIGHT: float = 1.0
+# Score of testcases without history.
+NEW_SCORE: float = 0.5
+
+# Parameter index in the path of a parametrized instance.
+PARAM_RE: re.Pattern[str] = re.compile(r'\[\d+\](?=\.py$)')
+
+
+def case_key(casepath: str) -> str:
+    """
+    Testcase file of a testset path or a history path.
+
+    >>> case_key('./testcases/db/tc_query[3].py')
+    'testcases/db/tc_query.py'
+    """
+    return PARAM_RE.sub('', os.path.normpath(casepath).replace(os.sep, '/'))
+
+
+class FailureOrder(object):
+    """
+    Order test testcases by failure likelihood.
+    """
+    def __init__(
+        self,
+        results: list[tuple[Any, ...]],
+        deps: DepsMap | None = None,
+        changed: set[str] | None = None
+    ) -> None:
+        """
+        :param results: `History.results` of the testbed.
+        :param deps: recorded dependencies of testcases.
+        :param changed: changed filepaths relative to project directory.
+        """
+        self.deps: DepsMap | None = deps
+        self.changed: set[str] = changed or set()
+        # {case key: {run_id: failed}}, a parametrized testcase fails in
+        # an execution if any instance failed.
+        runs: dict[str, dict[int, bool]] = {}
+        durations: dict[str, list[float]] = {}
+        for run_id, path, result, duration in results:
+            key = case_key(path)
+            failed = result != 'PASS'
+            failures = runs.setdefault(key, {})
+            failures[run_id] = failures.get(run_id, False) or failed
+            if duration is not None:
+                durations.setdefault(key, []).append(duration)
+        latest = sorted({r[0] for r in results}, reverse=True)
+        ranks = {run_id: i for i, run_id in enumerate(latest)}
+        self.__history: dict[str, float] = {}
+        for key, failures in runs.items():
+            weights = {run_id: DECAY ** ranks[run_id] for run_id in failures}
+            rate = sum(w for run_id, w in weights.items() if failures[run_id]) \
+                / sum(weights.values())
+            seq = [failures[run_id] for run_id in sorted(failures)]
+            flips = sum(a != b for a, b in zip(seq, seq[1:]))
+            self.__history[key] = rate + FLAKY_WEIGHT * flips / max(1, len(seq) - 1)
+        self.__durations: dict[str, float] = {
+            key: sum(values) / len(values) for key, values in durations.items()
+        }
+
+    def score(self, casepath: str) -> float:
+        """
+        Failure likelihood score of a testcase, higher runs earlier.
+        """
+        key = case_key(casepath)
+        score = self.__history.get(key, NEW_SCORE)
+        if self.changed:
+            deps = self.deps.get(key) if self.deps is not None else None
+            if key in self.changed or (deps and not self.changed.isdisjoint(deps)):
+                score += CHANGED_WEIGHT
+        return score
+
+    def duration(self, casepath: str) -> float:
+        """
+        Average duration(seconds) of a testcase, 0 if unknown.
+        """
+        return self.__durations.get(case_key(casepath), 0)
+
+    def __call__(self, casepaths: tuple[str, ...]) -> tuple[str, ...]:
+        """
+        Most likely failing testcases first, then shortest first.
+        """
+        return tuple(sorted(casepaths, key=lambda p: (-self.score(p), self.duration(p))))
@@ -0,0 +1,109 @@
+# Copyright (c) 2022-2023, zhaowcheng <zhaowcheng@163.com>
+
+"""
+Testcase parameters.
+
+`TestCase.PARAMS` expands a testcase into one instance per parameter,
+instance `n` has caseid `<caseid>[n]` and its own logfile, the parameter
+is available as `self.param`. `PARAMS` can be:
+
+- a list/tuple of parameters;
+- a generator function(or any callable returning an iterable);
+- `from_csv(filepath)` / `from_jsonl(filepath)`.
+
+Parameters are consumed one by one while the testcases run, so large
+sources are never loaded as a whole(they are iterated once more before
+the execution to count the instances, see `count_params`).
+"""
+
+import csv
+import json
+
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, Sized
+
+from xbot.framework.errors import TestCaseError
+
+
+class Param(NamedTuple):
+    """
+    A parameter of a parametrized testcase.
+    """
+    index: int
+    value: Any
+
+
+def from_csv(filepath: str, **fmtparams: Any) -> Callable[[], Iterator[dict[str, str]]]:
+    """
+    Parameters from a csv file with a header line, one dict per row.
+
+    :param filepath: csv filepath(relative to project directory).
+    :param fmtparams: passed to `csv.DictReader`.
+    """
+    def rows() -> Iterator[dict[str, str]]:
+        with open(filepath, encoding='utf8', newline='') as f:
+            yield from csv.DictReader(f, **fmtparams)
+    return rows
+
+
+def from_jsonl(filepath: str) -> Callable[[], Iterator[Any]]:
+    """
+    Parameters from a JSON Lines file, one per non-blank line.
+
+    :param filepath: JSON Lines filepath(relative to project directory).
+    """
+    def rows() -> Iterator[Any]:
+        with open(filepath, encoding='utf8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    return rows
+
+
+def iter_params(source: Iterable[Any] | Callable[[], Iterable[Any]]) -> Iterator[Param]:
+    """
+    Iterate parameters of `source` lazily.
+
+    >>> list(iter_params(['a', 'b']))
+    [Param(index=0, value='a'), Param(index=1, value='b')]
+    >>> list(iter_params(lambda: (i * i for i in range(3))))
+    [Param(index=0, value=0), Param(index=1, value=1), Param(index=2, value=4)]
+
+    :param source: `TestCase.PARAMS`.
+    :raises TestCaseError: if `source` is invalid or failed.
+    """
+    try:
+        iterable = source() if callable(source) else source
+        for i, value in enumerate(iterable):
+            yield Param(i, value)
+    except Exception as e:
+        raise TestCaseError(f'Invalid PARAMS: {e.__class__.__name__}: {e}') from e
+
+
+def count_params(source: Iterable[Any] | Callable[[], Iterable[Any]]) -> int | None:
+    """
+    Number of parameters of `source`, counted without keeping them, an
+    invalid `source` counts as one(the error instance).
+
+    >>> count_params(['a', 'b'])
+    2
+    >>> count_params(lambda: (i for i in range(3)))
+    3
+    >>> count_params(42)
+    1
+    >>> count_params(i for i in range(3)) is None
+    True
+
+    :param source: `TestCase.PARAMS`.
+    :return: the number, None if `source` can only be iterated once.
+    """
+    if isinstance(source, Sized):
+        return len(source)
+    if isinstance(source, Iterator):
+        return None
+    count = 0
+    try:
+        for _ in iter_params(source):
+            count += 1
+    except TestCaseError:
+        count += 1
+    return count
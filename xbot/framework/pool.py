@@ -0,0 +1,270 @@
+# Copyright (c) 2022-2023, zhaowcheng <zhaowcheng@163.com>
+
+"""
+Resource(connection/session) pooling.
+
+Resources are created by a factory on demand, returned to the pool after
+use and reused by later testcases(or other workers running at the same
+time), up to `maxsize` resources exist per pool. Idle resources are health
+checked before reuse and closed after `idle_timeout` seconds.
+"""
+
+import time
+
+from typing import Any, Callable, Generic, Hashable, Iterator, TypeVar
+from contextlib import contextmanager
+from threading import Condition, Lock
+
+from xbot.framework.logger import getlogger
+
+
+logger = getlogger(__name__)
+
+T = TypeVar('T')
+
+
+class ResourcePool(Generic[T]):
+    """
+    Thread-safe pool of resources created by a factory.
+    """
+    def __init__(
+        self,
+        factory: Callable[[], T],
+        maxsize: int = 4,
+        check: Callable[[T], bool] | None = None,
+        close: Callable[[T], Any] | None = None,
+        idle_timeout: float = 300
+    ) -> None:
+        """
+        :param factory: function creating a resource.
+        :param maxsize: maximum number of resources(idle and in use).
+        :param check: health check of an idle resource before reuse,
+                      unhealthy(False or raised) resources are closed.
+        :param close: function closing a resource, default calls its
+                      `close` method if exists.
+        :param idle_timeout: close resources idle longer than this(seconds).
+        """
+        if maxsize < 1:
+            raise ValueError('`maxsize` must be greater than 0')
+        self.factory: Callable[[], T] = factory
+        self.maxsize: int = maxsize
+        self.check: Callable[[T], bool] | None = check
+        self.closer: Callable[[T], Any] | None = close
+        self.idle_timeout: float = idle_timeout
+        self.__cond: Condition = Condition()
+        self.__idle: list[tuple[T, float]] = []
+        self.__size: int = 0
+        self.__closed: bool = False
+
+    @property
+    def size(self) -> int:
+        """
+        Number of resources(idle and in use).
+        """
+        return self.__size
+
+    @property
+    def idle(self) -> int:
+        """
+        Number of idle resources.
+        """
+        return len(self.__idle)
+
+    def acquire(self, timeout: float | None = None) -> T:
+        """
+        Check out a resource, reuse a healthy idle one or create a new one,
+        wait for a returned one if the pool is full.
+
+        :param timeout: maximum seconds to wait, None to wait forever.
+        :raises TimeoutError: if no resource is available within `timeout`.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.__cond:
+                expired = self.__pop_expired()
+                while not self.__closed and not expired and not self.__idle \
+                        and self.__size >= self.maxsize:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError('No resource available within '
+                                           f'{timeout} second(s).')
+                    self.__cond.wait(remaining)
+                    expired = self.__pop_expired()
+                if self.__closed:
+                    raise RuntimeError('Pool is closed')
+                resource = None
+                if self.__idle:
+                    resource, _ = self.__idle.pop()
+                else:
+                    self.__size += 1
+            for res in expired:
+                self.__close(res)
+            if resource is None:
+                return self.__create()
+            if self.__healthy(resource):
+                return resource
+            self.__discard(resource)
+
+    def release(self, resource: T, broken: bool = False) -> None:
+        """
+        Return a resource to the pool.
+
+        :param broken: close it instead of reuse.
+        """
+        with self.__cond:
+            if not broken and not self.__closed:
+                self.__idle.append((resource, time.monotonic()))
+                self.__cond.notify()
+                return
+        self.__discard(resource)
+
+    @contextmanager
+    def checkout(self, timeout: float | None = None) -> Iterator[T]:
+        """
+        Check out a resource for the `with` block.
+        """
+        resource = self.acquire(timeout)
+        try:
+            yield resource
+        finally:
+            self.release(resource)
+
+    def evict(self) -> int:
+        """
+        Close resources idle longer than `idle_timeout`.
+
+        :return: number of closed resources.
+        """
+        with self.__cond:
+            expired = self.__pop_expired()
+        for resource in expired:
+            self.__close(resource)
+        return len(expired)
+
+    def close(self) -> None:
+        """
+        Close idle resources and refuse new checkouts, resources in use are
+        closed when returned.
+        """
+        with self.__cond:
+            self.__closed = True
+            idle = [r for r, _ in self.__idle]
+            self.__size -= len(idle)
+            self.__idle.clear()
+            self.__cond.notify_all()
+        for resource in idle:
+            self.__close(resource)
+
+    def __create(self) -> T:
+        """
+        Create a resource, the reserved slot is freed if failed.
+        """
+        try:
+            return self.factory()
+        except BaseException:
+            with self.__cond:
+                self.__size -= 1
+                self.__cond.notify()
+            raise
+
+    def __healthy(self, resource: T) -> bool:
+        """
+        Run the health check.
+        """
+        if self.check is None:
+            return True
+        try:
+            return bool(self.check(resource))
+        except Exception:
+            return False
+
+    def __pop_expired(self) -> list[T]:
+        """
+        Remove idle resources which exceed `idle_timeout`(lock held).
+        """
+        now = time.monotonic()
+        expired = [r for r, t in self.__idle if now - t > self.idle_timeout]
+        if expired:
+            self.__idle = [(r, t) for r, t in self.__idle
+                           if now - t <= self.idle_timeout]
+            self.__size -= len(expired)
+            self.__cond.notify(len(expired))
+        return expired
+
+    def __discard(self, resource: T) -> None:
+        """
+        Close a checked out resource and free its slot.
+        """
+        with self.__cond:
+            self.__size -= 1
+            self.__cond.notify()
+        self.__close(resource)
+
+    def __close(self, resource: T) -> None:
+        """
+        Close a resource, errors are logged.
+        """
+        try:
+            if self.closer is not None:
+                self.closer(resource)
+            elif callable(getattr(resource, 'close', None)):
+                getattr(resource, 'close')()
+        except Exception:
+            logger.exception('Close resource %r failed', resource)
+
+
+class PoolManager(object):
+    """
+    Keyed resource pools, a pool per (name, key) created by the factory
+    registered as `name`.
+    """
+    def __init__(self) -> None:
+        self.__lock: Lock = Lock()
+        self.__factories: dict[str, tuple[Callable[..., Any], dict[str, Any]]] = {}
+        self.__pools: dict[tuple[str, Hashable], ResourcePool[Any]] = {}
+
+    def register(self, name: str, factory: Callable[..., Any], **options: Any) -> None:
+        """
+        Register a factory.
+
+        :param name: resource name, e.g. `ssh`.
+        :param factory: function creating a resource, called with `key`
+                        if it is not None, e.g. `lambda host: SSH(host)`.
+        :param options: `ResourcePool` options(maxsize, check, close,
+                        idle_timeout).
+        """
+        with self.__lock:
+            self.__factories[name] = (factory, options)
+
+    def pool(self, name: str, key: Hashable = None) -> ResourcePool[Any]:
+        """
+        Get the pool of resource `name` for `key`, created on first use.
+
+        :raises KeyError: if `name` is not registered.
+        """
+        with self.__lock:
+            if (name, key) not in self.__pools:
+                if name not in self.__factories:
+                    raise KeyError(f'Resource `{name}` is not registered.')
+                factory, options = self.__factories[name]
+                func = factory if key is None else lambda: factory(key)
+                self.__pools[(name, key)] = ResourcePool(func, **options)
+            return self.__pools[(name, key)]
+
+    def evict(self) -> int:
+        """
+        Close idle resources exceeding `idle_timeout` in all pools.
+        """
+        with self.__lock:
+            pools = list(self.__pools.values())
+        return sum(p.evict() for p in pools)
+
+    def close(self) -> None:
+        """
+        Close all pools, they are recreated on next use.
+        """
+        with self.__lock:
+            pools = list(self.__pools.values())
+            self.__pools.clear()
+        for pool in pools:
+            pool.close()
@@ -0,0 +1,85 @@
+# Copyright (c) 2022-2023, zhaowcheng <zhaowcheng@163.com>
+
+"""
+Testcase module preloading.
+
+Before execution starts the runner imports all selected testcase modules
+and reports all import errors at once. Project modules they depend on
+(see `impact.case_deps`) can be byte-compiled in parallel worker processes
+first, so the imports only load cached bytecode.
+
+Bytecode is written to `sys.pycache_prefix` if set(`xbot run
+--pycache-prefix`, `$PYTHONPYCACHEPREFIX`), to `PYCACHE_DIR` if the
+project directory is read-only, next to the sources otherwise.
+"""
+
+import os
+import sys
+import compileall
+
+from typing import Iterable
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+from xbot.framework.impact import case_deps
+from xbot.framework.logger import getlogger
+
+
+logger = getlogger(__name__)
+
+# Bytecode cache directory of read-only project directories.
+PYCACHE_DIR: str = os.path.join(os.path.expanduser('~'), '.cache', 'xbot', 'pycache')
+
+
+def set_pycache_prefix(prefix: str | None, projdir: str = '.') -> str | None:
+    """
+    Set the bytecode cache directory of this process and of worker
+    processes, `PYCACHE_DIR` if not given and `projdir` is read-only.
+
+    :param prefix: bytecode cache directory, None for the default.
+    :param projdir: project directory.
+    :return: the bytecode cache directory, None if next to the sources.
+    """
+    prefix = prefix or sys.pycache_prefix
+    if prefix is None and not os.access(projdir, os.W_OK):
+        prefix = PYCACHE_DIR
+    if prefix is not None:
+        prefix = os.path.abspath(prefix)
+        sys.pycache_prefix = prefix
+        # Inherited by worker processes(`spawn` start method).
+        os.environ['PYTHONPYCACHEPREFIX'] = prefix
+    return prefix
+
+
+def project_files(casepaths: Iterable[str]) -> list[str]:
+    """
+    Project files imported by testcases, testcases included.
+
+    :param casepaths: testcase filepaths relative to project directory.
+    """
+    files: set[str] = set()
+    for casepath in casepaths:
+        files.update(case_deps(casepath))
+    return sorted(files)
+
+
+def compile_files(files: list[str], workers: int) -> int:
+    """
+    Byte-compile files in worker processes, up-to-date bytecode is kept.
+    Syntax errors are reported when the testcases are imported.
+
+    :param files: source filepaths.
+    :param workers: number of worker processes.
+    :return: number of files failed to compile.
+    """
+    if workers < 1:
+        raise ValueError('`workers` must be greater than 0')
+    compile_file = partial(compileall.compile_file, quiet=2)
+    if workers == 1 or len(files) < 2:
+        ok = [compile_file(f) for f in files]
+    else:
+        with ProcessPoolExecutor(min(workers, len(files))) as executor:
+            ok = list(executor.map(compile_file, files, chunksize=16))
+    failed = ok.count(False)
+    logger.debug('Compiled %d files, %d failed', len(files), failed)
+    return failed
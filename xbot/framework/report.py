@@ -2,15 +2,112 @@
 
 """
 Execution report.
+
+While testcases run, `LiveReport` keeps `report.html` up to date: each
+finished testcase appends a row to the current data file and replaces a
+small summary file, the page polls them. The full report is generated by
+`gen_report` at the end.
 """
 
 import os
 import re
+import sys
+import json
+import shutil
+
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 
-from datetime import datetime
+from typing import Any, ClassVar
 
 from xbot.framework import utils
 from xbot.framework import common
+from xbot.framework.logger import read_jsonl
+from xbot.framework.testbed import join_contents
+from xbot.framework.exporter import Exporter
+from xbot.framework.testcase import TestCase
+from xbot.framework.abort import NOT_RUN
+
+
+# Number of case rows per report data file.
+CHUNK_SIZE: int = 5000
+
+# Directory(in logdir) of report data files.
+DATA_DIRNAME: str = 'report_data'
+
+# Summary file(in `DATA_DIRNAME`) of the live report.
+LIVE_FILENAME: str = 'live.js'
+
+
+# Logfiles of previous attempts of a retried testcase.
+ATTEMPT_RE: re.Pattern[str] = re.compile(r'\.attempt\d+\.(html|jsonl)$')
+
+# Bytes read from the head of html logfiles(the summary table is at the
+# top, the whole file is read if not found) and from the tail of JSON Lines
+# logfiles(the result is the last record).
+HEAD_SIZE: int = 64 * 1024
+TAIL_SIZE: int = 64 * 1024
+
+# Case results.
+RESULTS: tuple[str, ...] = ('PASS', 'FAIL', 'ERROR', 'TIMEOUT', 'SKIP', 'FLAKY', NOT_RUN)
+
+
+def retried_stems(files: list[str]) -> set[str]:
+    """
+    Stems of logfiles having logfiles of previous attempts.
+
+    >>> sorted(retried_stems(['tc_a.attempt1.html', 'tc_a.html', 'tc_b.html']))
+    ['tc_a']
+    """
+    stems = set()
+    for f in files:
+        match = ATTEMPT_RE.search(f)
+        if match:
+            stems.add(f[:match.start()])
+    return stems
+
+
+def to_seconds(duration: str) -> int:
+    """
+    Convert duration string to seconds.
+
+    >>> to_seconds('1:02:03')
+    3723
+    >>> to_seconds('1 day, 0:00:01')
+    86401
+    """
+    days = 0
+    if ',' in duration:
+        d, duration = duration.split(',')
+        days = int(d.split()[0])
+    h, m, sec = duration.strip().split(':')
+    return days * 86400 + int(h) * 3600 + int(m) * 60 + int(float(sec))
+
+
+def write_chunks(cases: list[dict[str, str]], logdir: str) -> list[str]:
+    """
+    Write case rows to chunked data files loaded lazily by the report.
+
+    :param cases: case information list.
+    :param logdir: testcase logfile directory.
+    :return: data filepaths relative to `logdir`.
+    """
+    datadir = os.path.join(logdir, DATA_DIRNAME)
+    if os.path.exists(datadir):
+        shutil.rmtree(datadir)
+    os.makedirs(datadir)
+    chunks = []
+    for i in range(0, len(cases), CHUNK_SIZE):
+        rows = [
+            [c['path'], c['starttime'], c['endtime'], c['duration'],
+             c['result'], c['log'], to_seconds(c['duration'])]
+            for c in cases[i:i + CHUNK_SIZE]
+        ]
+        filename = 'cases_%04d.js' % (i // CHUNK_SIZE)
+        with open(os.path.join(datadir, filename), 'w', encoding='utf8') as fp:
+            fp.write('addCases(%s);\n' % json.dumps(rows, ensure_ascii=False))
+        chunks.append(f'{DATA_DIRNAME}/{filename}')
+    return chunks
 
 
 def find_value(html: str, id_: str) -> str:
@@ -27,51 +124,178 @@ def find_value(html: str, id_: str) -> str:
     return match.group(1)
 
 
-def gen_report(logdir: str) -> tuple[str, bool]:
+def read_summary(jsonlfile: str) -> dict[str, str] | None:
+    """
+    Get result, starttime, endtime and duration from a JSON Lines logfile.
+
+    :param jsonlfile: JSON Lines logfile path.
+    :return: summary, None if the testcase did not finish.
+    """
+    with open(jsonlfile, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - TAIL_SIZE))
+        lines = f.read().split(b'\n')
+    if size > TAIL_SIZE:
+        # The first line may be partial.
+        lines = lines[1:]
+    for line in reversed(lines):
+        if b'"result"' not in line:
+            continue
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            # Truncated last line(e.g. the run was killed).
+            continue
+        if isinstance(obj, dict) and obj.get('type') == 'result':
+            return obj
+    return None
+
+
+def read_head(logfile: str) -> dict[str, str]:
+    """
+    Get result, starttime, endtime and duration from a html logfile.
+
+    :param logfile: html logfile path.
+    """
+    with open(logfile, encoding='utf8') as fp:
+        content = fp.read(HEAD_SIZE)
+        try:
+            return {k: find_value(content, k)
+                    for k in ('result', 'starttime', 'endtime', 'duration')}
+        except ValueError:
+            content += fp.read()
+    return {k: find_value(content, k)
+            for k in ('result', 'starttime', 'endtime', 'duration')}
+
+
+def scan_log(logdir: str, top: str, f: str, retried: set[str]) -> dict[str, str] | None:
     """
-    Generate report for all testcase logfiles in `logdir`.
+    Case information of a logfile.
 
     :param logdir: testcase logfile directory.
-    :return: (report_filepath, is_allpassed)
+    :param top: directory of the logfile.
+    :param f: html or JSON Lines logfile name.
+    :param retried: `retried_stems` of the directory.
+    :return: case information, None if the testcase did not finish.
     """
-    cases: list[dict[str, str]] = []
-    counter: dict[str, int] = {
-        'PASS': 0,
-        'FAIL': 0,
-        'ERROR': 0,
-        'TIMEOUT': 0,
-        'SKIP': 0
+    filepath = os.path.join(top, f)
+    summary = read_head(filepath) if f.endswith('.html') else read_summary(filepath)
+    if summary is None:
+        return None
+    caselog = os.path.join(os.path.relpath(top, logdir), f).replace('\\', '/')
+    result = summary['result']
+    if result == 'PASS' and f.rsplit('.', 1)[0] in retried:
+        result = 'FLAKY'
+    if result not in RESULTS:
+        raise ValueError(f'Unknown result: {result}: {filepath}')
+    return {
+        'result': result,
+        'path': caselog.rsplit('.', 1)[0] + '.py',
+        'log': caselog,
+        'starttime': summary['starttime'],
+        'endtime': summary['endtime'],
+        'duration': summary['duration']
     }
+
+
+def render_log(jsonlfile: str, logfile: str | None = None) -> str:
+    """
+    Render html logfile from a JSON Lines logfile.
+
+    :param jsonlfile: JSON Lines logfile path.
+    :param logfile: html logfile path, default is `jsonlfile` with 
+                    `.html` suffix.
+    :return: html logfile path.
+    """
+    logfile = logfile or jsonlfile.rsplit('.', 1)[0] + '.html'
+    case: dict[str, Any] = {}
+    result: dict[str, Any] = {}
+    stage_records: dict[str, list[dict[str, Any]]] = {}
+    for obj in read_jsonl(jsonlfile):
+        type_ = obj.pop('type', None)
+        if type_ == 'case':
+            case = obj
+        elif type_ == 'result':
+            result = obj
+        elif type_ == 'record':
+            extra = obj.pop('extra', None) or {}
+            stage_records.setdefault(obj.pop('stage'), []).append(
+                {**extra, **obj}
+            )
+    testbed = ''
+    paths = [case.get('testbed')] + case.get('overlays', [])
+    if all(p and os.path.exists(p) for p in paths):
+        contents = []
+        for path in paths:
+            with open(path, encoding='utf8') as f:
+                contents.append((path, f.read()))
+        testbed = join_contents(contents)
+    utils.render_write(
+        common.LOG_TEMPLATE,
+        logfile,
+        caseid=case.get('caseid', ''),
+        result=result.get('result', ''),
+        starttime=result.get('starttime', case.get('starttime', '')),
+        endtime=result.get('endtime', ''),
+        duration=result.get('duration', ''),
+        sourcecode=case.get('sourcecode', '').replace('<','&lt').replace('>','&gt'),
+        testbed=testbed.replace('<','&lt').replace('>','&gt'),
+        stage_records=stage_records
+    )
+    return logfile
+
+
+def gen_report(
+    logdir: str,
+    workers: int | None = None,
+    progress: bool = False
+) -> tuple[str, bool]:
+    """
+    Generate report for all testcase logfiles in `logdir`, logfiles are
+    scanned by a thread pool.
+
+    :param logdir: testcase logfile directory.
+    :param workers: number of scanning threads, default by `ThreadPoolExecutor`.
+    :param progress: print scanning progress to stderr(`xbot report`).
+    :return: (report_filepath, is_allpassed)
+    """
     report = os.path.join(logdir, 'report.html')
-    allpassed = True
+    logs: list[tuple[str, str, set[str]]] = []
     for top, dirs, files in utils.ordered_walk(logdir):
+        retried = retried_stems(files)
+        names = set(files)
         for f in files:
+            if ATTEMPT_RE.search(f):
+                # Logfiles of previous attempts of a retried testcase.
+                continue
             # report.ok.html is only for unittest.
             if f.endswith('.html') and f not in ['report.html', 'report.ok.html']:
-                reltop = os.path.relpath(top, logdir)
-                caselog = os.path.join(reltop, f).replace('\\', '/')
-                casepath = caselog.replace('.html', '.py')
-                with open(os.path.join(top, f), encoding='utf8') as fp:
-                    content = fp.read()
-                    result = find_value(content, 'result')
-                    if result not in counter:
-                        raise ValueError(f'Unknown result: {result}: {os.path.join(top, f)}')
-                    if result not in ['PASS', 'SKIP']:
-                        allpassed = False
-                    counter[result] += 1
-                    caseinfo = {
-                        'result': result,
-                        'path': casepath,
-                        'log': caselog,
-                        'starttime': find_value(content, 'starttime'),
-                        'endtime': find_value(content, 'endtime'),
-                        'duration': find_value(content, 'duration')
-                    }
-                    cases.append(caseinfo)
+                logs.append((top, f, retried))
+            elif f.endswith('.jsonl') and f[:-6] + '.html' not in names:
+                # Only JSON Lines logfile (html rendering is disabled).
+                logs.append((top, f, retried))
+    cases: list[dict[str, str]] = []
+    step = max(1, len(logs) // 100)
+    with ThreadPoolExecutor(workers) as executor:
+        for i, caseinfo in enumerate(
+            executor.map(lambda log: scan_log(logdir, *log), logs), 1
+        ):
+            if caseinfo is not None:
+                cases.append(caseinfo)
+            if progress and (i % step == 0 or i == len(logs)):
+                utils.xprint(f'\rScanning logfiles: {i}/{len(logs)}', end='',
+                             file=sys.stderr, flush=True)
+    if progress and logs:
+        utils.xprint(file=sys.stderr)
+    counter = dict.fromkeys(RESULTS, 0)
+    for caseinfo in cases:
+        counter[caseinfo['result']] += 1
+    allpassed = all(counter[r] == 0 for r in ('FAIL', 'ERROR', 'TIMEOUT', NOT_RUN))
     cases.sort(key=lambda x: (x['starttime'], x['path']))
     strptime = lambda t: datetime.strptime(t, '%Y-%m-%d %H:%M:%S')
     total_duration = str(
         strptime(cases[-1]['endtime']) - strptime(cases[0]['starttime'])
+        if cases else timedelta(0)
     )
     utils.render_write(
         common.REPORT_TEMPLATE,
@@ -81,8 +305,126 @@ def gen_report(logdir: str) -> tuple[str, bool]:
         errorcnt=counter['ERROR'],
         timeoutcnt=counter['TIMEOUT'],
         skipcnt=counter['SKIP'],
+        flakycnt=counter['FLAKY'],
+        notruncnt=counter[NOT_RUN],
         allcnt=sum(counter.values()),
         total_duration=total_duration,
-        cases=cases
+        chunks=write_chunks(cases, logdir)
     )
     return report, allpassed
+
+
+class LiveReport(Exporter):
+    """
+    Report updated each time a testcase finishes.
+    """
+    FILENAME = 'report.html'
+    # Seconds between refreshes of the page.
+    REFRESH: ClassVar[int] = 10
+
+    def __init__(self, filepath: str | None = None) -> None:
+        super().__init__(filepath)
+        self.logroot: str = ''
+        self.datadir: str = ''
+        self.chunks: int = 0
+        self.starttime: str = ''
+        self.endtime: str = ''
+
+    def start(self, logroot: str) -> None:
+        self.logroot = logroot
+        self.filepath = self.filepath or os.path.join(logroot, self.FILENAME)
+        self.datadir = os.path.join(logroot, DATA_DIRNAME)
+        if os.path.exists(self.datadir):
+            shutil.rmtree(self.datadir)
+        os.makedirs(self.datadir)
+        self.write_summary()
+        utils.render_write(
+            common.REPORT_TEMPLATE,
+            self.filepath,
+            passcnt=0,
+            failcnt=0,
+            errorcnt=0,
+            timeoutcnt=0,
+            skipcnt=0,
+            flakycnt=0,
+            notruncnt=0,
+            allcnt=0,
+            total_duration='0:00:00',
+            chunks=[],
+            live=f'{DATA_DIRNAME}/{LIVE_FILENAME}',
+            refresh=self.REFRESH
+        )
+
+    def export(self, caseinst: TestCase) -> None:
+        result = self.result(caseinst)
+        self.casecnt += 1
+        self.counter[result] = self.counter.get(result, 0) + 1
+        self.write_case(caseinst)
+        self.write_summary()
+
+    @staticmethod
+    def result(caseinst: TestCase) -> str:
+        """
+        Result of a testcase, FLAKY if passed after retrying.
+        """
+        stem = os.path.splitext(caseinst.logfile)[0]
+        if caseinst.result == 'PASS' and any(
+            os.path.exists(f'{stem}.attempt1{ext}') for ext in ('.html', '.jsonl')
+        ):
+            return 'FLAKY'
+        return caseinst.result or ''
+
+    def write_case(self, caseinst: TestCase) -> None:
+        """
+        Append the row of a testcase to the current data file.
+        """
+        fmt = '%Y-%m-%d %H:%M:%S'
+        starttime = caseinst.starttime.strftime(fmt) if caseinst.starttime else ''
+        endtime = caseinst.endtime.strftime(fmt) if caseinst.endtime else ''
+        duration = caseinst.duration or timedelta()
+        logfile = caseinst.logfile
+        if not os.path.exists(logfile):
+            logfile = caseinst.jsonlfile
+        row = [caseinst.relpath, starttime, endtime, str(duration), self.result(caseinst),
+               os.path.relpath(logfile, self.logroot).replace('\\', '/'),
+               int(duration.total_seconds())]
+        if starttime:
+            self.starttime = min(self.starttime or starttime, starttime)
+        self.endtime = max(self.endtime, endtime)
+        if (self.casecnt - 1) % CHUNK_SIZE == 0:
+            if self.stream is not None:
+                self.stream.close()
+            filename = 'live_%04d.js' % self.chunks
+            self.stream = open(os.path.join(self.datadir, filename), 'w', encoding='utf8')
+            self.chunks += 1
+        assert self.stream is not None
+        self.stream.write('addCases(%s);\n' % json.dumps([row], ensure_ascii=False))
+        self.stream.flush()
+
+    def write_summary(self, finished: bool = False) -> None:
+        """
+        Replace the summary file(counters and number of data files).
+        """
+        duration = '0:00:00'
+        if self.starttime and self.endtime:
+            strptime = lambda t: datetime.strptime(t, '%Y-%m-%d %H:%M:%S')
+            duration = str(strptime(self.endtime) - strptime(self.starttime))
+        summary = {
+            'counter': self.counter,
+            'total': self.casecnt,
+            'duration': duration,
+            'chunks': ['%s/live_%04d.js' % (DATA_DIRNAME, i) for i in range(self.chunks)],
+            'finished': finished
+        }
+        tmpfile = os.path.join(self.datadir, LIVE_FILENAME + '.tmp')
+        with open(tmpfile, 'w', encoding='utf8') as fp:
+            fp.write('updateLive(%s);\n' % json.dumps(summary, ensure_ascii=False))
+        # The page never reads a partial file.
+        os.replace(tmpfile, os.path.join(self.datadir, LIVE_FILENAME))
+
+    def finish(self) -> None:
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        if self.datadir:
+            self.write_summary(finished=True)
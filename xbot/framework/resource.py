@@ -0,0 +1,103 @@
+# Copyright (c) 2022-2023, zhaowcheng <zhaowcheng@163.com>
+
+"""
+Testbed resource locking.
+
+Testcases declare the testbed resources they use in `RESOURCES` as JMESPath
+expressions(see `TestBed.get`), testcases running at the same time never
+get the same resource:
+
+- an expression resolving to a list is a pool, the testcase gets one free
+  item of it(a counted semaphore of the list size);
+- any other value is a single resource locked exclusively.
+
+Resources are identified by their values, so different expressions of the
+same host conflict too. The allocated value is got by `self.resource(expr)`.
+"""
+
+import json
+
+from typing import Any
+from threading import Lock
+
+from xbot.framework.testbed import TestBed
+
+
+def resource_key(value: Any) -> str:
+    """
+    Identity of a resource value.
+
+    >>> resource_key({'port': 22, 'ip': '10.0.0.1'})
+    '{"ip": "10.0.0.1", "port": 22}'
+    """
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def candidates(testbed: TestBed, expr: str) -> list[Any]:
+    """
+    Values which can be allocated for `expr`.
+    """
+    value = testbed.get(expr)
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+class ResourceLocks(object):
+    """
+    Allocate testbed resources to testcases, thread-safe.
+    """
+    def __init__(self, testbed: TestBed) -> None:
+        """
+        :param testbed: TestBed instance.
+        """
+        self.testbed: TestBed = testbed
+        self.__lock: Lock = Lock()
+        self.__held: set[str] = set()
+        self.__candidates: dict[str, list[tuple[str, Any]]] = {}
+
+    def acquire(self, exprs: list[str]) -> dict[str, Any] | None:
+        """
+        Allocate resources of all `exprs` at once, or nothing.
+
+        :param exprs: `RESOURCES` of the testcase.
+        :return: {expr: allocated value}, None if some are in use.
+        """
+        allocation: dict[str, Any] = {}
+        keys: list[str] = []
+        with self.__lock:
+            # Single resources first, so pools pick the other items.
+            for expr in sorted(exprs, key=lambda e: len(self.__resolve(e))):
+                items = self.__resolve(expr)
+                if not items:
+                    allocation[expr] = None
+                    continue
+                free = [(k, v) for k, v in items if k not in self.__held]
+                # Prefer an item not allocated to another expression of the
+                # same testcase, reuse one otherwise.
+                free.sort(key=lambda item: item[0] in keys)
+                if not free:
+                    return None
+                key, allocation[expr] = free[0]
+                keys.append(key)
+            self.__held.update(keys)
+        return allocation
+
+    def release(self, allocation: dict[str, Any]) -> None:
+        """
+        Release resources allocated by `acquire`.
+        """
+        with self.__lock:
+            for value in allocation.values():
+                if value is not None:
+                    self.__held.discard(resource_key(value))
+
+    def __resolve(self, expr: str) -> list[tuple[str, Any]]:
+        """
+        Cached candidates of `expr` with their keys(lock held).
+        """
+        if expr not in self.__candidates:
+            self.__candidates[expr] = [
+                (resource_key(v), v) for v in candidates(self.testbed, expr)
+            ]
+        return self.__candidates[expr]
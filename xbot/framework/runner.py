@@ -9,81 +9,571 @@ import sys
 
 from importlib import import_module
 from datetime import datetime
-from threading import Thread
+from functools import partial
+from queue import Queue
+from threading import Thread, Lock
 from time import sleep
+from typing import Any, Callable, Hashable, Iterator, TypeAlias
 
 from xbot.framework.logger import getlogger, enable_console_logging
 from xbot.framework.testbed import TestBed
 from xbot.framework.testset import TestSet
 from xbot.framework.testcase import TestCase, ErrorTestCase
+from xbot.framework.exporter import Exporter
+from xbot.framework.fixture import FixtureManager
+from xbot.framework.resource import ResourceLocks
+from xbot.framework.param import Param, iter_params, count_params
+from xbot.framework.installcache import InstallRecords, fingerprint
+from xbot.framework.abort import AbortPolicy, NOT_RUN
+from xbot.framework.ordering import FailureOrder
+from xbot.framework.errors import TestCaseError
 from xbot.framework.utils import xprint
 
 sys.path.insert(0, '.')
 
 logger = getlogger(__name__)
 
+# Results to be re-executed if retries are configured.
+RETRY_RESULTS: tuple[str, ...] = ('FAIL', 'TIMEOUT')
+
+# A scheduled testcase: (`RESOURCES` of the testcase, function called with
+# the allocated resources).
+Job: TypeAlias = tuple[list[str], Callable[[dict[str, Any]], None]]
+
 
 class Runner(object):
     """
     Testcase runner.
     """
-    def __init__(self, testbed: TestBed, testset: TestSet) -> None:
+    def __init__(
+        self,
+        testbed: TestBed,
+        testset: TestSet,
+        exporters: list[Exporter] | None = None,
+        workers: int = 1,
+        force_install: bool = False,
+        abort: AbortPolicy | None = None,
+        order: FailureOrder | None = None
+    ) -> None:
         """
         :param testbed: TestBed instance.
         :param testset: TestSet instance.
+        :param exporters: result exporters fed as each testcase finishes.
+        :param workers: number of test testcases running at the same time
+                        (install testcases always run one by one).
+        :param force_install: run install testcases even if their
+                              fingerprints match the last successful install
+                              (see `installcache` module).
+        :param abort: when to abort the execution(see `abort` module), an
+                      install testcase failure always aborts it.
+        :param order: order of test testcases(see `ordering` module), None
+                      keeps the testset order.
         """
+        if workers < 1:
+            raise ValueError('`workers` must be greater than 0')
         self.testbed: TestBed = testbed
         self.testset: TestSet = testset
+        self.exporters: list[Exporter] = exporters or []
+        self.workers: int = workers
+        self.force_install: bool = force_install
+        self.installs: InstallRecords = InstallRecords()
+        self.abort: AbortPolicy = abort or AbortPolicy()
+        self.order: FailureOrder | None = order
+        self._outfmt: str = 'brief'
+        self._logfmt: str = 'html'
+        self._logroot: str = ''
+        self._casecnt: int = 0
+        self._fixtures: FixtureManager = FixtureManager(testbed)
+        self._classes: dict[str, type[TestCase]] = {}
+        self._errors: dict[str, Exception] = {}
+        self._pending: dict[str, int] = {}
+        self._deferred: list[tuple[int, str, TestCase]] = []
+        self._locks: ResourceLocks = ResourceLocks(testbed)
+        self._lock: Lock = Lock()
+        self._aborted: str | None = None
+        self._running: set[TestCase] = set()
+        self._notrun: int = 0
 
-    def run(self, outfmt: str = 'brief') -> str:
+    def run(self, outfmt: str = 'brief', logfmt: str = 'html') -> str:
         """
         Run testcases parsed from testset.
 
         :param outfmt: output format(verbose/brief)
+        :param logfmt: testcase log format(html/jsonl), JSON Lines logfiles
+                       are always written, `html` renders html logfiles too.
         :return: testcase logdir of this execution.
         """
         fmts = ['verbose', 'brief']
         if outfmt not in fmts:
             raise ValueError(f'`outfmt` must be one of {fmts}')
+        logfmts = ['html', 'jsonl']
+        if logfmt not in logfmts:
+            raise ValueError(f'`logfmt` must be one of {logfmts}')
         if outfmt == 'verbose':
             enable_console_logging()
-        logroot = self._make_logroot()
-        casepaths = self.testset.testcases.install + self.testset.testcases.test
-        casecnt = len(casepaths)
-        instend = len(self.testset.testcases.install) - 1
+        self._outfmt = outfmt
+        self._logfmt = logfmt
+        self._logroot = logroot = self._make_logroot()
+        self._fixtures = FixtureManager(self.testbed)
+        self._aborted = None
+        self._running = set()
+        self._notrun = 0
+        for exporter in self.exporters:
+            exporter.start(logroot)
+        try:
+            self._run_cases()
+        finally:
+            self._fixtures.cleanup_all()
+            self.testbed.close_pools()
+            for exporter in self.exporters:
+                exporter.finish()
+        return logroot
+
+    def _run_cases(self) -> None:
+        """
+        Run install testcases one by one, then schedule test testcases.
+        """
+        install = self.testset.testcases.install
+        self._preload(install + self.testset.testcases.test)
+        fingerprints = self._fingerprints(install)
+        if install and fingerprints is not None and not self.force_install \
+                and self.installs.get(self.testbed.name) == fingerprints:
+            xprint('Install testcases are skipped, fingerprints match the '
+                   'last successful install.')
+            install = ()
+        self._plan_fixtures(install + self.testset.testcases.test)
+        test = self.testset.testcases.test
+        if self.order is not None:
+            test = self.order(test)
+        test = self._group_by_fixtures(test)
+        self._casecnt = self._count_instances(install + test)
+        if install:
+            # The testbed is no longer in the recorded state.
+            self.installs.set(self.testbed.name, None)
+        seq = 0
+        for casepath in install:
+            seq = self._run_install(seq, casepath)
+        if install and fingerprints is not None and not self._aborted:
+            self.installs.set(self.testbed.name, fingerprints)
+        self._deferred = []
+        self._schedule(self._test_jobs(test, seq))
+        deferred, self._deferred = self._deferred, []
+        self._schedule(self._retry_jobs(deferred))
+        if self._notrun:
+            xprint(f'{self._notrun} testcase(s) were not run.')
+
+    def _run_install(self, seq: int, casepath: str) -> int:
+        """
+        Run all instances of a install testcase, a failure aborts the 
+        execution.
+
+        :param seq: sequence number of the last instance run before.
+        :return: sequence number of the last instance of the testcase.
+        """
+        # Fixtures are released after all instances of the testcase
+        # file finished, one reference for the file itself.
+        self._hold_fixtures(casepath)
+        for param in self._params(casepath):
+            seq += 1
+            self._hold_fixtures(casepath)
+            if self._aborted:
+                caseinst = self._not_run_case(casepath, param)
+            else:
+                caseinst = self._run_case(seq, casepath, True, param)
+                caseinst = self._retry_case(seq, casepath, True, caseinst)
+            self._finish_case(casepath, caseinst)
+            if caseinst.result not in ('PASS', NOT_RUN):
+                with self._lock:
+                    self._abort_run(f'install testcase `{caseinst.caseid}` failed.')
+        self._release_fixtures(casepath)
+        return seq
+
+    def _test_jobs(self, casepaths: tuple[str, ...], seq: int) -> Iterator[Job]:
+        """
+        Jobs of all instances of test testcases, generated lazily.
+
+        :param seq: sequence number of the last instance run before.
+        """
+        for casepath in casepaths:
+            casecls = self._classes.get(casepath)
+            resources = list(casecls.RESOURCES) if casecls else []
+            self._hold_fixtures(casepath)
+            for param in self._params(casepath):
+                seq += 1
+                self._hold_fixtures(casepath)
+                yield resources, partial(self._run_test, seq, casepath, param)
+            self._release_fixtures(casepath)
+
+    def _retry_jobs(self, deferred: list[tuple[int, str, TestCase]]) -> Iterator[Job]:
+        """
+        Jobs re-executing testcases whose retries were deferred.
+        """
+        for seq, casepath, caseinst in deferred:
+            yield list(caseinst.RESOURCES), partial(self._retry_test, seq, casepath, caseinst)
+
+    def _run_test(
+        self,
+        seq: int,
+        casepath: str,
+        param: Param | TestCaseError | None,
+        resources: dict[str, Any]
+    ) -> None:
+        """
+        Run a test testcase instance, retry it immediately or defer it,
+        finish it as NOT_RUN if the execution is aborted.
+        """
+        if self._aborted:
+            self._finish_case(casepath, self._not_run_case(casepath, param))
+            return
+        caseinst = self._run_case(seq, casepath, False, param, resources)
+        if self.testset.retry_mode == 'deferred' and self._should_retry(caseinst, 0):
+            with self._lock:
+                self._deferred.append((seq, casepath, caseinst))
+            return
+        self._retry_test(seq, casepath, caseinst, resources)
+
+    def _retry_test(
+        self,
+        seq: int,
+        casepath: str,
+        caseinst: TestCase,
+        resources: dict[str, Any]
+    ) -> None:
+        """
+        Retry a test testcase instance as needed and finish it.
+        """
+        caseinst = self._retry_case(seq, casepath, False, caseinst, resources)
+        self._finish_case(casepath, caseinst)
+
+    def _schedule(self, jobs: Iterator[Job]) -> None:
+        """
+        Run jobs on `workers` threads. A job whose resources are in use is
+        held, and the following jobs(up to `workers * 2` ahead) which do 
+        not conflict run first. With one worker jobs run in order.
+        Once the execution is aborted, jobs left run in the scheduler
+        without resources(see `_run_test`).
+        """
+        pending: list[Job] = []
+        done: Queue[BaseException | None] = Queue()
+        running = 0
+        exhausted = False
+        def work(func: Callable[[dict[str, Any]], None], resources: dict[str, Any]) -> None:
+            error = None
+            try:
+                func(resources)
+            except BaseException as e:
+                error = e
+            finally:
+                self._locks.release(resources)
+                done.put(error)
+        while True:
+            while not exhausted and len(pending) < self.workers * 2:
+                job = next(jobs, None)
+                if job is None:
+                    exhausted = True
+                else:
+                    pending.append(job)
+            if self._aborted and pending:
+                for job in pending:
+                    job[1]({})
+                pending.clear()
+                continue
+            if not pending and not running:
+                return
+            if running < self.workers:
+                for job in pending:
+                    resources = self._locks.acquire(job[0])
+                    if resources is not None:
+                        pending.remove(job)
+                        Thread(target=work, args=(job[1], resources), daemon=True).start()
+                        running += 1
+                        break
+                else:
+                    if not running:
+                        raise RuntimeError('No schedulable testcase')
+                    running -= 1
+                    self._raise(done.get())
+                continue
+            running -= 1
+            self._raise(done.get())
+
+    @staticmethod
+    def _raise(error: BaseException | None) -> None:
+        """
+        Re-raise an error of a worker in the scheduler.
+        """
+        if error is not None:
+            raise error
+
+    def _fingerprints(self, casepaths: tuple[str, ...]) -> dict[str, str] | None:
+        """
+        Fingerprints of install testcases.
+
+        :return: {casepath: fingerprint}, None if any has no fingerprint.
+        """
+        fingerprints = {}
+        for casepath in casepaths:
+            casecls = self._classes.get(casepath)
+            if casecls is None:
+                return None
+            value = fingerprint(casecls, self.testbed)
+            if value is None:
+                return None
+            fingerprints[casepath] = value
+        return fingerprints
+
+    def _preload(self, casepaths: tuple[str, ...]) -> None:
+        """
+        Import all testcase classes before execution starts and report all
+        import errors at once, the failed testcases are ERROR when they run.
+        """
+        self._classes = {}
+        self._errors = {}
+        for casepath in casepaths:
+            try:
+                self._import_case(casepath)
+            except (ImportError, AttributeError, SyntaxError):
+                pass
+        if self._errors:
+            xprint(f'{len(self._errors)} testcase(s) can not be imported:')
+            for casepath, e in self._errors.items():
+                xprint(f'  {casepath}: {type(e).__name__}: {e}')
+
+    def _plan_fixtures(self, casepaths: tuple[str, ...]) -> None:
+        """
+        Register the fixtures used by testcases to be run.
+        """
+        self._pending = {}
+        for casepath in casepaths:
+            casecls = self._classes.get(casepath)
+            if casecls is not None:
+                self._fixtures.plan(casecls, casecls.FIXTURES)
+
+    def _group_by_fixtures(self, casepaths: tuple[str, ...]) -> tuple[str, ...]:
+        """
+        Move testcases sharing a directory/module scoped fixture right 
+        after the first of them, so the fixture lives as short as possible.
+        Other testcases keep their order.
+        """
+        firsts: dict[Hashable, int] = {}
+        positions = []
         for i, casepath in enumerate(casepaths):
-            caseid = casepath.split('/')[-1].replace('.py', '')
-            abspath = os.path.abspath(casepath)
-            order = f'({i+1}/{casecnt})'
-            insting = i <= instend
+            casecls = self._classes.get(casepath)
+            keys = self._fixtures.keys(casecls, casecls.FIXTURES, 
+                                       ('directory', 'module')) if casecls else []
+            positions.append(min([firsts.setdefault(k, i) for k in keys], default=i))
+        order = sorted(range(len(casepaths)), key=lambda i: (positions[i], i))
+        return tuple(casepaths[i] for i in order)
+
+    def _count_instances(self, casepaths: tuple[str, ...]) -> int:
+        """
+        Number of testcase instances(progress total), a parametrized
+        testcase counts its parameters, one if they can not be counted.
+        """
+        count = 0
+        for casepath in casepaths:
+            casecls = self._classes.get(casepath)
+            if casecls is None or casecls.PARAMS is None:
+                count += 1
+            else:
+                count += count_params(casecls.PARAMS) or 1
+        return count
+
+    def _params(self, casepath: str) -> Iterator[Param | TestCaseError | None]:
+        """
+        Parameters of a testcase consumed lazily, None if not parametrized,
+        an invalid `PARAMS` is yielded as the error.
+        """
+        casecls = self._classes.get(casepath)
+        if casecls is None or casecls.PARAMS is None:
+            yield None
+            return
+        params = iter_params(casecls.PARAMS)
+        while True:
             try:
-                casecls = self._import_case(casepath)
-                caseinst = casecls(self.testbed, self.testset, logroot)
-            except (ImportError, AttributeError, SyntaxError) as e:
-                caseinst = ErrorTestCase(caseid, abspath, self.testbed, 
-                                         self.testset, logroot, e)
-            if outfmt == 'verbose':
-                xprint(f'Start: {caseid} {order}'.center(100, '='))
-            if outfmt == 'brief':
-                timer = self._timer(caseinst, i+1, casecnt)
-            caseinst.run(never_skip=(insting))
-            if outfmt == 'brief':
-                timer.join()
-            if outfmt == 'verbose':
-                xprint(f'End: {caseid} {order}'.center(100, '='), '\n')
-            if insting and caseinst.result != 'PASS':
-                xprint(f'Execution was interrupted because `{caseid}` failed.')
-                break
-        return logroot
+                param = next(params)
+            except StopIteration:
+                return
+            except TestCaseError as e:
+                yield e
+                return
+            yield param
+
+    def _run_case(
+        self,
+        seq: int,
+        casepath: str,
+        insting: bool,
+        param: Param | TestCaseError | None = None,
+        resources: dict[str, Any] | None = None,
+        attempt: int = 0
+    ) -> TestCase:
+        """
+        Import, instantiate and run a testcase.
+
+        :param seq: sequence number of the testcase.
+        :param casepath: testcase filepath(relative).
+        :param insting: whether it is a install testcase.
+        :param param: parameter of the instance, None if not parametrized.
+        :param resources: allocated testbed resources.
+        :param attempt: retry number, 0 for the first execution.
+        :return: finished TestCase instance.
+        """
+        order = f'({seq}/{self._casecnt})'
+        caseinst = self._make_case(casepath, param)
+        with self._lock:
+            if self._aborted:
+                # Aborted while the testcase was being imported.
+                caseinst.cancel(f'Aborted: {self._aborted}')
+            self._running.add(caseinst)
+        label = f'{caseinst.caseid} [retry {attempt}]' if attempt else caseinst.caseid
+        if self._outfmt == 'verbose':
+            xprint(f'Start: {label} {order}'.center(100, '='))
+        if self._outfmt == 'brief' and self.workers == 1:
+            timer = self._timer(caseinst, seq, self._casecnt, label)
+        caseinst.run(never_skip=(insting), html=(self._logfmt == 'html'),
+                     fixtures=self._fixtures, resources=resources)
+        with self._lock:
+            self._running.discard(caseinst)
+        if self._outfmt == 'brief' and self.workers == 1:
+            timer.join()
+        elif self._outfmt == 'brief':
+            # Running lines of parallel testcases would overwrite each other.
+            fmtstr = self._brief_fmt(seq, self._casecnt, label)
+            xprint(fmtstr % (caseinst.result, caseinst.duration))
+        if self._outfmt == 'verbose':
+            xprint(f'End: {label} {order}'.center(100, '='), '\n')
+        return caseinst
+
+    def _should_retry(self, caseinst: TestCase, attempt: int) -> bool:
+        """
+        Whether to re-execute the testcase after `attempt` retries.
+        """
+        retries = caseinst.RETRIES or self.testset.retries
+        return caseinst.result in RETRY_RESULTS and attempt < retries \
+            and not self._aborted
+
+    def _make_case(
+        self,
+        casepath: str,
+        param: Param | TestCaseError | None = None
+    ) -> TestCase:
+        """
+        Import and instantiate a testcase, an ErrorTestCase if failed.
+        """
+        caseid = casepath.split('/')[-1].removesuffix('.py')
+        abspath = os.path.abspath(casepath)
+        try:
+            if isinstance(param, TestCaseError):
+                raise param
+            casecls = self._import_case(casepath)
+            return casecls(self.testbed, self.testset, self._logroot, param)
+        except (ImportError, AttributeError, SyntaxError, TestCaseError) as e:
+            return ErrorTestCase(caseid, abspath, self.testbed, 
+                                 self.testset, self._logroot, e)
+
+    def _not_run_case(
+        self,
+        casepath: str,
+        param: Param | TestCaseError | None = None
+    ) -> TestCase:
+        """
+        Finish a testcase instance as NOT_RUN(the execution is aborted).
+        """
+        caseinst = self._make_case(casepath, param)
+        caseinst.not_run(f'Aborted: {self._aborted}')
+        return caseinst
+
+    def _abort_run(self, reason: str) -> None:
+        """
+        Abort the execution(lock held): cancel running testcases, those
+        not started yet are finished as NOT_RUN.
+        """
+        if self._aborted:
+            return
+        self._aborted = reason
+        xprint(f'Execution was interrupted: {reason}')
+        for caseinst in self._running:
+            # Cancelling waits for the stage to abort, not in the lock.
+            Thread(target=caseinst.cancel, args=(f'Aborted: {reason}',), 
+                   daemon=True).start()
+
+    def _retry_case(
+        self,
+        seq: int,
+        casepath: str,
+        insting: bool,
+        caseinst: TestCase,
+        resources: dict[str, Any] | None = None
+    ) -> TestCase:
+        """
+        Re-execute the testcase as long as it should be retried, logfiles
+        of previous attempts are kept as `<caseid>.attempt<N>.html/jsonl`.
+
+        :return: TestCase instance of the last attempt.
+        """
+        attempt = 0
+        while self._should_retry(caseinst, attempt):
+            attempt += 1
+            for logfile in (caseinst.logfile, caseinst.jsonlfile):
+                if os.path.exists(logfile):
+                    stem, ext = os.path.splitext(logfile)
+                    os.replace(logfile, f'{stem}.attempt{attempt}{ext}')
+            caseinst = self._run_case(seq, casepath, insting, caseinst.param,
+                                      resources, attempt)
+        return caseinst
+
+    def _finish_case(self, casepath: str, caseinst: TestCase) -> None:
+        """
+        Release fixtures of the finished testcase, close expired idle
+        pooled resources, feed it to exporters and the abort policy(NOT_RUN
+        testcases are only counted).
+        """
+        self._release_fixtures(casepath)
+        self.testbed.evict_pools()
+        with self._lock:
+            if caseinst.result == NOT_RUN:
+                self._notrun += 1
+                return
+            for exporter in self.exporters:
+                exporter.export(caseinst)
+            reason = self.abort.update(caseinst.result)
+            if reason is not None:
+                self._abort_run(reason)
+
+    def _hold_fixtures(self, casepath: str) -> None:
+        """
+        Add a reference of the testcase file(itself or a pending instance).
+        """
+        with self._lock:
+            self._pending[casepath] = self._pending.get(casepath, 0) + 1
+
+    def _release_fixtures(self, casepath: str) -> None:
+        """
+        Drop a reference of the testcase file, release its fixtures 
+        when no instance of it is pending.
+        """
+        with self._lock:
+            self._pending[casepath] -= 1
+            if self._pending[casepath] > 0:
+                return
+            del self._pending[casepath]
+        casecls = self._classes.get(casepath)
+        if casecls is not None:
+            self._fixtures.release(casecls, casecls.FIXTURES)
     
-    def _timer(self, caseinst: TestCase, seq: int, casecnt: int) -> Thread:
+    def _timer(
+        self,
+        caseinst: TestCase,
+        seq: int,
+        casecnt: int,
+        label: str | None = None
+    ) -> Thread:
         """
         Flush testcase execution time.
         """
         def _timer() -> None:
-            order = f'({seq}/{casecnt})'
-            order_width = len(f'{casecnt}') * 2 + 3
-            fmtstr = f'\r{order:{order_width}}  %-7s  %s  {caseinst.caseid}'
+            fmtstr = self._brief_fmt(seq, casecnt, label or caseinst.caseid)
             while not caseinst.endtime or not caseinst.result:
                 if not caseinst.starttime:
                     duration: str | object = '0:00:00'
@@ -101,6 +591,15 @@ class Runner(object):
         t.start()
         return t
         
+    @staticmethod
+    def _brief_fmt(seq: int, casecnt: int, label: str) -> str:
+        """
+        Format string of a brief output line, formatted with (result, duration).
+        """
+        order = f'({seq}/{casecnt})'
+        order_width = len(f'{casecnt}') * 2 + 3
+        return f'\r{order:{order_width}}  %-7s  %s  {label}'
+
     def _make_logroot(self) -> str:
         """
         Make testcase logdir of this execution.
@@ -114,13 +613,22 @@ class Runner(object):
 
     def _import_case(self, casepath: str) -> type[TestCase]:
         """
-        Import testcase class.
+        Import testcase class, classes and errors are cached.
 
         :param casepath: testcase filepath(relative).
         :return: testcase class.
         """
-        caseid = casepath.split('/')[-1].replace('.py', '')
-        modname = casepath.replace('/', '.').replace('.py', '')
-        casemod = import_module(modname)
-        casecls = getattr(casemod, caseid)
+        if casepath in self._classes:
+            return self._classes[casepath]
+        if casepath in self._errors:
+            raise self._errors[casepath]
+        caseid = casepath.split('/')[-1].removesuffix('.py')
+        modname = casepath.removesuffix('.py').replace('/', '.')
+        try:
+            casemod = import_module(modname)
+            casecls = getattr(casemod, caseid)
+        except (ImportError, AttributeError, SyntaxError) as e:
+            self._errors[casepath] = e
+            raise
+        self._classes[casepath] = casecls
         return casecls
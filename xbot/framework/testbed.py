@@ -2,36 +2,125 @@
 
 """
 Test environment information management.
+
+A testbed can be split into files: `!include` sections are loaded when
+first accessed(see `loader` module), and overlay files(e.g. environment
+specific overrides) are merged over the base testbed in order.
+
+List sections searched in loops(e.g. a large host inventory) can be
+indexed by item keys, see `TestBed.INDEXES`.
 """
 
 import os
+import re
+import json
 
 import jmespath
+import jmespath.functions
+
+from typing import Any, Callable, ClassVar, Hashable
 
-from typing import Any
+from xbot.framework.loader import load_yaml, resolve_includes, Include, LazyDict
+from xbot.framework.pool import PoolManager, ResourcePool
 
-from ruamel import yaml
+
+def merge(base: Any, overlay: Any) -> Any:
+    """
+    Merge `overlay` into `base`, mappings are merged recursively, any other
+    value(including lists and `!include` sections) replaces the base one.
+
+    >>> merge({'a': {'b': 1, 'c': 2}, 'd': [1]}, {'a': {'c': 3}, 'd': [2], 'e': 4})
+    {'a': {'b': 1, 'c': 3}, 'd': [2], 'e': 4}
+
+    :return: merged data.
+    """
+    if not isinstance(base, dict) or not isinstance(overlay, dict):
+        return overlay
+    lazy = isinstance(base, LazyDict)
+    for key in overlay:
+        # Raw values, sections not merged into are kept unloaded.
+        value = dict.__getitem__(overlay, key)
+        if isinstance(value, dict) and key in base:
+            value = merge(base[key], value)
+        lazy = lazy or isinstance(value, Include)
+        dict.__setitem__(base, key, value)
+    return LazyDict(base) if lazy and not isinstance(base, LazyDict) else base
+
+
+class Functions(jmespath.functions.Functions):
+    """
+    JMESPath built-in functions accepting `LazyDict` as an object(types
+    are checked by exact class name).
+    """
+    def _type_check_single(self, current: Any, types: Any, function_name: str) -> None:
+        if isinstance(current, LazyDict):
+            current = {}
+        super()._type_check_single(current, types, function_name)
+
+
+# Options of JMESPath searches on testbed data.
+JMESPATH_OPTIONS: jmespath.Options = jmespath.Options(custom_functions=Functions())
+
+
+def join_contents(contents: list[tuple[str, str]]) -> str:
+    """
+    Content of a testbed and its overlays.
+
+    :param contents: [(filepath, content), ...], the testbed first.
+    """
+    return '\n'.join(c if not i else f'# Overlay: {p}\n{c}'
+                     for i, (p, c) in enumerate(contents))
+
+
+# `section[?key=='value']` or section[?key==`json`], optionally `| [0]`.
+FILTER_RE = re.compile(
+    r"\s*(?P<section>[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*)\s*"
+    r"\[\?\s*(?P<key>[A-Za-z_]\w*)\s*==\s*"
+    r"(?:'(?P<raw>[^'\\]*)'|`(?P<json>[^`]*)`)\s*\]"
+    r"(?P<first>\s*\|\s*\[0\])?\s*"
+)
+
+
+def index_key(value: Any) -> Hashable:
+    """
+    Index key of an item value, booleans never equal numbers(as JMESPath).
+
+    :raises TypeError: if `value` is unhashable.
+    """
+    key = (isinstance(value, bool), value)
+    hash(key)
+    return key
 
 
 class TestBed(object):
     """
     Test environment information manager.
     """
-    def __init__(self, filepath: str) -> None:
+    # Indexes built at load, {section: [key, ...]}, e.g.
+    # `{'hosts': ['name', 'role', 'ip']}`, see `lookup`.
+    INDEXES: ClassVar[dict[str, list[str]]] = {}
+
+    def __init__(self, filepath: str, overlays: list[str] | None = None) -> None:
         """
         :param filepath: testbed filepath.
+        :param overlays: filepaths merged over the testbed in order.
         """
-        self.__data: dict[str, Any] = self.__parse(filepath)
+        self.__data: dict[str, Any] = {}
+        contents = []
+        for i, path in enumerate([filepath] + list(overlays or [])):
+            data, content = load_yaml(path, includes=True)
+            data = resolve_includes(data, os.path.dirname(path))
+            self.__data = merge(self.__data, data) if i else data
+            contents.append((path, content))
+        self.__content: str = join_contents(contents)
+        self.__overlays: list[str] = [os.path.abspath(p) for p in overlays or []]
+        self.__filepath: str = os.path.abspath(filepath)
         self.__name: str = os.path.basename(filepath).rsplit('.', 1)[0]
-        with open(filepath, encoding='utf8') as f:
-            self.__content: str = f.read()
-
-    def __parse(self, filepath: str) -> dict[str, Any]:
-        """
-        Parse testbed.
-        """
-        with open(filepath, encoding='utf8') as f:
-            return yaml.YAML(typ='safe').load(f)
+        self.__pools: PoolManager = PoolManager()
+        self.__indexes: dict[tuple[str, str], dict[Hashable, list[Any]]] = {}
+        for section, keys in self.INDEXES.items():
+            for key in keys:
+                self.add_index(section, key)
 
     @property
     def name(self) -> str:
@@ -40,6 +129,20 @@ class TestBed(object):
         """
         return self.__name
     
+    @property
+    def filepath(self) -> str:
+        """
+        testbed filepath(absolute).
+        """
+        return self.__filepath
+
+    @property
+    def overlays(self) -> list[str]:
+        """
+        Overlay filepaths(absolute).
+        """
+        return self.__overlays
+
     @property
     def content(self) -> str:
         """
@@ -84,5 +187,108 @@ class TestBed(object):
         {'x': 2, 'y': 'i'}
         >>> get('a.b3[?x==`3`]') == None
         True
+
+        Filters like `hosts[?name=='db01']` on indexed keys(see `lookup`)
+        do not scan the list.
+        """
+        if self.__indexes:
+            match = FILTER_RE.fullmatch(expr)
+            if match and (match['section'], match['key']) in self.__indexes:
+                try:
+                    value = match['raw'] if match['json'] is None \
+                        else json.loads(match['json'])
+                    items = self.lookup(match['section'], match['key'], value)
+                except (ValueError, TypeError):
+                    pass
+                else:
+                    if match['first']:
+                        return items[0] if items else None
+                    return items
+        return jmespath.search(expr, self.__data, JMESPATH_OPTIONS)
+
+    def add_index(self, section: str, key: str) -> None:
+        """
+        Index items of a list section by `key`.
+
+        :param section: JMESPath expression of the list section, e.g. `hosts`.
+        :param key: item key, e.g. `name`.
+        :raises ValueError: if `section` is not a list.
+        """
+        items = jmespath.search(section, self.__data, JMESPATH_OPTIONS)
+        if not isinstance(items, list):
+            raise ValueError(f'Testbed section `{section}` is not a list.')
+        index: dict[Hashable, list[Any]] = {}
+        for item in items:
+            if item is None:
+                # Dropped from JMESPath filter results.
+                continue
+            value = item.get(key) if isinstance(item, dict) else None
+            try:
+                index.setdefault(index_key(value), []).append(item)
+            except TypeError:
+                # Unhashable values are never looked up by index.
+                pass
+        self.__indexes[(section, key)] = index
+
+    def lookup(self, section: str, key: str, value: Any) -> list[Any]:
+        """
+        Items of a list section whose `key` equals `value`, by the index
+        declared in `INDEXES` or added by `add_index`.
+
+        >>> lookup('hosts', 'name', 'db01')
+        [{'name': 'db01', 'role': 'db', 'ip': '10.0.0.2'}]
+
+        :raises KeyError: if the index does not exist.
+        :raises TypeError: if `value` is unhashable.
+        """
+        try:
+            index = self.__indexes[(section, key)]
+        except KeyError:
+            raise KeyError(f'No index on `{key}` of `{section}`.') from None
+        return list(index.get(index_key(value), []))
+
+    def register_resource(
+        self,
+        name: str,
+        factory: Callable[..., Any],
+        **options: Any
+    ) -> None:
+        """
+        Register a pooled resource(e.g. SSH/DB/HTTP sessions to the hosts),
+        resources are reused by testcases of the execution.
+
+        Example(e.g. in `__init__` of `lib/testbed.py`)::
+
+            self.register_resource('ssh', lambda host: SSH(self.get(f'hosts.{host}')),
+                                   maxsize=2, check=lambda ssh: ssh.alive())
+
+        :param name: resource name.
+        :param factory: function creating a resource, called with `key` of
+                        `pool`/`TestCase.checkout` if it is not None.
+        :param options: `pool.ResourcePool` options(maxsize, check, close,
+                        idle_timeout).
+        """
+        self.__pools.register(name, factory, **options)
+
+    def pool(self, name: str, key: Hashable = None) -> ResourcePool[Any]:
+        """
+        Get the pool of resource `name` for `key`.
+
+        :raises KeyError: if `name` is not registered.
+        """
+        return self.__pools.pool(name, key)
+
+    def evict_pools(self) -> int:
+        """
+        Close pooled resources idle longer than their `idle_timeout`(the
+        runner calls it as testcases finish).
+
+        :return: number of closed resources.
+        """
+        return self.__pools.evict()
+
+    def close_pools(self) -> None:
+        """
+        Close pooled resources(at the end of the execution).
         """
-        return jmespath.search(expr, self.__data)
+        self.__pools.close()
@@ -11,16 +11,30 @@ import traceback
 import re
 import time
 import inspect
+import asyncio
+import concurrent.futures
 
-from typing import Any, ClassVar
+from typing import Any, Callable, ClassVar, Hashable, TypeVar
 from datetime import datetime, timedelta
 from importlib import import_module
-from threading import Thread
+from threading import Thread, Timer, Lock
 
-from xbot.framework import logger, common, utils
+from xbot.framework import logger, common, utils, aio
 from xbot.framework.testbed import TestBed
 from xbot.framework.testset import TestSet
 from xbot.framework.errors import TestCaseTimeout, TestCaseError
+from xbot.framework.fixture import FixtureManager
+from xbot.framework.param import Param
+from xbot.framework.utils import CancelToken
+from xbot.framework.pool import ResourcePool
+from xbot.framework.abort import NOT_RUN
+
+
+T = TypeVar('T')
+
+# Seconds to wait for a cancelled stage to abort by itself before it 
+# is forced to end.
+CANCEL_GRACE: float = 1
 
 
 class TestCase(object):
@@ -33,17 +47,37 @@ class TestCase(object):
     FAILFAST: ClassVar[bool] = True
     # For testcase filtering.
     TAGS: ClassVar[list[str]] = []
+    # Times to re-execute when the result is FAIL/TIMEOUT, 0 means
+    # following `retries` of the testset.
+    RETRIES: ClassVar[int] = 0
+    # Names of shared fixtures used by the testcase(see `fixture` module).
+    FIXTURES: ClassVar[list[str]] = []
+    # Parameters to expand the testcase into one instance per parameter
+    # (see `param` module), None means not parametrized.
+    PARAMS: ClassVar[Any] = None
+    # Maximum execution time(seconds) of steps, e.g. {'step1': 10}, a timed 
+    # out stage is cancelled and the remaining time goes to `teardown`.
+    STEP_TIMEOUTS: ClassVar[dict[str, float]] = {}
+    # Testbed resources used by the testcase, JMESPath expressions(see
+    # `resource` module), testcases running in parallel never share them.
+    RESOURCES: ClassVar[list[str]] = []
+    # What an install testcase installs, a constant or a function of the
+    # TestBed(see `installcache` module), None means always install.
+    FINGERPRINT: ClassVar[Any] = None
 
     def __init__(
         self,
         testbed: TestBed,
         testset: TestSet,
-        logroot: str
+        logroot: str,
+        param: Param | None = None
     ) -> None:
         """
         :param testbed: TestBed instance.
         :param logroot: testcase logdir.
+        :param param: parameter of this instance if parametrized.
         """
+        self.__param: Param | None = param
         self.__testbed: TestBed = testbed
         self.__testset: TestSet = testset
         self.__logroot: str = logroot
@@ -51,9 +85,24 @@ class TestCase(object):
         self.__endtime: datetime | None = None
         self.__duration: timedelta | None = None
         self.__result: str | None = None
+        self.__errmsg: str | None = None
         self.__logger: logger.XLogger = logger.getlogger(self.caseid)
+        self.__html: bool = True
+        self.__fixtures: FixtureManager | None = None
+        self.__thread: Thread | None = None
+        self.__token: CancelToken | None = None
+        self.__stagelock: Lock = Lock()
+        self.__timeout_reason: str | None = None
+        self.__aborted: bool = False
+        self.__stage: str | None = None
+        self.__case_deadline: float | None = None
+        self.__deadline: float | None = None
+        self.__deadline_reason: str | None = None
+        self.__waits: list[dict[str, Any]] = []
+        self.__checkouts: list[tuple[ResourcePool[Any], Any]] = []
+        self.__resources: dict[str, Any] = {}
         self.__loghdlr: logger.CaseLogHandler = logger.CaseLogHandler(
-            logging.DEBUG
+            logging.DEBUG, self.jsonlfile
         )
         self.__loghdlr.addFilter(logger.CaseLogFilter(self.caseid))
         self.__loghdlr.setFormatter(logger.FORMATTER)
@@ -66,12 +115,22 @@ class TestCase(object):
         """
         return self.__testbed
 
+    @property
+    def param(self) -> Param | None:
+        """
+        Parameter of this instance, None if not parametrized.
+        """
+        return self.__param
+
     @property
     def caseid(self) -> str:
         """
-        Testcase filename(without suffix).
+        Testcase filename(without suffix), with `[<index>]` if parametrized.
         """
-        return os.path.basename(self.abspath.replace('.py', ''))
+        caseid = os.path.basename(self.abspath).removesuffix('.py')
+        if self.__param is not None:
+            caseid += f'[{self.__param.index}]'
+        return caseid
     
     @property
     def abspath(self) -> str:
@@ -86,10 +145,14 @@ class TestCase(object):
     @property
     def relpath(self) -> str:
         """
-        Relative path of testcase file(startswith `testcases`, split by `/`).
+        Relative path of testcase file(startswith `testcases`, split by `/`),
+        with `[<index>]` before the suffix if parametrized.
         """
         paths = self.abspath.split(os.path.sep)
-        return '/'.join(paths[paths.index('testcases'):])
+        relpath = '/'.join(paths[paths.index('testcases'):])
+        if self.__param is not None:
+            relpath = relpath.removesuffix('.py') + f'[{self.__param.index}].py'
+        return relpath
     
     @property
     def logfile(self) -> str:
@@ -97,9 +160,16 @@ class TestCase(object):
         Logfile path(absolute).
         """
         return os.path.normpath(
-            os.path.join(self.__logroot, self.relpath.replace('.py', '.html'))
+            os.path.join(self.__logroot, self.relpath.removesuffix('.py') + '.html')
         )
     
+    @property
+    def jsonlfile(self) -> str:
+        """
+        JSON Lines logfile path(absolute).
+        """
+        return self.logfile.removesuffix('.html') + '.jsonl'
+
     @property
     def sourcecode(self) -> str:
         """
@@ -164,6 +234,13 @@ class TestCase(object):
         """
         return self.__result
     
+    @property
+    def errmsg(self) -> str | None:
+        """
+        Error message of the first non-passed stage.
+        """
+        return self.__errmsg
+
     def debug(self, msg: object, *args: Any, **kwargs: Any) -> None:
         """
         debug level log.
@@ -192,16 +269,197 @@ class TestCase(object):
         kwargs['stacklevel'] = kwargs.get('stacklevel', 2)
         self.__logger.error(msg, *args, **kwargs)
 
+    def fixture(self, name: str) -> Any:
+        """
+        Get value of a shared fixture declared in `FIXTURES`.
+        """
+        if name not in self.FIXTURES or self.__fixtures is None:
+            raise TestCaseError(f'Fixture `{name}` is not declared in `FIXTURES`.')
+        return self.__fixtures.get(self.__class__, name)
+
+    @property
+    def waits(self) -> list[dict[str, Any]]:
+        """
+        Statistics of `wait_until` calls, 
+        [{'stage', 'desc', 'timeout', 'duration', 'polls', 'satisfied'}, ...]
+        """
+        return self.__waits
+
+    @property
+    def cancel_token(self) -> CancelToken:
+        """
+        Cancellation token of the running stage, also available to library
+        code by `CancelToken.current()`.
+        """
+        return self.__token or CancelToken.current()
+
+    def resource(self, expr: str) -> Any:
+        """
+        Testbed resource allocated for an expression declared in `RESOURCES`,
+        one item if the expression resolves to a list.
+        """
+        if expr not in self.RESOURCES:
+            raise TestCaseError(f'Resource `{expr}` is not declared in `RESOURCES`.')
+        if expr not in self.__resources:
+            value = self.testbed.get(expr)
+            self.__resources[expr] = (value[0] if value else None) \
+                if isinstance(value, list) else value
+        return self.__resources[expr]
+
+    def checkout(self, name: str, key: Hashable = None, timeout: float | None = None) -> Any:
+        """
+        Check out a pooled resource registered on the testbed(see 
+        `TestBed.register_resource`), it is returned to the pool when the
+        testcase ends.
+
+        :param name: resource name.
+        :param key: resource key, e.g. host name.
+        :param timeout: maximum seconds to wait if the pool is full.
+        """
+        pool = self.testbed.pool(name, key)
+        resource = pool.acquire(timeout)
+        self.__checkouts.append((pool, resource))
+        return resource
+
     def sleep(self, seconds: float) -> None:
         """
-        Sleep for a specified number of seconds.
+        Sleep for a specified number of seconds, abort if the stage is
+        cancelled.
         """
         self.info('Sleep %s second(s)...' % seconds, stacklevel=3)
-        time.sleep(seconds)
+        self.cancel_token.wait(seconds)
+
+    def wait_until(
+        self,
+        predicate: Callable[[], T],
+        timeout: float,
+        interval: float = 0.1,
+        backoff: float = 2,
+        max_interval: float = 5,
+        desc: str | None = None
+    ) -> T:
+        """
+        Wait until `predicate` returns a truthy value(see `utils.wait_until`),
+        `timeout` is limited to the remaining time of the step(the step times
+        out if that is not enough), one line is logged for the whole wait.
+        Use `await_until` in `async def` steps.
+
+        :param predicate: function to poll.
+        :param timeout: maximum seconds to wait.
+        :param interval: seconds before the second call.
+        :param backoff: interval factor, 1 for fixed interval.
+        :param max_interval: maximum interval.
+        :param desc: description of the condition in log.
+        :return: the truthy value returned by `predicate`.
+        :raises TimeoutError: if not satisfied within `timeout` seconds.
+                TestCaseTimeout: if not satisfied within the remaining time
+                                 of the step.
+                RuntimeError: if called in an `async def` step(it would
+                              block the shared event loop).
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError('`wait_until` blocks the event loop, use '
+                               '`await self.await_until(...)` in `async def` steps.')
+        desc = desc or getattr(predicate, '__name__', repr(predicate))
+        timeout, capped = self.__wait_timeout(timeout)
+        polls = 0
+        def poll() -> T:
+            nonlocal polls
+            polls += 1
+            return predicate()
+        start = time.monotonic()
+        satisfied = False
+        try:
+            value = utils.wait_until(poll, timeout, interval, backoff, max_interval)
+            satisfied = True
+            return value
+        except TimeoutError:
+            if capped is not None:
+                # The step timed out, do not wait for the watchdog.
+                raise TestCaseTimeout(capped) from None
+            raise
+        finally:
+            self.__log_wait(desc, timeout, start, polls, satisfied)
+
+    async def await_until(
+        self,
+        predicate: Callable[[], T],
+        timeout: float,
+        interval: float = 0.1,
+        backoff: float = 2,
+        max_interval: float = 5,
+        desc: str | None = None
+    ) -> T:
+        """
+        `wait_until` for `async def` steps, other tasks of the shared event
+        loop keep running while waiting(see `utils.await_until`).
+        """
+        desc = desc or getattr(predicate, '__name__', repr(predicate))
+        timeout, capped = self.__wait_timeout(timeout)
+        polls = 0
+        def poll() -> T:
+            nonlocal polls
+            polls += 1
+            return predicate()
+        start = time.monotonic()
+        satisfied = False
+        try:
+            value = await utils.await_until(poll, timeout, interval, backoff, max_interval)
+            satisfied = True
+            return value
+        except TimeoutError:
+            if capped is not None:
+                raise TestCaseTimeout(capped) from None
+            raise
+        finally:
+            self.__log_wait(desc, timeout, start, polls, satisfied)
+
+    def __wait_timeout(self, timeout: float) -> tuple[float, str | None]:
+        """
+        Timeout of a wait limited to the remaining time of the step, and
+        the timeout reason of the step if limited.
+        """
+        if self.__deadline is not None:
+            remaining = max(self.__deadline - time.monotonic(), 0)
+            if remaining < timeout:
+                return remaining, self.__deadline_reason
+        return timeout, None
+
+    def __log_wait(
+        self,
+        desc: str,
+        timeout: float,
+        start: float,
+        polls: int,
+        satisfied: bool
+    ) -> None:
+        """
+        Record statistics of a wait and log one line for it.
+        """
+        duration = round(time.monotonic() - start, 3)
+        stat = {'stage': self.__loghdlr.stage, 'desc': desc, 'timeout': timeout,
+                'duration': duration, 'polls': polls, 'satisfied': satisfied}
+        self.__waits.append(stat)
+        self.__loghdlr.write({'type': 'wait', **stat})
+        self.info('Wait until %s: %s after %.2f second(s), %d poll(s).',
+                  desc, 'satisfied' if satisfied else 'not satisfied',
+                  duration, polls, stacklevel=4)
+
+    async def asleep(self, seconds: float) -> None:
+        """
+        Sleep for a specified number of seconds in `async def` steps.
+        """
+        self.info('Sleep %s second(s)...' % seconds, stacklevel=3)
+        await asyncio.sleep(seconds)
 
     def setup(self) -> None:
         """
-        Testcase preset step.
+        Testcase preset step(steps can also be `async def`, they run on
+        a shared event loop, see `aio` module).
         """
         raise NotImplementedError
 
@@ -218,22 +476,84 @@ class TestCase(object):
         """
         raise NotImplementedError
     
-    def run(self, never_skip: bool = False) -> None:
+    def run(
+        self,
+        never_skip: bool = False,
+        html: bool = True,
+        fixtures: FixtureManager | None = None,
+        resources: dict[str, Any] | None = None
+    ) -> None:
         """
         Run the current testcase.
 
         :param never_skip: Ignore tags matching.
-        """
-        t = Thread(
+        :param html: Render html logfile, otherwise only the JSON Lines 
+                     logfile is written (see `report.render_log`).
+        :param fixtures: Shared FixtureManager, the testcase has its 
+                         own fixtures if None.
+        :param resources: Resources allocated by the runner(see `resource`
+                          module), resolved from the testbed if None.
+        """
+        self.__resources = dict(resources or {})
+        self.__html = html
+        self.__loghdlr.keep = html
+        self.__fixtures = fixtures or FixtureManager(self.testbed)
+        if fixtures is None:
+            self.__fixtures.plan(self.__class__, self.FIXTURES)
+        t = self.__thread = Thread(
             target=self.__run,
             args=(never_skip,),
             name=self.caseid,
         )
+        self.__case_deadline = time.monotonic() + self.TIMEOUT
         t.start()
         t.join(self.TIMEOUT)
         if t.is_alive():
-            utils.stop_thread(t, TestCaseTimeout)
+            reason = ('TestCaseTimeout: Execution did not '
+                      'complete within %s second(s).' % self.TIMEOUT)
+            with self.__stagelock:
+                self.__timeout_reason = reason
+                token = self.__token
+            if token is not None:
+                self.__cancel_stage(token, reason)
             t.join(60)  # 等待 teardown 完成。
+        if fixtures is None:
+            self.__fixtures.release(self.__class__, self.FIXTURES)
+
+    def cancel(self, reason: str) -> None:
+        """
+        Cancel the testcase from another thread(the execution is aborted),
+        the running stage is cancelled like a timed out one, the remaining
+        steps are skipped and `teardown` still runs, the result is ERROR.
+
+        :param reason: error message of the testcase.
+        """
+        with self.__stagelock:
+            if self.__timeout_reason:
+                return
+            self.__aborted = True
+            self.__timeout_reason = reason
+            token = self.__token
+            stage = self.__stage
+        if token is not None and stage != 'teardown':
+            self.__cancel_stage(token, reason)
+
+    def not_run(self, reason: str) -> None:
+        """
+        Finish the testcase as NOT_RUN without executing it(the execution
+        was aborted before it started), only the JSON Lines logfile is 
+        written.
+
+        :param reason: error message of the testcase.
+        """
+        self.__starttime = self.__endtime = datetime.now().replace(microsecond=0)
+        self.__duration = timedelta()
+        self.__result = NOT_RUN
+        self.__errmsg = reason
+        self.__write_head()
+        self.__write_result()
+        logger.ROOT_LOGGER.removeHandler(self.__loghdlr)
+        self.__loghdlr.close()
 
     def __run(self, never_skip: bool = False) -> None:
         """
@@ -242,6 +562,11 @@ class TestCase(object):
         :param never_skip: Ignore tags matching.
         """
         self.__starttime = datetime.now().replace(microsecond=0)
+        logger.CURRENT_CASE.set(self.caseid)
+        self.__write_head()
+        if self.__param is not None:
+            self.__loghdlr.set_stage('setup')
+            self.info('Param: %r', self.__param.value)
         if not never_skip and self.skipped:
             self.__loghdlr.set_stage('setup')
             self.__result = 'SKIP'
@@ -256,32 +581,136 @@ class TestCase(object):
                                              not self.FAILFAST):
                         self.__run_stage(step)
             self.__run_stage('teardown')
+        while self.__checkouts:
+            pool, resource = self.__checkouts.pop()
+            pool.release(resource)
         self.__endtime = datetime.now().replace(microsecond=0)
         self.__duration = self.__endtime - self.__starttime
         self.__result = self.__result or 'PASS'
-        self.__dump_log()
+        self.__write_result()
+        if self.__html:
+            self.__dump_log()
         logger.ROOT_LOGGER.removeHandler(self.__loghdlr)
+        self.__loghdlr.close()
+
+    def __write_head(self) -> None:
+        """
+        Write the testcase record to the JSON Lines logfile.
+        """
+        assert self.__starttime is not None
+        self.__loghdlr.write({
+            'type': 'case',
+            'caseid': self.caseid,
+            'path': self.relpath,
+            'starttime': self.__starttime.strftime('%Y-%m-%d %H:%M:%S'),
+            'testbed': self.testbed.filepath,
+            'overlays': self.testbed.overlays,
+            'sourcecode': self.sourcecode,
+            'param': self.__param.value if self.__param else None
+        })
+
+    def __write_result(self) -> None:
+        """
+        Write the result record to the JSON Lines logfile.
+        """
+        assert self.__starttime is not None and self.__endtime is not None
+        self.__loghdlr.write({
+            'type': 'result',
+            'result': self.__result,
+            'starttime': self.__starttime.strftime('%Y-%m-%d %H:%M:%S'),
+            'endtime': self.__endtime.strftime('%Y-%m-%d %H:%M:%S'),
+            'duration': str(self.__duration)
+        })
 
     def __run_stage(self, stage: str) -> None:
         """
         Run the specified stage(setup, step1, ..., stepn, teardown).
         """
         func = getattr(self, stage)
+        token = CancelToken()
+        token.activate()
+        with self.__stagelock:
+            self.__token = token
+            self.__stage = stage
+            if self.__timeout_reason and stage != 'teardown':
+                token.cancel(self.__timeout_reason)
+        timeout = self.STEP_TIMEOUTS.get(stage)
+        step_reason = ('TestCaseTimeout: Step `%s` did not complete '
+                       'within %s second(s).' % (stage, timeout))
+        deadlines = [(time.monotonic() + timeout, step_reason)] if timeout else []
+        if self.__case_deadline is not None \
+                and (stage != 'teardown' or self.__case_deadline > time.monotonic()):
+            deadlines.append((self.__case_deadline,
+                              'TestCaseTimeout: Execution did not complete '
+                              'within %s second(s).' % self.TIMEOUT))
+        self.__deadline, self.__deadline_reason = min(deadlines, default=(None, None))
+        watchdog = None
+        if timeout:
+            watchdog = Timer(timeout, self.__cancel_stage, args=(token, step_reason))
+            watchdog.daemon = True
+            watchdog.start()
         try:
-            self.__loghdlr.set_stage(stage)
-            if not callable(func):
-                raise TypeError(f'`{stage}` is not callable')
-            func()
+            try:
+                self.__loghdlr.set_stage(stage)
+                token.check()
+                if not callable(func):
+                    raise TypeError(f'`{stage}` is not callable')
+                if inspect.iscoroutinefunction(func):
+                    self.__run_async(func, token)
+                else:
+                    func()
+            finally:
+                with self.__stagelock:
+                    self.__token = None
+                if watchdog is not None:
+                    watchdog.cancel()
         except TestCaseTimeout as e:
-            self.__result = 'TIMEOUT'
-            self.error('TestCaseTimeout: Execution did not '
-                       'complete within %s second(s).' % self.TIMEOUT)
+            self.__result = 'ERROR' if self.__aborted else 'TIMEOUT'
+            errmsg = token.reason or str(e) or ('TestCaseTimeout: Execution did not '
+                                                'complete within %s second(s).' % self.TIMEOUT)
+            self.__errmsg = self.__errmsg or errmsg
+            self.error(errmsg)
         except Exception as e:
             if isinstance(e, TestCaseError):
                 self.__result = 'ERROR'
             else:
                 self.__result = 'FAIL'
-            self.error(traceback.format_exc().strip())
+            errmsg = traceback.format_exc().strip()
+            self.__errmsg = self.__errmsg or errmsg
+            self.error(errmsg)
+
+    def __run_async(self, func: Any, token: CancelToken) -> None:
+        """
+        Run an `async def` stage on the shared event loop, the task is 
+        cancelled when the stage is cancelled.
+        """
+        future = aio.submit(func())
+        token.add_callback(future.cancel)
+        while not future.done():
+            # Wait in short slices to stay interruptible by `stop_thread`.
+            concurrent.futures.wait([future], 0.1)
+        try:
+            future.result()
+        except (concurrent.futures.CancelledError, asyncio.CancelledError):
+            raise TestCaseTimeout(token.reason) from None
+
+    def __cancel_stage(self, token: CancelToken, reason: str) -> None:
+        """
+        Cancel a stage by its token, force it to end if it does not abort
+        within `CANCEL_GRACE` seconds.
+        """
+        with self.__stagelock:
+            if self.__token is not token:
+                return
+            token.cancel(reason)
+        deadline = time.time() + CANCEL_GRACE
+        while time.time() < deadline:
+            if self.__token is not token:
+                return
+            time.sleep(0.05)
+        with self.__stagelock:
+            if self.__token is token and self.__thread is not None:
+                utils.stop_thread(self.__thread, TestCaseTimeout)
 
     def __dump_log(self) -> None:
         """
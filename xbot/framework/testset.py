@@ -9,8 +9,7 @@ import os
 from typing import Any, NamedTuple
 from functools import cached_property
 
-from ruamel import yaml
-
+from xbot.framework.loader import load_yaml
 from xbot.framework.utils import ordered_walk
 from xbot.framework.errors import TestSetError
 
@@ -31,6 +30,7 @@ class TestSet(object):
         :return: None.
         """
         self._data: dict[str, Any] = self._parse(filepath)
+        self.__selected: TestCases | None = None
 
     def _parse(self, filepath: str) -> dict[str, Any]:
         """
@@ -39,37 +39,42 @@ class TestSet(object):
         :param filepath: testset filepath.
         :return: parsed testset data.
         """
-        with open(filepath, encoding='utf8') as f:
-            data = yaml.YAML(typ='safe').load(f)
-            if not isinstance(data, dict):
-                raise TestSetError('Testset is not a dict.')
-            if 'tags' not in data:
-                raise TestSetError('No `tags` found in testset.')
-            if not isinstance(data['tags'], dict):
-                raise TestSetError('`tags` is not a dict.')
-            if 'include' not in data['tags']:
-                raise TestSetError('No `tags.include` found in testset.')
-            if data['tags']['include'] and not isinstance(data['tags']['include'], list):
-                raise TestSetError('`tags.include` is not a list.')
-            if 'exclude' not in data['tags']:
-                raise TestSetError('No `tags.exclude` found in testset.')
-            if data['tags']['exclude'] and not isinstance(data['tags']['exclude'], list):
-                raise TestSetError('`tags.exclude` is not a list.')
-            if 'testcases' not in data:
-                raise TestSetError('No `testcases` found in testset.')
-            if not isinstance(data['testcases'], dict):
-                raise TestSetError('`testcases` is not a dict.')
-            for f in ('install', 'test'):
-                if f not in data['testcases']:
-                    raise TestSetError(f'No `testcases.{f}` found in testset.')
-                v = data['testcases'][f]
-                if v is not None and not isinstance(v, list):
-                    raise TestSetError(f'`testcases.{f}` is not a list.')
-                if v:
-                    for p in v:
-                        if not os.path.exists(p):
-                            raise TestSetError(f'Path `{p}` does not exist.')
-            return data
+        data, _ = load_yaml(filepath)
+        if not isinstance(data, dict):
+            raise TestSetError('Testset is not a dict.')
+        if 'tags' not in data:
+            raise TestSetError('No `tags` found in testset.')
+        if not isinstance(data['tags'], dict):
+            raise TestSetError('`tags` is not a dict.')
+        if 'include' not in data['tags']:
+            raise TestSetError('No `tags.include` found in testset.')
+        if data['tags']['include'] and not isinstance(data['tags']['include'], list):
+            raise TestSetError('`tags.include` is not a list.')
+        if 'exclude' not in data['tags']:
+            raise TestSetError('No `tags.exclude` found in testset.')
+        if data['tags']['exclude'] and not isinstance(data['tags']['exclude'], list):
+            raise TestSetError('`tags.exclude` is not a list.')
+        if 'retries' in data and (isinstance(data['retries'], bool)
+                                  or not isinstance(data['retries'], int)
+                                  or data['retries'] < 0):
+            raise TestSetError('`retries` is not a non-negative integer.')
+        if data.get('retry_mode', 'immediate') not in ('immediate', 'deferred'):
+            raise TestSetError('`retry_mode` is not `immediate` or `deferred`.')
+        if 'testcases' not in data:
+            raise TestSetError('No `testcases` found in testset.')
+        if not isinstance(data['testcases'], dict):
+            raise TestSetError('`testcases` is not a dict.')
+        for f in ('install', 'test'):
+            if f not in data['testcases']:
+                raise TestSetError(f'No `testcases.{f}` found in testset.')
+            v = data['testcases'][f]
+            if v is not None and not isinstance(v, list):
+                raise TestSetError(f'`testcases.{f}` is not a list.')
+            if v:
+                for p in v:
+                    if not os.path.exists(p):
+                        raise TestSetError(f'Path `{p}` does not exist.')
+        return data
 
     @cached_property
     def include_tags(self) -> tuple[str, ...]:
@@ -88,9 +93,32 @@ class TestSet(object):
         return tuple(exclude_tags)
 
     @cached_property
+    def retries(self) -> int:
+        """
+        times to re-execute FAIL/TIMEOUT testcases(default 0).
+        """
+        return self._data.get('retries') or 0
+
+    @cached_property
+    def retry_mode(self) -> str:
+        """
+        when to re-execute, `immediate` or `deferred`(to the end).
+        """
+        return self._data.get('retry_mode') or 'immediate'
+
+    @property
     def testcases(self) -> TestCases:
         """
-        testcases list.
+        testcases list(test testcases narrowed by `select`).
+        """
+        if self.__selected is not None:
+            return self.__selected
+        return self._all_testcases
+
+    @cached_property
+    def _all_testcases(self) -> TestCases:
+        """
+        testcases list of the testset file.
         """
         testcases = {'install': [], 'test': []}
         for section in ('install', 'test'):
@@ -108,3 +136,15 @@ class TestSet(object):
                                 testcases[section].append(relpath.replace(os.sep, '/'))
         return TestCases(install=tuple(testcases['install']),
                          test=tuple(testcases['test']))
+
+    def select(self, casepaths: list[str]) -> None:
+        """
+        Keep only test testcases in `casepaths`(install testcases are kept).
+
+        :param casepaths: testcase filepaths.
+        """
+        keep = set(casepaths)
+        testcases = self.testcases
+        self.__selected = testcases._replace(
+            test=tuple(p for p in testcases.test if p in keep)
+        )
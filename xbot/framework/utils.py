@@ -6,18 +6,32 @@ Utilities.
 
 import os
 import re
+import ast
 import sys
+import time
+import math
 import ctypes
+import asyncio
 import operator
 
 import jinja2
 
-from typing import Any, Callable, Iterator, TypeVar
-from functools import partial
+from typing import Any, Callable, Hashable, Iterable, Iterator, Mapping, NamedTuple, \
+    Sequence, TypeVar
+from functools import partial, lru_cache
+from itertools import zip_longest
 from contextlib import contextmanager
-from threading import Thread
+from threading import Thread, Event, Lock
+from contextvars import ContextVar
+from collections import Counter
 
 from xbot.framework.logger import getlogger
+from xbot.framework.errors import TestCaseTimeout
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 T = TypeVar('T')
 
@@ -110,6 +124,226 @@ def stop_thread(
         raise SystemError("Stop thread '%s' failed" % thread.name)
 
 
+class CancelToken(object):
+    """
+    Cooperative cancellation token of a testcase stage, long-running 
+    operations should wait by `wait` or call `check` periodically so 
+    that a timed out stage aborts promptly.
+    """
+    __current: ContextVar['CancelToken'] = ContextVar('cancel_token')
+
+    def __init__(self) -> None:
+        self.__event: Event = Event()
+        self.__lock: Lock = Lock()
+        self.__callbacks: list[Callable[[], Any]] = []
+        self.reason: str | None = None
+
+    @classmethod
+    def current(cls) -> 'CancelToken':
+        """
+        Token of the stage running in the current thread or asyncio task
+        (a token never cancelled if no stage is running).
+        """
+        token = cls.__current.get(None)
+        if token is None:
+            token = cls()
+            cls.__current.set(token)
+        return token
+
+    def activate(self) -> None:
+        """
+        Make it the token of the current thread(and asyncio tasks created
+        from it).
+        """
+        self.__current.set(self)
+
+    @property
+    def cancelled(self) -> bool:
+        """
+        Whether it is cancelled.
+        """
+        return self.__event.is_set()
+
+    def cancel(self, reason: str = 'Cancelled.') -> None:
+        """
+        Cancel it.
+
+        :param reason: message of the raised TestCaseTimeout.
+        """
+        with self.__lock:
+            self.reason = self.reason or reason
+            self.__event.set()
+            callbacks, self.__callbacks = self.__callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback: Callable[[], Any]) -> None:
+        """
+        Call `callback` when cancelled(immediately if already cancelled).
+        """
+        with self.__lock:
+            if not self.__event.is_set():
+                self.__callbacks.append(callback)
+                return
+        callback()
+
+    def check(self) -> None:
+        """
+        :raises TestCaseTimeout: if cancelled.
+        """
+        if self.cancelled:
+            raise TestCaseTimeout(self.reason)
+
+    def wait(self, seconds: float) -> None:
+        """
+        Sleep for `seconds`, wake up as soon as cancelled.
+
+        :raises TestCaseTimeout: if cancelled.
+        """
+        self.__event.wait(seconds)
+        self.check()
+
+
+def wait_until(
+    predicate: Callable[[], T],
+    timeout: float,
+    interval: float = 0.1,
+    backoff: float = 2,
+    max_interval: float = 5
+) -> T:
+    """
+    Call `predicate` until it returns a truthy value, the interval between 
+    calls grows by `backoff` times up to `max_interval`. Waiting aborts 
+    if the stage is cancelled(see `CancelToken`).
+
+    >>> wait_until(lambda: 1, 1)
+    1
+
+    :param predicate: function to poll.
+    :param timeout: maximum seconds to wait.
+    :param interval: seconds before the second call.
+    :param backoff: interval factor, 1 for fixed interval.
+    :param max_interval: maximum interval.
+    :return: the truthy value returned by `predicate`.
+    :raises TimeoutError: if not satisfied within `timeout` seconds.
+    """
+    token = CancelToken.current()
+    deadline = time.monotonic() + timeout
+    while True:
+        value = predicate()
+        if value:
+            return value
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f'Not satisfied within {timeout} second(s).')
+        token.wait(min(interval, remaining))
+        interval = min(interval * backoff, max_interval)
+
+
+async def await_until(
+    predicate: Callable[[], T],
+    timeout: float,
+    interval: float = 0.1,
+    backoff: float = 2,
+    max_interval: float = 5
+) -> T:
+    """
+    `wait_until` for coroutines, sleeps by `asyncio.sleep` so other tasks
+    of the event loop keep running(the task is cancelled with the stage).
+
+    >>> asyncio.run(await_until(lambda: 1, 1))
+    1
+
+    :raises TimeoutError: if not satisfied within `timeout` seconds.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        value = predicate()
+        if value:
+            return value
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f'Not satisfied within {timeout} second(s).')
+        await asyncio.sleep(min(interval, remaining))
+        interval = min(interval * backoff, max_interval)
+
+
+DeepKey = tuple[str | int | dict[str, Any], ...]
+
+
+def _bracket_end(deepkey: str, start: int) -> int:
+    """
+    Index of the `]` closing the `[` at `start`, quoted `]` are skipped.
+
+    :raises SyntaxError: if not closed.
+    """
+    quote = ''
+    i = start + 1
+    while i < len(deepkey):
+        c = deepkey[i]
+        if quote:
+            if c == '\\':
+                i += 1
+            elif c == quote:
+                quote = ''
+        elif c in '\'"':
+            quote = c
+        elif c == ']':
+            return i
+        i += 1
+    raise SyntaxError(f'Unclosed `[` at {start} in deepkey `{deepkey}`.')
+
+
+def _parse_bracket(expr: str, deepkey: str) -> int | dict[str, Any]:
+    """
+    Parse `[...]` of a deepkey: an index or a filter of literals.
+
+    :raises SyntaxError: if invalid.
+    """
+    if expr.strip().isdigit():
+        return int(expr)
+    try:
+        node = ast.parse(f'dict({expr})', mode='eval').body
+        if not isinstance(node, ast.Call) or not isinstance(node.func, ast.Name) \
+                or node.args or any(kw.arg is None for kw in node.keywords):
+            raise ValueError('expected `key=value, ...`')
+        return {str(kw.arg): ast.literal_eval(kw.value) for kw in node.keywords}
+    except (SyntaxError, ValueError, TypeError, MemoryError, RecursionError) as e:
+        raise SyntaxError(f'Invalid expr `{expr}` in deepkey `{deepkey}`: {str(e)}.')
+
+
+@lru_cache(maxsize=1024)
+def compile_deepkey(deepkey: str, sep: str = '.') -> DeepKey:
+    """
+    Parse `deepkey` once, the result is cached and must not be modified.
+
+    >>> compile_deepkey('a.b2[x="1.5]"].c2')
+    ('a', 'b2', {'x': '1.5]'}, 'c2')
+
+    :param deepkey: multi-level key.
+    :param sep: separator.
+    :raises SyntaxError: if `deepkey` is invalid.
+    """
+    keys: list[str | int | dict[str, Any]] = []
+    pos, n = 0, len(deepkey)
+    while True:
+        end = pos
+        while end < n and deepkey[end] != '[' and not deepkey.startswith(sep, end):
+            end += 1
+        keys.append(deepkey[pos:end])
+        pos = end
+        while pos < n and deepkey[pos] == '[':
+            end = _bracket_end(deepkey, pos)
+            keys.append(_parse_bracket(deepkey[pos + 1:end], deepkey))
+            pos = end + 1
+        if pos >= n:
+            break
+        if not deepkey.startswith(sep, pos):
+            raise SyntaxError(f'Expected `{sep}` at {pos} in deepkey `{deepkey}`.')
+        pos += len(sep)
+    return tuple(keys)
+
+
 def parse_deepkey(
     deepkey: str,
     sep: str = '.'
@@ -132,20 +366,43 @@ def parse_deepkey(
     >>> parse_deepkey('a.b2[x=1, y="z"].c2')
     ['a', 'b2', {'x': 1, 'y': 'z'}, 'c2']
     """
-    keys: list[str | int | dict[str, Any]] = []
-    for k in re.split(r'%s|\[' % re.escape(sep), deepkey):
-        if k.endswith(']'):
-            k = k[:-1]
-            if k.isdigit():
-                keys.append(int(k))
+    return [dict(k) if isinstance(k, dict) else k for k in compile_deepkey(deepkey, sep)]
+
+
+def get_deep(data: Any, deepkey: str, sep: str = '.', default: Any = None) -> Any:
+    """
+    Get the value of `deepkey`(see `parse_deepkey`) in `data`, `[k=v, ...]`
+    selects the first dict of a list having all the items, empty keys are
+    skipped.
+
+    >>> data = {'a': {'b': [{'x': 1, 'c': 'one'}, {'x': 2, 'c': 'two'}]}}
+    >>> get_deep(data, 'a.b[x=2].c')
+    'two'
+    >>> get_deep(data, 'a.b[1]')
+    {'x': 2, 'c': 'two'}
+    >>> get_deep(data, 'a.b[x=3].c', default='none')
+    'none'
+
+    :param default: returned if a key does not exist.
+    :raises SyntaxError: if `deepkey` is invalid.
+    """
+    for key in compile_deepkey(deepkey, sep):
+        if isinstance(key, dict):
+            if not isinstance(data, list):
+                return default
+            for item in data:
+                if isinstance(item, dict) and \
+                        all(k in item and item[k] == v for k, v in key.items()):
+                    data = item
+                    break
             else:
-                try:
-                    keys.append(eval(f'dict({k})'))
-                except SyntaxError as e:
-                    raise SyntaxError(f'Invalid expr `{k}` in deepkey `{deepkey}`: {str(e)}.')
-        else:
-            keys.append(k)
-    return keys
+                return default
+        elif key != '':
+            try:
+                data = data[key]
+            except (KeyError, IndexError, TypeError):
+                return default
+    return data
 
 
 def wrapstr(s: str, title: str = '') -> str:
@@ -221,6 +478,43 @@ def ordered_walk(path: str) -> Iterator[tuple[str, list[str], list[str]]]:
             yield t
 
 
+# Compiled patterns of `match`/`search` assertions.
+compile_regex: Callable[[str | re.Pattern[str]], re.Pattern[str]] = \
+    lru_cache(maxsize=256)(re.compile)
+
+ASSERT_OPERATORS: dict[str, Callable[[Any, Any], Any]] = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    'in': lambda a, b: operator.contains(b, a),
+    'not in': lambda a, b: not operator.contains(b, a),
+    'is': operator.is_,
+    'is not': operator.is_not,
+    'match': lambda a, b: compile_regex(b).match(a),
+    'not match': lambda a, b: not compile_regex(b).match(a),
+    'search': lambda a, b: compile_regex(b).search(a),
+    'not search': lambda a, b: not compile_regex(b).search(a)
+}
+
+# Maximum mismatches listed in the message of bulk assertions.
+MAX_MISMATCHES: int = 10
+
+
+def assert_operator(op: str) -> Callable[[Any, Any], Any]:
+    """
+    Function of assertion operator `op`.
+
+    :raises ValueError: if invalid operator.
+    """
+    try:
+        return ASSERT_OPERATORS[op]
+    except KeyError:
+        raise ValueError(f'Invalid operator: {op}') from None
+
+
 def assertx(
         a: Any, 
         op: str, 
@@ -254,25 +548,7 @@ def assertx(
     :raises AssertionError: if assertion failed.
             ValueError: if invalid operator.
     """
-    funcs: dict[str, Callable[[Any, Any], Any]] = {
-        '==': operator.eq,
-        '!=': operator.ne,
-        '>': operator.gt,
-        '>=': operator.ge,
-        '<': operator.lt,
-        '<=': operator.le,
-        'in': lambda a, b: operator.contains(b, a),
-        'not in': lambda a, b: not operator.contains(b, a),
-        'is': operator.is_,
-        'is not': operator.is_not,
-        'match': lambda a, b: re.match(b, a),
-        'not match': lambda a, b: not re.match(b, a),
-        'search': lambda a, b: re.search(b, a),
-        'not search': lambda a, b: not re.search(b, a)
-    }
-    if op not in funcs:
-        raise ValueError('Invalid operator: %s', op)
-    if not funcs[op](a, b):
+    if not assert_operator(op)(a, b):
         if not errmsg:
             errmsg = '%s %s %s' % (a, op, b)
         raise AssertionError(errmsg)
@@ -280,6 +556,352 @@ def assertx(
         logger.info('AssertionOK: %s %s %s', a, op, b, stacklevel=2)
 
 
+def _assert_bulk(
+        pairs: Iterable[tuple[Any, Any]],
+        op: str,
+        desc: str,
+        errmsg: str | None,
+        verbose: bool
+    ) -> None:
+    """
+    Assert `a op b` for each (a, b) of `pairs`, all mismatches are reported
+    by one AssertionError and successes by one log record.
+
+    :param desc: description of the right operand(s) in messages.
+    """
+    func = assert_operator(op)
+    total = 0
+    mismatches: list[str] = []
+    nmismatch = 0
+    for i, (a, b) in enumerate(pairs):
+        total += 1
+        if not func(a, b):
+            nmismatch += 1
+            if len(mismatches) < MAX_MISMATCHES:
+                mismatches.append(f'[{i}] {a!r} {op} {b!r}')
+    if nmismatch:
+        more = nmismatch - len(mismatches)
+        raise AssertionError('\n'.join(
+            [errmsg or f'{nmismatch} of {total} item(s) not {op} {desc}:'] +
+            ['  ' + m for m in mismatches] +
+            ([f'  ... and {more} more'] if more else [])
+        ))
+    if verbose:
+        logger.info('AssertionOK: %d item(s) %s %s', total, op, desc, stacklevel=3)
+
+
+def assertx_all(
+        items: Iterable[Any],
+        op: str,
+        b: Any,
+        errmsg: str | None = None,
+        verbose: bool = True
+    ) -> None:
+    """
+    Assert every item of `items` with operator `op` and `b`.
+
+    >>> assertx_all([1, 2, 3], '>', 0)
+    >>> assertx_all(['a1', 'b2', 'c'], 'match', '[a-z][0-9]')
+    Traceback (most recent call last):
+    ...
+    AssertionError: 1 of 3 item(s) not match '[a-z][0-9]':
+      [2] 'c' match '[a-z][0-9]'
+
+    :param items: objects asserted as `a`.
+    :param op: operator.
+    :param b: object b.
+    :param errmsg: first line of the error message.
+    :param verbose: if True, log one record on success.
+    :raises AssertionError: if any assertion failed, with all mismatches.
+            ValueError: if invalid operator.
+    """
+    _assert_bulk(((a, b) for a in items), op, repr(b), errmsg, verbose)
+
+
+def assertx_each(
+        items: Iterable[Any],
+        op: str,
+        expected: Iterable[Any],
+        errmsg: str | None = None,
+        verbose: bool = True
+    ) -> None:
+    """
+    Assert items of `items` and `expected` pairwise with operator `op`.
+
+    >>> assertx_each([1, 2, 3], '==', [1, 2, 3])
+    >>> assertx_each([1, 2, 3], '==', iter([1, 2]))
+    Traceback (most recent call last):
+    ...
+    AssertionError: Length mismatch: `expected` has only 2 item(s)
+    >>> assertx_each([1, 5, 3, 7], '<=', [1, 2, 3, 4])
+    Traceback (most recent call last):
+    ...
+    AssertionError: 2 of 4 item(s) not <= expected:
+      [1] 5 <= 2
+      [3] 7 <= 4
+
+    :param items: objects asserted as `a`.
+    :param op: operator.
+    :param expected: objects asserted as `b`, same length as `items`.
+    :param errmsg: first line of the error message.
+    :param verbose: if True, log one record on success.
+    :raises AssertionError: if any assertion failed(or lengths differ),
+                            with all mismatches.
+            ValueError: if invalid operator.
+    """
+    def pairs() -> Iterator[tuple[Any, Any]]:
+        missing = object()
+        for i, (a, b) in enumerate(zip_longest(items, expected, fillvalue=missing)):
+            if a is missing or b is missing:
+                shorter = '`items`' if a is missing else '`expected`'
+                raise AssertionError(
+                    errmsg or f'Length mismatch: {shorter} has only {i} item(s)')
+            yield a, b
+    _assert_bulk(pairs(), op, 'expected', errmsg, verbose)
+
+
+class Diff(NamedTuple):
+    """
+    Differences between actual and expected data.
+    """
+    total: int
+    # Expected items not in actual, [(key, expected), ...].
+    missing: list[tuple[Any, Any]]
+    # Actual items not expected, [(key, actual), ...].
+    extra: list[tuple[Any, Any]]
+    # [(key, actual, expected), ...]
+    changed: list[tuple[Any, Any, Any]]
+
+    @property
+    def ok(self) -> bool:
+        """
+        No difference.
+        """
+        return not (self.missing or self.extra or self.changed)
+
+    def summary(self, limit: int = MAX_MISMATCHES) -> str:
+        """
+        Counts and the first `limit` differences.
+
+        >>> print(diff_mappings({'a': 1, 'b': 2}, {'a': 1, 'b': 3, 'c': 4}).summary())
+        1 missing, 0 extra, 1 changed of 3 expected:
+          missing ['c']: 4
+          changed ['b']: 2 != 3
+        """
+        lines = [f'{len(self.missing)} missing, {len(self.extra)} extra, '
+                 f'{len(self.changed)} changed of {self.total} expected:']
+        diffs = [f'missing [{k!r}]: {v!r}' for k, v in self.missing[:limit]] + \
+                [f'extra [{k!r}]: {v!r}' for k, v in self.extra[:limit]] + \
+                [f'changed [{k!r}]: {a!r} != {b!r}' for k, a, b in self.changed[:limit]]
+        lines.extend('  ' + d for d in diffs[:limit])
+        more = len(self.missing) + len(self.extra) + len(self.changed) - len(diffs[:limit])
+        if more:
+            lines.append(f'  ... and {more} more')
+        return '\n'.join(lines)
+
+
+def equals(a: Any, b: Any, tolerance: float | None = None) -> bool:
+    """
+    Whether `a` equals `b`, floats(also in lists/tuples/dicts) may differ
+    by `tolerance`.
+
+    >>> equals([1.0, {'x': 2.0}], [1.0001, {'x': 1.9999}], tolerance=0.001)
+    True
+    """
+    if tolerance is None:
+        return bool(a == b)
+    if isinstance(a, float) or isinstance(b, float):
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)) \
+                and not isinstance(a, bool) and not isinstance(b, bool):
+            return math.isclose(a, b, rel_tol=0, abs_tol=tolerance)
+        return False
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return type(a) is type(b) and len(a) == len(b) and \
+            all(equals(x, y, tolerance) for x, y in zip(a, b))
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(equals(a[k], b[k], tolerance) for k in a)
+    return bool(a == b)
+
+
+def _numeric_mismatches(
+        actual: Sequence[Any],
+        expected: Sequence[Any],
+        tolerance: float | None
+    ) -> list[int] | None:
+    """
+    Indexes of different numbers by NumPy, None if NumPy is not installed
+    or the sequences are not both integers or both floats of the same
+    length(compared by `equals` then, mixing them would lose precision).
+    Like `equals`, `tolerance` only applies to floats.
+    """
+    if np is None or len(actual) != len(expected):
+        return None
+    try:
+        a, b = np.asarray(actual), np.asarray(expected)
+    except Exception:
+        return None
+    if a.ndim != 1 or b.ndim != 1:
+        return None
+    if a.dtype.kind in 'iu' and b.dtype.kind in 'iu':
+        return np.flatnonzero(a != b).tolist()
+    if a.dtype.kind != 'f' or b.dtype.kind != 'f':
+        return None
+    if tolerance is None:
+        return np.flatnonzero(a != b).tolist()
+    return np.flatnonzero(~np.isclose(a, b, rtol=0, atol=tolerance)).tolist()
+
+
+def diff_sequences(
+        actual: Sequence[Any],
+        expected: Sequence[Any],
+        tolerance: float | None = None
+    ) -> Diff:
+    """
+    Compare sequences item by item(keys of differences are indexes),
+    numbers are compared in one pass by NumPy if installed.
+
+    >>> diff_sequences([1, 2, 3], [1, 5])
+    Diff(total=2, missing=[], extra=[(2, 3)], changed=[(1, 2, 5)])
+
+    :param tolerance: maximum difference of equal floats.
+    """
+    n = min(len(actual), len(expected))
+    indexes = _numeric_mismatches(actual, expected, tolerance)
+    if indexes is None:
+        indexes = [i for i in range(n) if not equals(actual[i], expected[i], tolerance)]
+    return Diff(
+        total=len(expected),
+        missing=[(i, expected[i]) for i in range(n, len(expected))],
+        extra=[(i, actual[i]) for i in range(n, len(actual))],
+        changed=[(i, actual[i], expected[i]) for i in indexes]
+    )
+
+
+def diff_mappings(
+        actual: Mapping[Any, Any],
+        expected: Mapping[Any, Any],
+        tolerance: float | None = None
+    ) -> Diff:
+    """
+    Compare mappings by keys.
+
+    >>> diff_mappings({'a': 1.0, 'b': 2}, {'a': 1.05}, tolerance=0.1)
+    Diff(total=1, missing=[], extra=[('b', 2)], changed=[])
+
+    :param tolerance: maximum difference of equal floats.
+    """
+    return Diff(
+        total=len(expected),
+        missing=[(k, v) for k, v in expected.items() if k not in actual],
+        extra=[(k, v) for k, v in actual.items() if k not in expected],
+        changed=[(k, actual[k], v) for k, v in expected.items()
+                 if k in actual and not equals(actual[k], v, tolerance)]
+    )
+
+
+def _row_key(key: Any) -> Callable[[Any], Hashable]:
+    """
+    Function getting the key of a row.
+
+    :param key: column name/index, tuple of them, or a function.
+    """
+    if callable(key):
+        return key
+    if isinstance(key, tuple):
+        return lambda row: tuple(row[k] for k in key)
+    return lambda row: row[key]
+
+
+def _hashable(row: Any) -> Hashable:
+    """
+    Hashable form of a row.
+    """
+    if isinstance(row, dict):
+        return tuple(sorted((k, _hashable(v)) for k, v in row.items()))
+    if isinstance(row, list):
+        return tuple(_hashable(v) for v in row)
+    return row
+
+
+def diff_rows(
+        actual: Iterable[Any],
+        expected: Iterable[Any],
+        key: Any = None,
+        tolerance: float | None = None
+    ) -> Diff:
+    """
+    Compare tabular data(rows of tuples/lists/dicts) regardless of order.
+
+    Without `key` rows are compared as multisets(keys of differences are
+    row numbers), with `key` rows are matched by key and compared column
+    by column.
+
+    >>> diff_rows([(1, 'a'), (2, 'b')], [(2, 'b'), (1, 'a')]).ok
+    True
+    >>> diff_rows([{'id': 1, 'v': 1.5}], [{'id': 1, 'v': 1.6}], key='id').changed
+    [(1, {'id': 1, 'v': 1.5}, {'id': 1, 'v': 1.6})]
+
+    :param key: column name/index, tuple of them, or a function of a row.
+    :param tolerance: maximum difference of equal floats(requires `key`).
+    :raises ValueError: if keys are duplicated or `tolerance` is given
+                        without `key`.
+    """
+    if key is None:
+        if tolerance is not None:
+            raise ValueError('`tolerance` requires `key`')
+        actual, expected = list(actual), list(expected)
+        akeys, ekeys = list(map(_hashable, actual)), list(map(_hashable, expected))
+        # Positive counts are missing rows, negative ones extra rows.
+        counter = Counter(ekeys)
+        counter.subtract(akeys)
+        missing: list[tuple[Any, Any]] = []
+        for i, k in enumerate(ekeys):
+            if counter[k] > 0:
+                counter[k] -= 1
+                missing.append((i, expected[i]))
+        extra: list[tuple[Any, Any]] = []
+        for i, k in enumerate(akeys):
+            if counter[k] < 0:
+                counter[k] += 1
+                extra.append((i, actual[i]))
+        return Diff(len(expected), missing, extra, [])
+    getkey = _row_key(key)
+    tables = []
+    for rows in (actual, expected):
+        table: dict[Hashable, Any] = {}
+        for row in rows:
+            k = getkey(row)
+            if k in table:
+                raise ValueError(f'Duplicate row key: {k!r}')
+            table[k] = row
+        tables.append(table)
+    return diff_mappings(tables[0], tables[1], tolerance)
+
+
+def assert_no_diff(
+        diff: Diff,
+        errmsg: str | None = None,
+        verbose: bool = True
+    ) -> None:
+    """
+    Assert no difference, the summary is logged/raised as one record.
+
+    >>> assert_no_diff(diff_sequences([1.0, 2.0], [1.0, 2.0001], tolerance=0.01))
+
+    :param diff: result of `diff_sequences`/`diff_mappings`/`diff_rows`.
+    :param errmsg: first line of the error message.
+    :param verbose: if True, log one record on success.
+    :raises AssertionError: if any difference.
+    """
+    if not diff.ok:
+        summary = diff.summary()
+        if errmsg:
+            summary = f'{errmsg}\n{summary}'
+        raise AssertionError(summary)
+    if verbose:
+        logger.info('AssertionOK: %d item(s) equal', diff.total, stacklevel=2)
+
+
 @contextmanager
 def cd(path: str) -> Iterator[None]:
     """